@@ -0,0 +1,76 @@
+# api_key_cache.py
+"""
+In-Process-Cache für die API-Key-Authentifizierung in APIKeyAuthQuotaMiddleware:
+key_hash -> (key_id, user_id, plan, subscription_status). Ein warmer Key braucht
+zur Authentifizierung keine DB-Abfrage; Quota-Stand und Zählung laufen weiter über
+Postgres, weil sie über alle Worker stimmen müssen.
+
+Invalidierung: revoke/rotate (routers/apikeys.py) entfernen den Key, Stripe-Webhooks
+(routers/billing.py) alle Keys des betroffenen Users. Das wirkt nur im eigenen
+Worker-Prozess – in den übrigen begrenzt die TTL, wie lange ein widerrufener Key
+oder ein alter Abo-Status noch gilt.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+import uuid
+
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    key_id: uuid.UUID
+    user_id: uuid.UUID
+    plan: str
+    subscription_status: Optional[str]
+
+
+class ApiKeyCache:
+    """LRU mit fester TTL; ttl <= 0 schaltet den Cache ab."""
+
+    def __init__(self, ttl: float, max_entries: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        # jede Invalidierung erhöht die Generation; put() mit älterer Generation wird verworfen,
+        # damit eine DB-Abfrage von vor dem Widerruf den alten Stand nicht wieder einträgt
+        self.generation = 0
+        self.hits = self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, CachedApiKey]]" = OrderedDict()
+
+    def get(self, key_hash: str) -> Optional[CachedApiKey]:
+        item = self._entries.get(key_hash)
+        if item is not None:
+            expires, entry = item
+            if self.clock() < expires:
+                self._entries.move_to_end(key_hash)
+                self.hits += 1
+                return entry
+            del self._entries[key_hash]
+        self.misses += 1
+        return None
+
+    def put(self, key_hash: str, entry: CachedApiKey, generation: int) -> None:
+        if self.ttl <= 0 or generation != self.generation:
+            return
+        self._entries[key_hash] = (self.clock() + self.ttl, entry)
+        self._entries.move_to_end(key_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key_hash: str) -> None:
+        self.generation += 1
+        self._entries.pop(key_hash, None)
+
+    def invalidate_user(self, user_id) -> None:
+        self.generation += 1
+        user_id = str(user_id)
+        for key_hash in [h for h, (_, e) in self._entries.items() if str(e.user_id) == user_id]:
+            del self._entries[key_hash]
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
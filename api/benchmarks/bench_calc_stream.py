@@ -0,0 +1,89 @@
+# benchmarks/bench_calc_stream.py
+"""
+Durchsatz und Speicher von /v1/calculate/stream (calc_stream + BatchCalculator)
+für wachsende Eingaben. Der Body wird on-the-fly in 64-KiB-Blöcken erzeugt und
+die Antwort nur gezählt, so dass der Peak-RSS allein die Pipeline misst – er
+sollte unabhängig von der Zeilenzahl flach bleiben. Jede 4. Zeile ist B2B mit
+eigener USt-IdNr., jede 5. hat eine eigene category_hint, damit auch die Caches
+des BatchCalculators mit der Zeilenzahl wachsen würden, wären sie unbegrenzt.
+
+Jede Größe läuft in einem eigenen Prozess (ru_maxrss ist prozessweit).
+
+Aufruf (aus api/):  python -m benchmarks.bench_calc_stream
+"""
+import asyncio
+import json
+import multiprocessing as mp
+import resource
+import time
+
+SIZES = (10_000, 100_000, 300_000)
+BLOCK = 64 * 1024
+COUNTRIES = ("DE", "AT", "FR", "IT", "NL", "ES")
+
+
+def _line(i: int, fmt: str) -> bytes:
+    cc = COUNTRIES[i % len(COUNTRIES)]
+    amount = round(1 + (i % 9973) / 7, 2)
+    b2x, vat_number = ("B2B", f"{cc}{i:09d}") if i % 4 == 0 else ("B2C", "")
+    hint = f"food-{i}" if i % 5 == 0 else ""
+    if fmt == "csv":
+        return f"{amount},{'net' if i % 3 else 'gross'},{b2x},DE,{cc},{vat_number},{hint}\n".encode()
+    item = {"amount": amount, "basis": "net" if i % 3 else "gross", "b2x": b2x,
+            "supplier": {"country_code": "DE"}, "customer": {"country_code": cc, "vat_number": vat_number or None}}
+    if hint:
+        item["category_hint"] = hint
+    return json.dumps(item).encode() + b"\n"
+
+
+async def _body(n: int, fmt: str):
+    buf = bytearray(b"amount,basis,b2x,supplier_country,customer_country,customer_vat,category_hint\n"
+                    if fmt == "csv" else b"")
+    for i in range(n):
+        buf += _line(i, fmt)
+        if len(buf) >= BLOCK:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+async def _vies_stub(country_code: str, vat_number):
+    # kein Netz: jede Nummer gilt als gültig
+    return True, "validated"
+
+
+def _run(n: int, fmt: str, queue):
+    from calc_stream import stream_calculation
+    from main import BatchCalculator
+
+    async def consume():
+        out = 0
+        async for part in stream_calculation(_body(n, fmt), fmt, BatchCalculator(_vies_stub).calculate):
+            out += len(part)
+        return out
+
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    out_bytes = asyncio.run(consume())
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((seconds, out_bytes, base, peak))
+
+
+def main():
+    ctx = mp.get_context("fork")
+    for fmt in ("ndjson", "csv"):
+        for n in SIZES:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(n, fmt, queue))
+            proc.start()
+            seconds, out_bytes, base, peak = queue.get()
+            proc.join()
+            print(f"{fmt:6s} n={n:>7,}: {seconds:6.2f}s  {n / seconds:>9,.0f} items/s  "
+                  f"out={out_bytes / 1e6:6.1f} MB  peak RSS {peak / 1024:6.1f} MB "
+                  f"(+{(peak - base) / 1024:5.1f} MB während des Laufs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_import_time.py
+"""
+Import-Budget der App: `import main` in frischen Prozessen (Kaltstart wie bei
+Serverless-Instanzen oder neu gestarteten Workern), Median gegen ein Budget in
+Sekunden, dazu die teuersten Top-Level-Imports laut `python -X importtime`.
+Schwere Abhängigkeiten (stripe, zeep, passlib, sentry_sdk) dürfen dabei gar nicht
+geladen werden – sie kommen erst mit dem ersten Request auf ihre Route.
+
+Budget per Umgebung: IMPORT_TIME_BUDGET_SECONDS (Default 1.5 s). test_import_time.py
+lässt die Test-Suite fehlschlagen, wenn der Median darüber liegt.
+
+Aufruf (aus api/):  python -m benchmarks.bench_import_time
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+RUNS = 5
+BUDGET_SECONDS = float(os.environ.get("IMPORT_TIME_BUDGET_SECONDS") or 1.5)
+LAZY_MODULES = ("stripe", "zeep", "passlib", "sentry_sdk")
+
+_CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def _env() -> dict:
+    # Sentry ist ohne DSN aus; eine DSN aus der Entwickler-Umgebung soll das Budget nicht verfälschen
+    return {**os.environ, "SENTRY_DSN": ""}
+
+
+def cold_import() -> dict:
+    out = subprocess.run([sys.executable, "-c", _CHILD], cwd=API_DIR, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(limit: int = 10) -> list[tuple[str, float]]:
+    """Direkte Imports von main, nach kumulierter Zeit (Sekunden) absteigend."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=API_DIR, env=_env(),
+                         capture_output=True, text=True, check=True)
+    found = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Einrückung: zwei Leerzeichen je Ebene; main selbst steht auf Ebene 0
+        if len(name) - len(name.lstrip(" ")) == 3:
+            found.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(found, key=lambda item: -item[1])[:limit]
+
+
+def measure(runs: int = RUNS) -> dict:
+    results = [cold_import() for _ in range(runs)]
+    return {
+        "median": statistics.median(r["seconds"] for r in results),
+        "max": max(r["seconds"] for r in results),
+        "loaded": sorted({m for r in results for m in r["loaded"]}),
+    }
+
+
+def main():
+    result = measure()
+    print(f"import main:  median {result['median'] * 1e3:7.1f} ms  (max {result['max'] * 1e3:.1f} ms, "
+          f"budget {BUDGET_SECONDS * 1e3:.0f} ms)")
+    print(f"lazy modules loaded at import: {result['loaded'] or 'none'}")
+    print("top imports (cumulative):")
+    for name, seconds in top_imports():
+        print(f"  {seconds * 1e3:7.1f} ms  {name}")
+    assert not result["loaded"], f"heavy modules imported eagerly: {result['loaded']}"
+    assert result["median"] <= BUDGET_SECONDS, "import budget exceeded"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_rate_lookup.py
+"""
+Vergleicht die Kosten eines Rate-Lookups pro Request:
+  - vorher: open() + json.load() der Länderdatei bei jedem Aufruf
+  - nachher: Lookup in der In-Memory-RateTable (rate_store), Label-Scan
+  - Kategorie-Index: ein Hash-Probe über CountryHistory.category_rates_on()
+  - mmap-Snapshot: gleiche Lookups direkt aus rates.snapshot (rate_snapshot)
+
+Aufruf (aus api/):  python -m benchmarks.bench_rate_lookup
+"""
+import json
+import tempfile
+import timeit
+from datetime import date
+from pathlib import Path
+
+from rate_snapshot import RateSnapshot, write_snapshot
+from rate_store import DATA_DIR, RateRepository
+
+COUNTRY = "DE"
+HINT = "transport_passengers"
+N = 20_000
+
+
+def lookup_from_file(cc: str, category_hint: str):
+    # entspricht dem alten get_rate() in main.py
+    with open(DATA_DIR / f"{cc}.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for rr in data.get("reduced_rates", []):
+        if rr["label"].lower().endswith(f":{category_hint.lower()}"):
+            return rr["rate"]
+    return data["standard_rate"]
+
+
+def lookup_from_table(repo: RateRepository, cc: str, category_hint: str):
+    data = repo.get(cc)
+    for rr in data.reduced_rates:
+        if rr.label.lower().endswith(f":{category_hint.lower()}"):
+            return rr.rate
+    return data.standard_rate
+
+
+def lookup_from_index(source, cc: str, category_hint: str, on: date):
+    # source: RateRepository (JSON-Historie) oder RateSnapshot (mmap)
+    history = source.get_history(cc) if isinstance(source, RateRepository) else source.get(cc)
+    matches = history.category_rates_on(category_hint, on)
+    return matches[0].rate if matches else history.standard_rate_on(on)
+
+
+def main():
+    repo = RateRepository()
+    load_s = timeit.timeit(repo.load, number=10) / 10
+    assert lookup_from_file(COUNTRY, HINT) == lookup_from_table(repo, COUNTRY, HINT)
+
+    before = timeit.timeit(lambda: lookup_from_file(COUNTRY, HINT), number=N) / N
+    after = timeit.timeit(lambda: lookup_from_table(repo, COUNTRY, HINT), number=N) / N
+    today = date.today()
+    assert lookup_from_index(repo, COUNTRY, HINT, today) == lookup_from_table(repo, COUNTRY, HINT)
+    indexed = timeit.timeit(lambda: lookup_from_index(repo, COUNTRY, HINT, today), number=N) / N
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rates.snapshot"
+        write_snapshot(repo.table, path)
+        open_s = timeit.timeit(lambda: RateSnapshot(path), number=10) / 10
+        snap = RateSnapshot(path)
+        assert lookup_from_index(snap, COUNTRY, HINT, today) == lookup_from_table(repo, COUNTRY, HINT)
+        mapped = timeit.timeit(lambda: lookup_from_index(snap, COUNTRY, HINT, today), number=N) / N
+
+    print(f"table load (all countries): {load_s * 1e3:8.2f} ms (once at startup)")
+    print(f"snapshot mmap + verify:     {open_s * 1e3:8.2f} ms (once at startup)")
+    print(f"per request, file + json:   {before * 1e6:8.2f} µs")
+    print(f"per request, in-memory:     {after * 1e6:8.2f} µs")
+    print(f"per request, category index:{indexed * 1e6:8.2f} µs")
+    print(f"per request, mmap snapshot: {mapped * 1e6:8.2f} µs")
+    print(f"speedup (file -> index):    {before / indexed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
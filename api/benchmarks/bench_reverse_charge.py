@@ -0,0 +1,125 @@
+# benchmarks/bench_reverse_charge.py
+"""
+Lasttest für B2B-Cross-Border-Berechnungen (Reverse-Charge-Pfad mit VIES-Prüfung):
+  - vorher: sync-Endpoint im Threadpool, is_valid_vat() mit asyncio.run() (neuer
+    Event-Loop pro Request) und von dort erneut in den Threadpool für zeep
+  - nachher: async handle_calculate_vat() auf dem Event-Loop der App, ein Threadpool-Hop
+
+Der VIES-Aufruf wird durch Stubs mit fester Latenz ersetzt (vorher blockierend wie
+zeep, nachher async wie vies_client.check_vat); gemessen wird über httpx +
+ASGITransport ohne Netzwerk/DB.
+
+Aufruf (aus api/):  python -m benchmarks.bench_reverse_charge
+"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+import main
+from calculate import CalcRequest, CalcResult, _normal_result, _reverse_charge_result, get_rate
+from validate_vat import check_vat_syntax
+from vat_kernel import calculate_amounts
+
+REQUESTS = 2_000
+CONCURRENCY = 100
+LATENCIES = (0.0, 0.02)  # Sekunden pro VIES-Aufruf
+
+
+VIES_LATENCY = 0.0
+
+
+def _vies_answer(country_code: str, number: str) -> dict:
+    return {"countryCode": country_code, "vatNumber": number, "requestDate": "2025-01-01+01:00",
+            "valid": True, "name": "ACME", "address": "Somewhere"}
+
+
+def _blocking_vies(country_code: str, number: str) -> dict:
+    if VIES_LATENCY:
+        time.sleep(VIES_LATENCY)
+    return _vies_answer(country_code, number)
+
+
+async def _async_vies(country_code: str, number: str) -> dict:
+    if VIES_LATENCY:
+        await asyncio.sleep(VIES_LATENCY)
+    return _vies_answer(country_code, number)
+
+
+# --- alter Pfad (Stand vor der Umstellung) ---
+def legacy_is_valid_vat(country_code: str, vat_number: str) -> tuple[bool, str]:
+    try:
+        resp = asyncio.run(run_in_threadpool(_blocking_vies, country_code.upper(), vat_number))
+        return bool(resp["valid"]), "validated"
+    except Exception:
+        return False, "unavailable"
+
+
+def legacy_calculate(payload: CalcRequest) -> CalcResult:
+    valid, status = legacy_is_valid_vat(payload.customer.country_code, payload.customer.vat_number)
+    if valid:
+        return _reverse_charge_result(payload, status, [])
+    rate = get_rate(payload.customer.country_code.upper(), payload.rate_type, payload.supply_date, None)
+    (net,), (vat,), (gross,) = calculate_amounts([payload.amount], [payload.basis], [rate])
+    return _normal_result(payload, rate, net, vat, gross, status, [])
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/before", response_model=CalcResult)
+    def before(payload: CalcRequest):
+        return legacy_calculate(payload)
+
+    @app.post("/after", response_model=CalcResult)
+    async def after(payload: CalcRequest):
+        return await main.handle_calculate_vat(payload)
+
+    return app
+
+
+def _fr_vat_number(i: int) -> str:
+    # gültige Prüfziffern, sonst beantwortet validate_normalized lokal ohne VIES-Aufruf
+    for c in "0123456789":
+        siren = f"{i:08d}{c}"
+        number = f"{int(siren + '12') % 97:02d}{siren}"
+        if check_vat_syntax("FR", number):
+            return f"FR{number}"
+    raise ValueError(i)
+
+
+async def load(app: FastAPI, path: str) -> tuple[float, int]:
+    slots = asyncio.Semaphore(CONCURRENCY)
+    transport = httpx.ASGITransport(app=app)
+    reverse_charged = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            nonlocal reverse_charged
+            body = {"amount": 100, "b2x": "B2B", "supplier": {"country_code": "DE"},
+                    "customer": {"country_code": "FR", "vat_number": _fr_vat_number(i)}}
+            async with slots:
+                r = await client.post(path, json=body)
+            reverse_charged += r.json()["mechanism"] == "reverse_charge"
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+        return time.perf_counter() - start, reverse_charged
+
+
+def main_():
+    global VIES_LATENCY
+    app = build_app()
+    main.vies_client.check_vat = _async_vies
+    for latency in LATENCIES:
+        VIES_LATENCY = latency
+        for path in ("/before", "/after"):
+            seconds, rc = asyncio.run(load(app, path))
+            print(f"VIES {latency * 1e3:4.0f} ms  {path:7s}: {REQUESTS / seconds:8,.0f} req/s "
+                  f"({REQUESTS} Requests, {CONCURRENCY} parallel, {rc} mit Reverse Charge)")
+
+
+if __name__ == "__main__":
+    main_()
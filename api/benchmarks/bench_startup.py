@@ -0,0 +1,71 @@
+# benchmarks/bench_startup.py
+"""
+Kaltstart der App ohne Netz: `import main` und der Lifespan-Start laufen in
+frischen Prozessen, in denen jeder Verbindungsaufbau und jede DNS-Auflösung
+protokolliert und abgewiesen wird. Früher lud main.py beim Import die VIES-WSDL
+(zeep.Client); heute darf dabei kein einziger Netzzugriff passieren, der Start
+gelingt also auch, wenn VIES nicht erreichbar ist.
+
+Aufruf (aus api/):  python -m benchmarks.bench_startup
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+RUNS = 5
+
+# läuft im Kindprozess: Netz sperren, dann importieren bzw. Lifespan starten
+_CHILD = r"""
+import asyncio, json, socket, time
+attempts = []
+
+def _blocked(name):
+    def guard(*args, **kwargs):
+        attempts.append(f"{name}{args[1:2] if name == 'connect' else args[:2]}")
+        raise OSError("network disabled for startup benchmark")
+    return guard
+
+socket.socket.connect = _blocked("connect")
+socket.socket.connect_ex = _blocked("connect")
+socket.getaddrinfo = _blocked("getaddrinfo")
+socket.create_connection = _blocked("create_connection")
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def lifespan():
+    async with main.lifespan(main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(lifespan())
+print(json.dumps({"import": imported - started, "lifespan": ready - imported, "attempts": attempts}))
+"""
+
+
+def _cold_start() -> dict:
+    # ohne Job-Worker: deren Poll-Schleife fragt nach dem Start (gewollt) Postgres ab
+    env = {**os.environ, "VALIDATION_JOB_WORKERS": "0", "RATES_RELOAD_INTERVAL_SECONDS": "0"}
+    out = subprocess.run([sys.executable, "-c", _CHILD], cwd=API_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = [_cold_start() for _ in range(RUNS)]
+    attempts = [a for run in runs for a in run["attempts"]]
+    assert not attempts, f"network access during startup: {attempts}"
+
+    imports = [run["import"] for run in runs]
+    lifespans = [run["lifespan"] for run in runs]
+    print(f"import main:     median {statistics.median(imports) * 1e3:7.1f} ms  (max {max(imports) * 1e3:.1f} ms)")
+    print(f"lifespan start:  median {statistics.median(lifespans) * 1e3:7.1f} ms  (max {max(lifespans) * 1e3:.1f} ms)")
+    print(f"network attempts during import + lifespan: {len(attempts)} in {RUNS} cold starts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_tedb_loader.py
+"""
+Offline-Benchmark für scripts/load_vat_rates.py: alle Mitgliedstaaten aus
+aufgezeichneten (hier: aus data/*.json erzeugten) TEDB-Responses mit simulierter
+Dienst-Latenz laden – sequentiell vs. parallel – und prüfen, dass ein zweiter
+Lauf ohne Änderungen keine Datei neu schreibt.
+
+Aufruf (aus api/):  python -m benchmarks.bench_tedb_loader
+"""
+import shutil
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from load_vat_rates import HISTORY_FROM, RecordedTedbSource, run  # noqa: E402
+from tedb_fixtures import write_recordings  # noqa: E402
+
+LATENCY = 0.05  # Sekunden pro TEDB-Aufruf
+SITUATION_ON = date(2025, 9, 1)
+
+
+def _fresh_data_dir(tmp: Path) -> Path:
+    data_dir = tmp / "data"
+    data_dir.mkdir(parents=True)
+    for p in (SCRIPTS_DIR / "data").glob("??.json"):
+        shutil.copy(p, data_dir / p.name)
+    return data_dir
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        recordings = tmp / "recordings"
+        write_recordings(recordings, SCRIPTS_DIR / "data", SITUATION_ON,
+                         period_from=HISTORY_FROM, period_to=SITUATION_ON, years=5)
+        source = RecordedTedbSource(recordings, latency=LATENCY)
+
+        for workers in (1, 4, 8):
+            data_dir = _fresh_data_dir(tmp / f"w{workers}")
+            stats = run(source, data_dir, workers=workers, situation_on=SITUATION_ON)
+            again = run(source, data_dir, workers=workers, situation_on=SITUATION_ON)
+            print(f"workers={workers}: {stats['seconds']:6.2f}s for {stats['countries']} countries "
+                  f"({2 * stats['countries']} TEDB calls à {LATENCY * 1e3:.0f} ms), "
+                  f"{len(stats['written'])} files written; rerun: {len(again['written'])} written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_tedb_parser.py
+"""
+Streaming-Parser (iterparse) vs. bisheriger XPath-Parser auf einer großen,
+aufgezeichneten Mehrjahres-Periodenabfrage (alle Länder, YEARS Jahre).
+
+Aufruf (aus api/):  python -m benchmarks.bench_tedb_parser
+"""
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from load_vat_rates import parse_vat_rates_response, parse_vat_rates_response_xpath  # noqa: E402
+from tedb_fixtures import history_records, render_response  # noqa: E402
+
+YEARS = 25
+
+
+def _large_response() -> bytes:
+    records = []
+    for p in sorted((SCRIPTS_DIR / "data").glob("??.json")):
+        records.extend(history_records(json.loads(p.read_bytes()), date(2000, 1, 1), date(2025, 7, 1), YEARS))
+    return render_response("EU", records)
+
+
+def _rss_growth(fn, content, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    fn(content)
+    queue.put(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+
+
+def _peak_kb(fn, content) -> int:
+    # eigener Prozess je Parser, damit sich die Spitzen nicht überlagern (inkl. lxml-C-Speicher)
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_rss_growth, args=(fn, content, queue))
+    proc.start()
+    growth = queue.get()
+    proc.join()
+    return growth
+
+
+def _measure(fn, content):
+    started = time.perf_counter()
+    result = fn(content)
+    seconds = time.perf_counter() - started
+    return result, seconds, _peak_kb(fn, content)
+
+
+def main():
+    content = _large_response()
+    old, old_s, old_peak = _measure(parse_vat_rates_response_xpath, content)
+    new, new_s, new_peak = _measure(parse_vat_rates_response, content)
+    assert new == old
+
+    print(f"response: {len(content) / 1e6:.1f} MB, {len(new)} vatRateResults ({YEARS} years)")
+    print(f"xpath:     {old_s * 1e3:8.1f} ms, peak RSS growth {old_peak / 1e3:6.1f} MB")
+    print(f"iterparse: {new_s * 1e3:8.1f} ms, peak RSS growth {new_peak / 1e3:6.1f} MB")
+    print(f"speedup:   {old_s / new_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
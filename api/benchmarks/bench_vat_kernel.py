@@ -0,0 +1,89 @@
+# benchmarks/bench_vat_kernel.py
+"""
+Rechenkern im Vergleich (Positionen pro Sekunde und Abweichungen gegen Decimal):
+  - float:   bisheriger Pfad, round(net * rate, 2) je Position (Satz hier korrekt /100)
+  - decimal: Decimal-Referenz, quantize() je Position
+  - kernel:  vat_kernel.calculate_amounts (float rein/raus, inkl. Cent-Konvertierung)
+  - lines:   vat_kernel.calculate_lines auf bereits ganzzahligen Cent-Spalten
+
+Zusätzlich: Drift beim Aufsummieren der float-Ergebnisse gegenüber der Cent-Summe.
+
+Aufruf (aus api/):  python -m benchmarks.bench_vat_kernel
+"""
+import random
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from vat_kernel import calculate_amounts, calculate_lines, rate_multiplier, to_minor
+
+N = 500_000
+RATES = [0.0, 5.5, 7.0, 10.0, 19.0, 20.0, 21.0, 25.5]
+CENT = Decimal("0.01")
+
+
+def float_path(amounts, bases, rates):
+    nets, vats, grosses = [], [], []
+    for amount, basis, rate in zip(amounts, bases, rates):
+        r = rate / 100
+        if basis == "net":
+            net = round(amount, 2)
+            vat = round(net * r, 2)
+            gross = round(net + vat, 2)
+        else:
+            gross = round(amount, 2)
+            net = round(gross / (1 + r), 2)
+            vat = round(gross - net, 2)
+        nets.append(net)
+        vats.append(vat)
+        grosses.append(gross)
+    return nets, vats, grosses
+
+
+def decimal_path(amounts, bases, rates):
+    nets, vats, grosses = [], [], []
+    for amount, basis, rate in zip(amounts, bases, rates):
+        value = Decimal(repr(amount)).quantize(CENT, rounding=ROUND_HALF_UP)
+        r = Decimal(repr(rate)) / 100
+        if basis == "net":
+            vat = (value * r).quantize(CENT, rounding=ROUND_HALF_UP)
+            nets.append(value), vats.append(vat), grosses.append(value + vat)
+        else:
+            net = (value / (1 + r)).quantize(CENT, rounding=ROUND_HALF_UP)
+            nets.append(net), vats.append(value - net), grosses.append(value)
+    return nets, vats, grosses
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    rng = random.Random(13)
+    amounts = [rng.randint(1, 5_000_000) / 1000 for _ in range(N)]  # 3 Nachkommastellen -> viele halbe Cent
+    bases = [rng.choice(("net", "gross")) for _ in range(N)]
+    rates = [rng.choice(RATES) for _ in range(N)]
+    minor = [to_minor(a) for a in amounts]
+    multipliers = [rate_multiplier(r) for r in rates]
+
+    t_float, (_, f_vats, _) = timed(float_path, amounts, bases, rates)
+    t_dec, (_, d_vats, _) = timed(decimal_path, amounts, bases, rates)
+    t_kernel, (_, k_vats, _) = timed(calculate_amounts, amounts, bases, rates)
+    t_lines, (_, l_vats, _) = timed(calculate_lines, minor, bases, multipliers)
+
+    for name, seconds in (("float", t_float), ("decimal", t_dec), ("kernel", t_kernel), ("lines", t_lines)):
+        print(f"{name:8s}: {seconds:6.3f}s  {N / seconds:>12,.0f} Positionen/s")
+
+    float_mismatch = sum(Decimal(repr(f)) != d for f, d in zip(f_vats, d_vats))
+    kernel_mismatch = sum(Decimal(repr(k)) != d for k, d in zip(k_vats, d_vats))
+    print(f"Abweichungen vs. Decimal (vat je Position): float {float_mismatch:,}, kernel {kernel_mismatch:,}")
+
+    exact_total = sum(d_vats)
+    float_total = sum(f_vats)
+    cents_total = Decimal(sum(l_vats)) / 100
+    print(f"Summe vat: Decimal {exact_total}, Cent-Kernel {cents_total}, float-Summe {float_total!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# benchmarks/bench_vies_client.py
+"""
+VIES-Client unter Last gegen den lokalen Stand-in (scripts/vies_standin.py):
+  - vorher: zeep.Client (requests, WSDL beim Start) im Threadpool + XPath-Parse
+  - nachher: vies_client.ViesClient (httpx.AsyncClient, Keep-Alive-Pool)
+
+Gemessen werden Durchsatz, Latenz-Perzentile (inkl. Wartezeit auf Threadpool
+bzw. Pool-Verbindung) und CPU-Zeit des Client-Prozesses pro Request bei steigender
+Parallelität, dazu die Wartezeit anderer Threadpool-Arbeit (Sync-Endpoints,
+Batch-Validierung) während der Last. Der Stand-in läuft in einem eigenen Prozess; auf wenigen Kernen
+teilen sich beide die CPU, dann ist CPU/Request die aussagekräftige Zahl.
+
+Aufruf (aus api/):  python -m benchmarks.bench_vies_client
+"""
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from vies_client import ViesClient, parse_check_vat_response  # noqa: E402
+from vies_standin import endpoint_url, start_in_background  # noqa: E402
+
+PORT = 8731
+LATENCY = 0.05  # Sekunden pro checkVat im Stand-in
+REQUESTS = 2_000
+CONCURRENCIES = (20, 100, 400)
+
+
+def legacy_client(endpoint: str):
+    from zeep import Client, Settings
+    from zeep.transports import Transport
+    settings = Settings(strict=False, xml_huge_tree=True, raw_response=True)
+    return Client(wsdl=f"{endpoint}?wsdl", settings=settings, transport=Transport(timeout=10))
+
+
+def legacy_check(client, country_code: str, number: str):
+    resp = client.service.checkVat(countryCode=country_code, vatNumber=number)
+    return parse_check_vat_response(resp.content)
+
+
+def _noop() -> None:
+    pass
+
+
+async def probe_threadpool(waits: list[float], done: asyncio.Event) -> None:
+    """Misst, wie lange ein trivialer Threadpool-Job auf einen freien Thread wartet."""
+    while not done.is_set():
+        t0 = time.perf_counter()
+        await run_in_threadpool(_noop)
+        waits.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+
+
+async def load(call, concurrency: int) -> tuple[float, float, list[float], list[float]]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    waits: list[float] = []
+    done = asyncio.Event()
+
+    async def one(i: int):
+        async with slots:
+            t0 = time.perf_counter()
+            result = await call("DE", f"{i:09d}1")
+            latencies.append(time.perf_counter() - t0)
+            assert result["valid"]
+
+    probe = asyncio.create_task(probe_threadpool(waits, done))
+    start, cpu = time.perf_counter(), time.process_time()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    seconds, cpu = time.perf_counter() - start, time.process_time() - cpu
+    done.set()
+    await probe
+    return seconds, cpu, latencies, waits
+
+
+def report(label: str, concurrency: int, seconds: float, cpu: float, latencies: list[float],
+           waits: list[float]) -> None:
+    q = statistics.quantiles(latencies, n=100)
+    w = statistics.quantiles(waits, n=100)
+    print(f"{label:7s} {concurrency:4d} parallel: {REQUESTS / seconds:7,.0f} req/s  "
+          f"p50 {q[49] * 1e3:6.1f} ms  p99 {q[98] * 1e3:7.1f} ms  CPU {cpu / REQUESTS * 1e3:5.2f} ms/Request  "
+          f"Threadpool-Wartezeit p99 {w[98] * 1e3:6.1f} ms")
+
+
+async def run_new(endpoint: str, concurrency: int):
+    client = ViesClient(endpoint=endpoint, max_connections=min(concurrency, 50))
+    try:
+        return await load(client.check_vat, concurrency)
+    finally:
+        await client.aclose()
+
+
+async def run_legacy(client, concurrency: int):
+    async def call(cc: str, num: str):
+        return await run_in_threadpool(legacy_check, client, cc, num)
+    return await load(call, concurrency)
+
+
+def main():
+    logging.getLogger("urllib3").setLevel(logging.ERROR)  # "Connection pool is full" bei >10 Threads
+    server = start_in_background(PORT, latency=LATENCY)
+    try:
+        endpoint = endpoint_url(PORT)
+        zeep_client = legacy_client(endpoint)
+        print(f"VIES stand-in: {LATENCY * 1e3:.0f} ms pro checkVat, {REQUESTS} Requests je Lauf")
+        for concurrency in CONCURRENCIES:
+            report("before", concurrency, *asyncio.run(run_legacy(zeep_client, concurrency)))
+            report("after", concurrency, *asyncio.run(run_new(endpoint, concurrency)))
+    finally:
+        server.terminate()
+        server.join()
+
+
+if __name__ == "__main__":
+    main()
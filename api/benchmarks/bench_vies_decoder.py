@@ -0,0 +1,50 @@
+# benchmarks/bench_vies_decoder.py
+"""
+VIES-Antwort-Decoder: ein Durchlauf mit vorab gebauten Clark-Namen
+(parse_check_vat_response) vs. bisheriger Parser mit einem XPath-Scan je Feld
+(parse_check_vat_response_xpath), auf dem Fixture-Korpus scripts/data/vies/.
+
+Aufruf (aus api/):  python -m benchmarks.bench_vies_decoder
+"""
+import time
+from pathlib import Path
+
+from vies_client import ViesFault, parse_check_vat_response, parse_check_vat_response_xpath
+
+CORPUS_DIR = Path(__file__).resolve().parent.parent / "scripts" / "data" / "vies"
+ROUNDS = 2_000
+
+
+def _decode(parse, content):
+    try:
+        return parse(content)
+    except ViesFault as e:
+        return e.code
+
+
+def _per_call_us(parse, contents) -> float:
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        for content in contents:
+            _decode(parse, content)
+    return (time.perf_counter() - started) / (ROUNDS * len(contents)) * 1e6
+
+
+def main():
+    corpus = {p.name: p.read_bytes() for p in sorted(CORPUS_DIR.glob("*.xml"))}
+    for content in corpus.values():
+        assert _decode(parse_check_vat_response, content) == _decode(parse_check_vat_response_xpath, content)
+
+    groups = {
+        "responses": [c for name, c in corpus.items() if not name.startswith("fault_")],
+        "faults": [c for name, c in corpus.items() if name.startswith("fault_")],
+    }
+    print(f"corpus: {len(corpus)} responses, {ROUNDS} rounds")
+    for label, contents in groups.items():
+        old = _per_call_us(parse_check_vat_response_xpath, contents)
+        new = _per_call_us(parse_check_vat_response, contents)
+        print(f"{label:9s}  xpath {old:6.1f} µs/call   single-pass {new:6.1f} µs/call   speedup {old / new:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# calc_stream.py
+"""
+Streaming-Berechnung für große Rechnungsdateien (/v1/calculate/stream):
+der Request-Body (NDJSON oder CSV) wird zeilenweise gelesen, in Chunks fester
+Größe berechnet und jedes Chunk-Ergebnis sofort zurückgestreamt. Der Speicher-
+bedarf hängt damit von STREAM_CHUNK_ITEMS ab, nicht von der Dateigröße.
+
+CSV: erste Zeile = Header mit den Spalten aus CSV_COLUMNS (Reihenfolge egal),
+ein Datensatz pro Zeile.
+
+Quota: vor jedem Chunk wird über `reserve` gebucht; reicht das Kontingent nicht,
+werden nur die gedeckten Zeilen berechnet und der Stream endet mit einem
+429-Datensatz. Bricht der Client ab, sind die bereits gelieferten Chunks gebucht.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from calculate import CalcBatchItem
+
+STREAM_CHUNK_ITEMS = 1_000
+MAX_LINE_BYTES = 64 * 1024
+QUOTA_EXCEEDED = "Monthly quota exceeded"
+
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+CSV_COLUMNS = (
+    "amount", "basis", "rate_type", "supply_date", "supply_type", "b2x", "category_hint",
+    "supplier_country", "supplier_vat", "customer_country", "customer_vat",
+)
+REQUIRED_CSV_COLUMNS = frozenset({"amount", "supplier_country", "customer_country"})
+RESULT_CSV_COLUMNS = (
+    "index", "country_code", "applied_rate", "net", "vat", "gross",
+    "mechanism", "vat_check_status", "messages", "error", "status_code",
+)
+
+
+class StreamFormatError(Exception):
+    pass
+
+
+def stream_format(content_type: str) -> Optional[str]:
+    ct = content_type.split(";", 1)[0].strip().lower()
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "ndjson"
+    if ct in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line: int = MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Zerlegt einen Byte-Stream in Zeilen; puffert höchstens eine (begrenzte) Teilzeile."""
+    rest = b""
+    async for data in chunks:
+        if not data:
+            continue
+        lines = (rest + data).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line
+        if len(rest) > max_line:
+            raise StreamFormatError(f"Line exceeds {max_line} bytes")
+    if rest:
+        yield rest
+
+
+# --- Parsen (läuft im Threadpool, zusammen mit der Berechnung) ---
+
+def _parse_ndjson(lines: list[bytes]) -> list[Any]:
+    items: list[Any] = []
+    for line in lines:
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            items.append(StreamFormatError(f"Invalid JSON: {e}"))
+    return items
+
+
+def csv_row_to_item(row: dict[str, Optional[str]]) -> dict[str, Any]:
+    item: dict[str, Any] = {
+        k: row[k] for k in ("amount", "basis", "rate_type", "supply_date", "supply_type", "b2x", "category_hint")
+        if row.get(k)
+    }
+    item["supplier"] = {"country_code": row.get("supplier_country"), "vat_number": row.get("supplier_vat") or None}
+    item["customer"] = {"country_code": row.get("customer_country"), "vat_number": row.get("customer_vat") or None}
+    return item
+
+
+def _parse_csv(lines: list[bytes], header: list[str]) -> list[Any]:
+    reader = csv.DictReader((line.decode("utf-8", errors="replace") for line in lines), fieldnames=header)
+    return [csv_row_to_item(row) for row in reader]
+
+
+def _parse_csv_header(line: bytes) -> list[str]:
+    header = [h.strip().lower() for h in next(csv.reader([line.decode("utf-8-sig")]))]
+    missing = REQUIRED_CSV_COLUMNS - set(header)
+    if missing:
+        raise StreamFormatError(f"CSV header misses column(s): {', '.join(sorted(missing))}")
+    return header
+
+
+# --- Ausgabe ---
+
+def _render_ndjson(items: list[CalcBatchItem]) -> bytes:
+    return "".join(item.model_dump_json() + "\n" for item in items).encode("utf-8")
+
+
+def _render_csv(items: list[CalcBatchItem]) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for item in items:
+        r = item.result
+        writer.writerow([
+            item.index,
+            *((r.country_code, r.applied_rate, r.net, r.vat, r.gross, r.mechanism,
+               r.vat_check_status or "", " | ".join(r.messages)) if r else ("",) * 8),
+            item.error or "",
+            item.status_code or "",
+        ])
+    return out.getvalue().encode("utf-8")
+
+
+_RENDER = {"ndjson": _render_ndjson, "csv": _render_csv}
+
+
+def render_items(fmt: str, items: list[CalcBatchItem]) -> bytes:
+    return _RENDER[fmt](items)
+
+
+def _parse_chunk(fmt: str, header: Optional[list[str]], lines: list[bytes]) -> list[Any]:
+    return _parse_ndjson(lines) if fmt == "ndjson" else _parse_csv(lines, header)
+
+
+def _render_chunk(fmt: str, parsed: list[Any], results: list[CalcBatchItem], start: int) -> bytes:
+    results_iter = iter(results)
+    items: list[CalcBatchItem] = []
+    for offset, p in enumerate(parsed):
+        if isinstance(p, StreamFormatError):
+            item = CalcBatchItem(index=start + offset, error=str(p), status_code=400)
+        else:
+            item = next(results_iter)
+            item.index = start + offset
+        items.append(item)
+    return render_items(fmt, items)
+
+
+async def _process_chunk(fmt: str, header: Optional[list[str]], lines: list[bytes], start: int,
+                         calculate: Callable[[list[Any]], Awaitable[list[CalcBatchItem]]]) -> bytes:
+    # Parsen/Rendern im Threadpool; calculate() verteilt selbst zwischen Loop (VIES) und Threadpool
+    parsed = await run_in_threadpool(_parse_chunk, fmt, header, lines)
+    results = await calculate([p for p in parsed if not isinstance(p, StreamFormatError)])
+    return await run_in_threadpool(_render_chunk, fmt, parsed, results, start)
+
+
+async def stream_calculation(
+    body: AsyncIterator[bytes],
+    fmt: str,
+    calculate: Callable[[list[Any]], Awaitable[list[CalcBatchItem]]],
+    chunk_items: int = STREAM_CHUNK_ITEMS,
+    max_line: int = MAX_LINE_BYTES,
+    reserve: Optional[Callable[[int], Awaitable[int]]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Liest `body` zeilenweise, rechnet je `chunk_items` Zeilen und gibt das
+    Ergebnis des Chunks sofort aus. Formatfehler mitten im Stream (der Status ist dann schon
+    gesendet) werden als letzter Datensatz gemeldet. `reserve(n)` bucht vor jedem Chunk
+    bis zu n Einheiten und gibt die gebuchte Anzahl zurück; weniger als n beendet den
+    Stream nach den gedeckten Zeilen mit einem 429-Datensatz.
+    """
+    header: Optional[list[str]] = None
+    chunk: list[bytes] = []
+    count = 0
+    error: Optional[StreamFormatError] = None
+    exhausted = False
+
+    async def allowed(n: int) -> int:
+        return n if reserve is None else await reserve(n)
+
+    if fmt == "csv":
+        yield (",".join(RESULT_CSV_COLUMNS) + "\n").encode("utf-8")
+
+    try:
+        async for line in iter_lines(body, max_line):
+            line = line.rstrip(b"\r")
+            if not line.strip():
+                continue
+            if fmt == "csv" and header is None:
+                header = _parse_csv_header(line)
+                continue
+            chunk.append(line)
+            if len(chunk) >= chunk_items:
+                granted = await allowed(len(chunk))
+                if granted:
+                    yield await _process_chunk(fmt, header, chunk[:granted], count, calculate)
+                    count += granted
+                if granted < len(chunk):
+                    exhausted = True
+                    break
+                chunk = []
+    except StreamFormatError as e:
+        error = e
+
+    if chunk and not exhausted:
+        granted = await allowed(len(chunk))
+        if granted:
+            yield await _process_chunk(fmt, header, chunk[:granted], count, calculate)
+            count += granted
+        exhausted = granted < len(chunk)
+    if exhausted:
+        yield render_items(fmt, [CalcBatchItem(index=count, error=QUOTA_EXCEEDED, status_code=429)])
+    elif error is not None:
+        yield render_items(fmt, [CalcBatchItem(index=count, error=str(error), status_code=400)])
@@ -1,7 +1,23 @@
+import asyncio
+from collections import OrderedDict
 from datetime import date
 from fastapi import HTTPException
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Awaitable, Callable, Dict, Optional, Literal
+
+from rate_store import rate_repository
+from validate_vat import EU_COUNTRY_CODES
+from vat_kernel import DEFAULT_ROUNDING, Rounding, calculate_amounts, from_minor, to_minor
+
+# Obergrenze für /v1/calculate/batch (Positionen pro Request)
+MAX_BATCH_ITEMS = 5_000
+BATCH_VIES_CONCURRENCY = 8  # parallele VIES-Prüfungen je Batch/Stream
+# Einträge je Cache eines BatchCalculators; ein Stream lebt lange, Kunden und Kategorien kommen vom Client
+BATCH_CACHE_ENTRIES = 10_000
+
+# (country_code, vat_number) -> (gültig?, vat_check_status); online: main.is_valid_vat, offline: scripts/bulk_calculate.py
+VatValidator = Callable[[str, Optional[str]], Awaitable[tuple[bool, str]]]
 
 # --- Domain models ---
 class Party(BaseModel):
@@ -18,6 +34,7 @@ class CalcRequest(BaseModel):
     supply_type: Literal["goods", "services"] = "goods"
     b2x: Literal["B2C", "B2B"] = "B2C"
     category_hint: Optional[str] = Field(None, description="z.B. ebooks, hospitality, food")
+    rounding_mode: Literal["half_up", "half_even"] = Field("half_up", description="Rundung auf Cent (im Batch gilt die Angabe des Batches)")
 
 class CalcResult(BaseModel):
     country_code: str
@@ -28,3 +45,274 @@ class CalcResult(BaseModel):
     mechanism: Literal["normal", "reverse_charge", "zero_rated", "out_of_scope"]
     messages: list[str] = []
     vat_check_status: Optional[Literal["validated","unavailable","n/a"]] = None
+
+# --- Batch ---
+class CalcBatchRequest(BaseModel):
+    # Items werden einzeln validiert, damit ein fehlerhaftes Item nicht den ganzen Batch abweist
+    items: list[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS,
+                                        description="CalcRequest-Objekte, Reihenfolge bleibt erhalten")
+    rounding_mode: Literal["half_up", "half_even"] = "half_up"
+    rounding_scope: Literal["line", "invoice"] = Field(
+        "line", description="line: jede Position einzeln; invoice: Steuer je Land/Satz auf die Summe, auf Positionen verteilt")
+
+class CalcBatchItem(BaseModel):
+    index: int
+    result: Optional[CalcResult] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+class CalcBatchResult(BaseModel):
+    count: int
+    errors: int
+    results: list[CalcBatchItem]
+
+
+def batch_item_count(body: bytes, model: type[BaseModel] = CalcBatchRequest) -> int:
+    """
+    Quota-Kosten eines Batch-Requests = Anzahl Items. Ein Body, den `model` abweist (zu viele
+    Items, Schemafehler, kaputtes JSON), endet mit 422 und kostet nur 1 Einheit.
+    """
+    try:
+        return len(model.model_validate_json(body).items)
+    except ValidationError:
+        return 1
+
+
+# --- Regeln (API, Batch/Stream und Offline-CLI) ---
+def get_rate(country_code: str, rate_type: str, supply_date: date, category_hint: Optional[str]) -> float:
+    cc = country_code.upper()
+    if cc not in EU_COUNTRY_CODES:
+        raise HTTPException(status_code=400, detail=f"Invalid country code: {cc}")
+    
+    history = rate_repository.get_rate_source(cc)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No rates available for {cc}")
+
+    found_rate = None
+    if category_hint:
+        # Reduzierte Sätze der Kategorie (ID oder Alias), die am Leistungsdatum galten
+        matches = history.category_rates_on(category_hint, supply_date)
+        if matches:
+            found_rate = matches[0].rate
+        
+    if found_rate:
+        return found_rate
+    else:
+        if rate_type == "standard":
+            standard_rate = history.standard_rate_on(supply_date)
+            if standard_rate is None:
+                raise HTTPException(status_code=404, detail=f"No rates found for {cc} on {supply_date.isoformat()}")
+            return standard_rate
+        else:
+            raise HTTPException(status_code=404, detail="Rate not found for country/rate_type")
+
+
+async def should_reverse_charge(supplier: Party, customer: Party, b2x: str,
+                                validator: VatValidator) -> tuple[bool, str, list[str]]:
+    notes = []
+    if b2x != "B2B":
+        return False, "n/a", notes
+    if supplier.country_code.upper() == customer.country_code.upper():
+        return False, "n/a", notes
+    if supplier.country_code.upper() not in EU_COUNTRY_CODES or customer.country_code.upper() not in EU_COUNTRY_CODES:
+        notes.append("No EU intra-community supply → no reverse charge.")
+        return False, "n/a", notes
+    valid, status = await validator(customer.country_code, customer.vat_number)
+    if not valid:
+        notes.append("Customer VAT number invalid or unavailable → Reverse Charge not applied.")
+    return valid, status, notes
+
+
+def _reverse_charge_result(payload: CalcRequest, vat_status: str, messages: list[str],
+                           rounding: Rounding = DEFAULT_ROUNDING) -> CalcResult:
+    net = from_minor(to_minor(payload.amount, rounding.mode))  # unabhängig von basis, unter RC gibt's keine inländische VAT
+    return CalcResult(
+        country_code=payload.customer.country_code.upper(),
+        applied_rate=0.0,
+        net=net,
+        vat=0.0,
+        gross=net,
+        mechanism="reverse_charge",
+        messages=messages + ["Reverse Charge applied; invoice net without VAT."],
+        vat_check_status=vat_status,
+    )
+
+
+def _normal_result(payload: CalcRequest, rate: float, net: float, vat: float, gross: float,
+                   vat_status: str, messages: list[str]) -> CalcResult:
+    mechanism: Literal["normal","reverse_charge","zero_rated","out_of_scope"] = "normal"
+    if rate == 0.0:
+        mechanism = "zero_rated"
+
+    # Wenn B2B aber kein RC möglich war, Hinweise mitgeben
+    if payload.b2x == "B2B" and payload.supplier.country_code.upper() != payload.customer.country_code.upper():
+        messages.append("No Reverse Charge applied; VAT charged normally.")
+
+    return CalcResult(
+        country_code=payload.customer.country_code.upper(),
+        applied_rate=rate,
+        net=net,
+        vat=vat,
+        gross=gross,
+        mechanism=mechanism,
+        messages=messages,
+        vat_check_status=vat_status if vat_status != "n/a" else None,
+    )
+
+
+async def calculate_item(payload: CalcRequest, validator: VatValidator) -> CalcResult:
+    messages: list[str] = []
+    should_rc, vat_status, rc_notes = await should_reverse_charge(payload.supplier, payload.customer, payload.b2x, validator)
+    messages += rc_notes
+
+    rounding = Rounding(mode=payload.rounding_mode)
+    if should_rc:
+        return _reverse_charge_result(payload, vat_status, messages, rounding)
+
+    rate = get_rate(
+        country_code=payload.customer.country_code.upper(),
+        rate_type=payload.rate_type,
+        supply_date=payload.supply_date,
+        category_hint=payload.category_hint,
+    )
+    (net,), (vat,), (gross,) = calculate_amounts([payload.amount], [payload.basis], [rate], rounding)
+    return _normal_result(payload, rate, net, vat, gross, vat_status, messages)
+
+
+def validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in exc.errors()
+    )
+
+
+class _LruCache:
+    """Kleiner LRU ohne TTL; hält höchstens max_entries Einträge."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> Any:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class BatchCalculator:
+    """
+    Wie calculate_item für viele Positionen:
+    VIES-Prüfung je (Lieferant, Kunde, USt-IdNr.) und Steuersatz je (Land, Satzart, Datum, Kategorie)
+    nur einmal – auch über mehrere Chunks eines Streams hinweg (LRU, begrenzt auf cache_entries) –,
+    Beträge spaltenweise. Fehler landen am jeweiligen Item statt den Batch abzubrechen.
+
+    Validierung und Rechnen laufen im Threadpool, die VIES-Prüfungen nebenläufig auf dem Event-Loop.
+    """
+
+    def __init__(self, validator: VatValidator, rounding: Rounding = DEFAULT_ROUNDING,
+                 vies_concurrency: int = BATCH_VIES_CONCURRENCY, cache_entries: int = BATCH_CACHE_ENTRIES):
+        self.validator = validator
+        self.rounding = rounding
+        # (Lieferant, Kunde, b2x, USt-IdNr.) -> (Reverse Charge?, vat_status, notes)
+        self.reverse_charge = _LruCache(cache_entries)
+        # (Land, Satzart, Datum, Kategorie) -> Satz oder HTTPException
+        self.rates = _LruCache(cache_entries)
+        self._vies_slots = asyncio.Semaphore(vies_concurrency)
+
+    async def calculate(self, raw_items: list[Any]) -> list[CalcBatchItem]:
+        parsed = await run_in_threadpool(self._validate, raw_items)
+        reverse_charge = await self._resolve_reverse_charge([p for p in parsed if isinstance(p, CalcRequest)])
+        return await run_in_threadpool(self._compute, parsed, reverse_charge)
+
+    @staticmethod
+    def _rc_key(req: CalcRequest) -> tuple:
+        return (req.supplier.country_code.upper(), req.customer.country_code.upper(), req.b2x, req.customer.vat_number)
+
+    @staticmethod
+    def _validate(raw_items: list[Any]) -> list[CalcRequest | CalcBatchItem]:
+        parsed: list[CalcRequest | CalcBatchItem] = []
+        for i, raw in enumerate(raw_items):
+            try:
+                parsed.append(CalcRequest.model_validate(raw))
+            except ValidationError as e:
+                parsed.append(CalcBatchItem(index=i, error=validation_message(e), status_code=422))
+        return parsed
+
+    async def _resolve_reverse_charge(self, requests: list[CalcRequest]) -> dict[tuple, tuple[bool, str, list[str]]]:
+        """Ergebnisse für genau diese Items – der LRU kann sie später wieder verdrängen."""
+        resolved: dict[tuple, tuple[bool, str, list[str]]] = {}
+        pending: dict[tuple, CalcRequest] = {}
+        for req in requests:
+            key = self._rc_key(req)
+            if key in resolved or key in pending:
+                continue
+            cached = self.reverse_charge.get(key)
+            if cached is not None:
+                resolved[key] = cached
+            else:
+                pending[key] = req
+
+        async def resolve(key: tuple, req: CalcRequest):
+            async with self._vies_slots:
+                resolved[key] = await should_reverse_charge(req.supplier, req.customer, req.b2x, self.validator)
+            self.reverse_charge.put(key, resolved[key])
+
+        await asyncio.gather(*(resolve(key, req) for key, req in pending.items()))
+        return resolved
+
+    def _compute(self, parsed: list[CalcRequest | CalcBatchItem],
+                 reverse_charge: dict[tuple, tuple[bool, str, list[str]]]) -> list[CalcBatchItem]:
+        items: list[CalcBatchItem] = []
+        rates: dict[tuple, float | HTTPException] = {}
+
+        # Positionen mit normaler Besteuerung: (index, request, rate, vat_status, notes)
+        pending: list[tuple[int, CalcRequest, float, str, list[str]]] = []
+
+        for i, req in enumerate(parsed):
+            if isinstance(req, CalcBatchItem):
+                items.append(req)
+                continue
+            item = CalcBatchItem(index=i)
+            items.append(item)
+
+            should_rc, vat_status, rc_notes = reverse_charge[self._rc_key(req)]
+            if should_rc:
+                item.result = _reverse_charge_result(req, vat_status, list(rc_notes), self.rounding)
+                continue
+
+            rate_key = (req.customer.country_code.upper(), req.rate_type, req.supply_date, req.category_hint)
+            rate = rates.get(rate_key)
+            if rate is None:
+                rate = self.rates.get(rate_key)
+                if rate is None:
+                    try:
+                        rate = get_rate(*rate_key)
+                    except HTTPException as e:
+                        rate = e
+                    self.rates.put(rate_key, rate)
+                rates[rate_key] = rate
+            if isinstance(rate, HTTPException):
+                item.error, item.status_code = str(rate.detail), rate.status_code
+                continue
+
+            pending.append((i, req, rate, vat_status, list(rc_notes)))
+
+        nets, vats, grosses = calculate_amounts(
+            [req.amount for _, req, _, _, _ in pending],
+            [req.basis for _, req, _, _, _ in pending],
+            [rate for _, _, rate, _, _ in pending],
+            self.rounding,
+            groups=[req.customer.country_code.upper() for _, req, _, _, _ in pending],
+        )
+        for (i, req, rate, vat_status, notes), net, vat, gross in zip(pending, nets, vats, grosses):
+            items[i].result = _normal_result(req, rate, net, vat, gross, vat_status, notes)
+        return items
@@ -43,6 +43,39 @@ class Settings(BaseSettings):
 
     SLACK_WEBHOOK_URL: str
 
+    # VIES checkVat (httpx-Pool, siehe vies_client.py)
+    VIES_ENDPOINT: str = "https://ec.europa.eu/taxation_customs/vies/services/checkVatService"
+    VIES_MAX_CONNECTIONS: int = 50
+    VIES_TIMEOUT_SECONDS: float = 10.0
+    VIES_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # VIES-Ergebnis-Cache (LRU + Tabelle vies_results); ungültige Nummern kürzer cachen
+    VIES_CACHE_VALID_TTL_SECONDS: float = 24 * 3600
+    VIES_CACHE_INVALID_TTL_SECONDS: float = 3600
+    VIES_CACHE_MAX_ENTRIES: int = 100_000
+    # Circuit-Breaker + AIMD-Limit pro Mitgliedstaat (vies_breaker.py)
+    VIES_BREAKER_FAILURE_THRESHOLD: int = 5
+    VIES_BREAKER_OPEN_SECONDS: float = 30.0
+    VIES_COUNTRY_INITIAL_LIMIT: int = 10
+    VIES_COUNTRY_MAX_LIMIT: int = 50
+    # Aufrufe über dem Limit warten so lange (Sekunden) und so viele je Land, bevor sie 503 bekommen
+    VIES_COUNTRY_QUEUE_SIZE: int = 100
+    VIES_COUNTRY_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    # Massenprüfungs-Jobs (validation_jobs.py): Worker-Tasks je App-Prozess (0 = keine)
+    VALIDATION_JOB_WORKERS: int = 2
+    VALIDATION_JOB_MAX_ATTEMPTS: int = 6
+    VALIDATION_JOB_WEBHOOK_SECRET: str | None = None  # HMAC-SHA256 über den Callback-Body
+
+    # API-Key-Cache der Quota-Middleware (api_key_cache.py); TTL begrenzt, wie lange ein in einem
+    # anderen Worker widerrufener Key noch akzeptiert wird (0 = kein Cache)
+    API_KEY_CACHE_TTL_SECONDS: float = 60.0
+    API_KEY_CACHE_MAX_ENTRIES: int = 10_000
+
+    # Bearer-Token für /api/metrics (Breaker-Zustände, Cache-Statistiken); ohne Token ist der Endpoint aus
+    METRICS_TOKEN: str | None = None
+
+    # Poll-Intervall für Änderungen an scripts/data/*.json (0 = kein Watcher)
+    RATES_RELOAD_INTERVAL_SECONDS: float = 30.0
+
     ALLOW_ORIGIN: str
 
 settings = Settings()
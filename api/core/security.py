@@ -1,13 +1,15 @@
 import hmac, hashlib, secrets
 from datetime import datetime, timedelta, timezone
 import jwt
-from passlib.hash import bcrypt
 from core.config import settings
 
+# passlib erst bei Login/Registrierung laden, nicht beim Import der App
 def hash_password(pw: str) -> str:
+      from passlib.hash import bcrypt
       return bcrypt.hash(pw)
 
 def verify_password(pw: str, pw_hash: str) -> bool:
+      from passlib.hash import bcrypt
       return bcrypt.verify(pw, pw_hash)
 
 def create_token(sub: str, minutes: int) -> str:
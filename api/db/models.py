@@ -76,4 +76,50 @@ class MonthlyQuotaUser(Base):
     month = Column(Date, nullable=False, primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, primary_key=True)
     requests = Column(Integer, default=0, nullable=False)
-   
\ No newline at end of file
+   
+class ViesResult(Base):
+    """Persistente Stufe des VIES-Caches (vies_cache.py), Schlüssel = normalisiertes (cc, nummer)."""
+    __tablename__ = "vies_results"
+    country_code = Column(String(2), primary_key=True)
+    vat_number = Column(String, primary_key=True)
+    valid = Column(Boolean, nullable=False)
+    request_date_raw = Column(String, nullable=True)
+    name = Column(Text, nullable=True)
+    address = Column(Text, nullable=True)
+    checked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class ValidationJob(Base):
+    """Asynchrone Massenprüfung (validation_jobs.py); Fortschritt wird beim Abschluss der Items hochgezählt."""
+    __tablename__ = "validation_jobs"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    api_key_id = Column(UUID(as_uuid=True), ForeignKey("api_keys.id", ondelete="CASCADE"), nullable=True, index=True)
+    status = Column(String, nullable=False, default="queued")        # queued | running | completed
+    total = Column(Integer, nullable=False)
+    processed = Column(Integer, nullable=False, default=0)           # done + failed
+    failed = Column(Integer, nullable=False, default=0)
+    callback_url = Column(Text, nullable=True)
+    callback_status = Column(String, nullable=True)                  # pending | delivered | failed
+    callback_attempts = Column(Integer, nullable=False, default=0)
+    callback_next_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class ValidationJobItem(Base):
+    __tablename__ = "validation_job_items"
+    job_id = Column(UUID(as_uuid=True), ForeignKey("validation_jobs.id", ondelete="CASCADE"), primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    country_code = Column(String(2), nullable=True)                  # normalisiert; NULL bei ungültiger Eingabe
+    vat_number = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="pending")       # pending | done | failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Lease des Workers; läuft sie ab (Worker-Neustart), holt ein anderer Worker das Item
+    leased_until = Column(DateTime(timezone=True), nullable=True)
+    lease_token = Column(UUID(as_uuid=True), nullable=True)
+    valid = Column(Boolean, nullable=True)
+    name = Column(Text, nullable=True)
+    address = Column(Text, nullable=True)
+    request_date_raw = Column(String, nullable=True)
+    checked_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(Text, nullable=True)
+    status_code = Column(Integer, nullable=True)
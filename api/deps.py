@@ -1,3 +1,4 @@
+import hmac
 import uuid
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -44,6 +45,15 @@ async def get_current_user(request: Request, db: AsyncSession = Depends(get_db))
     return user
 
 
+def require_metrics_token(request: Request) -> None:
+    # Betriebsdaten (Breaker je Land, Traffic-Statistiken) nur für das Monitoring; 404 statt 401,
+    # damit der Endpoint ohne gültiges Token nicht auffällt
+    auth = request.headers.get("Authorization", "")
+    token = auth[7:] if auth.startswith("Bearer ") else ""
+    if not settings.METRICS_TOKEN or not hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
 
 async def check_and_increment_user_quota(
     user = Depends(get_current_user),
@@ -1,36 +1,46 @@
 import asyncio
 from datetime import date
+from functools import partial
 import re
+import uuid
 from typing import Any, Dict, Literal, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
 from starlette.concurrency import run_in_threadpool
-
-# SOAP client (official EU VIES service is SOAP)
-from zeep import Client, Settings
-from zeep.transports import Transport
-from zeep.exceptions import Fault, TransportError
+from starlette.responses import StreamingResponse
 
 # ⇨ Ergänzungen ganz oben
 from datetime import date, datetime, timezone
 import logging
 
-from deps import check_and_increment_user_quota, get_current_user
-from calculate import CalcRequest, CalcResult, Party
-from validate_vat import ValidateRequest, ValidateResponse, normalize_inputs
-
+from deps import check_and_increment_user_quota, get_current_user, require_metrics_token
+from calculate import (BatchCalculator, CalcBatchRequest, CalcBatchResult, CalcRequest, CalcResult,
+                       batch_item_count, calculate_item)
+from validate_vat import (ValidateRequest, ValidateResponse, check_vat_syntax, normalize_inputs,
+                          syntax_invalid_response)
+from validate_batch import BatchValidator, ValidateBatchRequest, ValidateBatchResult, normalize_items
+from validation_jobs import (JobStore, ValidationJobPool, ValidationJobRequest, ValidationJobResults,
+                             ValidationJobStatus, job_status, result_item, validate_callback_url)
+
+from calc_stream import STREAM_MEDIA_TYPES, stream_calculation, stream_format
+from rate_store import rate_repository
+from vat_kernel import Rounding, RoundingMode
+from vies_cache import CachedViesResult, PostgresViesStore, ViesResultCache
+from vies_client import ViesClient, ViesFault, ViesUnavailable
+from single_flight import SingleFlight
+from vies_breaker import ViesBreakers, ViesCircuitOpen
+from db.session import AsyncSessionLocal
+from rate_responses import country_payload, rate_responses
+from utils.http_cache import conditional_response
 from routers import auth, users, apikeys, billing
-from middleware.quota import APIKeyAuthQuotaMiddleware
-import sentry_sdk
-from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+from middleware.quota import APIKeyAuthQuotaMiddleware, api_key_cache, reserve_api_key_quota
 
 logger = logging.getLogger("vatify")
 
 
 
 # --- Config ---
-VIES_WSDL = "https://ec.europa.eu/taxation_customs/vies/checkVatService.wsdl"
 EU_COUNTRY_CODES = {
     "AT","BE","BG","CY","CZ","DE","DK","EE","EL","ES","FI","FR","HR","HU",
     "IE","IT","LT","LU","LV","MT","NL","PL","PT","RO","SE","SI","SK","XI"
@@ -40,19 +50,45 @@ from routes import rates
 
 from core.config import settings
 
-sentry_sdk.init(
-    dsn=settings.SENTRY_DSN,
-    traces_sample_rate=float(settings.SENTRY_TRACES_SAMPLE_RATE),
-    profiles_sample_rate=float(settings.SENTRY_PROFILES_SAMPLE_RATE),
-    environment=settings.SENTRY_ENV,
-)
+
+def init_sentry() -> None:
+    # im Lifespan statt beim Import: sentry_sdk.init lädt alle Auto-Integrationen.
+    # Ohne DSN bleibt sentry_sdk ganz ungeladen.
+    if not settings.SENTRY_DSN:
+        return
+    import sentry_sdk
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN,
+        traces_sample_rate=float(settings.SENTRY_TRACES_SAMPLE_RATE),
+        profiles_sample_rate=float(settings.SENTRY_PROFILES_SAMPLE_RATE),
+        environment=settings.SENTRY_ENV,
+    )
 
 # --- FastAPI app ---
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-app = FastAPI(title="VATify MVP", version="0.1.0", redirect_slashes=False)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_sentry()
+    # Binär-Snapshot mappen (geteilt über alle Worker); ohne Snapshot die JSON-Tabelle laden.
+    # Danach nur noch bei Dateiänderungen neu laden.
+    if not rate_repository.load_snapshot():
+        rate_repository.load()
+    rate_repository.start_watcher(settings.RATES_RELOAD_INTERVAL_SECONDS)
+    if settings.VALIDATION_JOB_WORKERS:
+        validation_job_pool.start()
+    yield
+    await validation_job_pool.stop()
+    rate_repository.stop_watcher()
+    await vies_client.aclose()
+
+app = FastAPI(title="VATify MVP", version="0.1.0", redirect_slashes=False, lifespan=lifespan)
 from middleware.csrf import CSRFMiddleware
 
-app.add_middleware(SentryAsgiMiddleware)
+if settings.SENTRY_DSN:
+    from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
+    app.add_middleware(SentryAsgiMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -62,128 +98,134 @@ app.add_middleware(
     allow_headers=["Content-Type","Authorization","X-Requested-With","x-csrf-token"]
 )
 app.add_middleware(CSRFMiddleware)
-app.add_middleware(APIKeyAuthQuotaMiddleware, protected_prefixes=["/v1/"])
+app.add_middleware(APIKeyAuthQuotaMiddleware, protected_prefixes=["/v1/"],
+                   request_costs={"/v1/calculate/batch": batch_item_count,
+                                  "/v1/validate-vat/batch": partial(batch_item_count, model=ValidateBatchRequest),
+                                  "/v1/validate-vat/jobs": partial(batch_item_count, model=ValidationJobRequest)})
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(users.router, prefix="/me", tags=["me"])
 app.include_router(apikeys.router, prefix="/apikeys", tags=["api-keys"])
 app.include_router(billing.router, tags=["billing"])
 app.include_router(rates.router)
 
-# Create a single zeep client (thread-safe calls via threadpool)
-_transport = Transport(timeout=10)  # seconds
-_settings  = Settings(strict=False, raw_response=True)  # <- hier!
-_zeep_client = Client(wsdl=VIES_WSDL, transport=_transport, settings=_settings)
-
-
-
-def call_vies_check_vat(country_code: str, number: str):
-    """
-    Ruft VIES checkVat(countryCode, vatNumber) auf.
-    Läuft synchron; wird vom Endpoint im Threadpool ausgeführt.
-    """
-    service = _zeep_client.service
-    # VIES gibt Felder: countryCode, vatNumber, requestDate, valid, name, address
-    return service.checkVat(countryCode=country_code, vatNumber=number)
-
-def call_vies_check_vat_raw(country_code: str, number: str):
-    resp = _zeep_client.service.checkVat(countryCode=country_code, vatNumber=number)
-    # raw_response=True => resp.content ist das SOAP-XML (bytes)
-    from lxml import etree
-    root = etree.fromstring(resp.content)
-
-    def text_of(root: etree._Element, local_name: str):
-        """
-        Sucht ein Element unabhängig vom Namespace via XPath + local-name().
-        Gibt den getrimmten Text des ersten Treffers zurück oder None.
-        """
-        nodes = root.xpath(f"//*[local-name()='{local_name}']")
-        if not nodes:
-            return None
-        text = nodes[0].text
-        return text.strip() if text else None
-    
-    return {
-        "countryCode": text_of(root, "countryCode"),
-        "vatNumber":   text_of(root, "vatNumber"),
-        "requestDate": text_of(root, "requestDate"),  # Rohstring lassen
-        "valid":       (text_of(root, "valid") or "").lower() == "true",
-        "name":        text_of(root, "name"),
-        "address":     text_of(root, "address"),
-    }
-
-
-
-def get_rate(country_code: str, rate_type: str, supply_date: date, category_hint: Optional[str]) -> float:
-    cc = country_code.upper()
-    if cc not in EU_COUNTRY_CODES:
-        raise HTTPException(status_code=400, detail=f"Invalid country code: {cc}")
-    
-    with open(f"scripts/data/{cc}.json", "r", encoding="utf-8") as f:
-        import json
-        data = json.load(f)
-   
-    found_rate = None
-    if category_hint:
-        # Suche nach einem reduced_rate-Eintrag mit Kategorie
-        for rr in data.get("reduced_rates", []):
-            if rr["label"].lower().endswith(f":{category_hint.lower()}"):
-                found_rate = rr["rate"]
-                break
-        
-    if found_rate:
-        return found_rate
-    else:
-        if rate_type == "standard":
-            return data["standard_rate"]
-        else:
-            raise HTTPException(status_code=404, detail="Rate not found for country/rate_type")
-
-def is_valid_vat(country_code: str, vat_number: Optional[str]) -> tuple[bool, str]:
+# Ein VIES-Client (httpx-Pool mit Keep-Alive) für alle Requests des Workers
+vies_client = ViesClient(
+    endpoint=settings.VIES_ENDPOINT,
+    max_connections=settings.VIES_MAX_CONNECTIONS,
+    timeout=settings.VIES_TIMEOUT_SECONDS,
+    connect_timeout=settings.VIES_CONNECT_TIMEOUT_SECONDS,
+)
+vies_cache = ViesResultCache(
+    valid_ttl=settings.VIES_CACHE_VALID_TTL_SECONDS,
+    invalid_ttl=settings.VIES_CACHE_INVALID_TTL_SECONDS,
+    max_entries=settings.VIES_CACHE_MAX_ENTRIES,
+    store=PostgresViesStore(AsyncSessionLocal),
+)
+vies_breakers = ViesBreakers(
+    failure_threshold=settings.VIES_BREAKER_FAILURE_THRESHOLD,
+    open_seconds=settings.VIES_BREAKER_OPEN_SECONDS,
+    initial_limit=settings.VIES_COUNTRY_INITIAL_LIMIT,
+    max_limit=settings.VIES_COUNTRY_MAX_LIMIT,
+    max_queue=settings.VIES_COUNTRY_QUEUE_SIZE,
+    queue_timeout=settings.VIES_COUNTRY_QUEUE_TIMEOUT_SECONDS,
+)
+# gleichzeitige Prüfungen derselben (cc, nummer) teilen sich Cache-Lookup + VIES-Aufruf
+vies_single_flight = SingleFlight()
+
+
+async def is_valid_vat(country_code: str, vat_number: Optional[str]) -> tuple[bool, str]:
+    # gleicher Pfad (Cache, VIES-Client) wie /v1/validate-vat, auf dem Event-Loop der App
     try:
-        resp = asyncio.run(validate_vat(payload=ValidateRequest(country_code=country_code, vat_number=vat_number)))
+        resp = await handle_validate_vat(ValidateRequest(country_code=country_code, vat_number=vat_number))
         return bool(resp.valid), "validated"
     except Exception:
         # konservativ: kein RC, aber deklarieren
         return False, "unavailable"
 
 
-def should_reverse_charge(supplier: Party, customer: Party, b2x: str) -> tuple[bool, str, list[str]]:
-    notes = []
-    if b2x != "B2B":
-        return False, "n/a", notes
-    if supplier.country_code.upper() == customer.country_code.upper():
-        return False, "n/a", notes
-    if supplier.country_code.upper() not in EU_COUNTRY_CODES or customer.country_code.upper() not in EU_COUNTRY_CODES:
-        notes.append("No EU intra-community supply → no reverse charge.")
-        return False, "n/a", notes
-    valid, status = is_valid_vat(customer.country_code, customer.vat_number)
-    if not valid:
-        notes.append("Customer VAT number invalid or unavailable → Reverse Charge not applied.")
-    return valid, status, notes
+async def handle_calculate_vat(payload: CalcRequest) -> CalcResult:
+    return await calculate_item(payload, is_valid_vat)
 
 
 async def handle_validate_vat(payload: ValidateRequest) -> ValidateResponse:
     cc, num = normalize_inputs(payload.vat_number, payload.country_code, payload.number)
+    return await validate_normalized(cc, num)
+
+
+async def validate_normalized(cc: str, num: str) -> ValidateResponse:
+    if not check_vat_syntax(cc, num):
+        return syntax_invalid_response(cc, num)   # Tippfehler: kein VIES-Aufruf, kein Cache-Eintrag
+    entry, cached = await vies_single_flight.do((cc, num), lambda: _lookup_vies(cc, num))
+    return _validate_response(cc, num, entry, cached)
+
+
+async def handle_validate_vat_batch(payload: ValidateBatchRequest) -> ValidateBatchResult:
+    return await BatchValidator(validate_normalized).validate(payload.items)
+
+
+# Massenprüfung als Job: Items in Postgres, Worker-Pool im Lifespan (gleicher Prüfpfad wie oben)
+validation_jobs = JobStore(AsyncSessionLocal)
+validation_job_pool = ValidationJobPool(
+    validation_jobs, validate_normalized,
+    workers=settings.VALIDATION_JOB_WORKERS,
+    max_attempts=settings.VALIDATION_JOB_MAX_ATTEMPTS,
+    webhook_secret=settings.VALIDATION_JOB_WEBHOOK_SECRET,
+)
+
+
+async def handle_create_validation_job(payload: ValidationJobRequest, api_key_id) -> ValidationJobStatus:
+    callback_url = str(payload.callback_url) if payload.callback_url else None
+    if callback_url:
+        await validate_callback_url(callback_url)
+    keys = await run_in_threadpool(normalize_items, payload.items)
+    return job_status(await validation_jobs.create(keys, callback_url, api_key_id))
+
+
+async def handle_get_validation_job(job_id: uuid.UUID, api_key_id, offset: Optional[int] = None,
+                                    limit: int = 1000) -> ValidationJobStatus | ValidationJobResults:
+    job = await validation_jobs.get(job_id, api_key_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if offset is None:
+        return job_status(job)
+    rows = await validation_jobs.results(job_id, offset, limit)
+    return ValidationJobResults(job_id=job_id, offset=offset, results=[result_item(row) for row in rows])
+
+
+async def _lookup_vies(cc: str, num: str) -> tuple[CachedViesResult, bool]:
+    entry = await vies_cache.get((cc, num))
+    if entry is not None:
+        return entry, True
+
     try:
-        result = await run_in_threadpool(call_vies_check_vat_raw, cc, num)
-        print(result)
-    except Fault as e:
-        raise HTTPException(status_code=502, error=f"VIES Fault: {getattr(e, 'message', str(e))}")
-    except TransportError:
-        raise HTTPException(status_code=503, error="VIES temporarily unavailable.")
+        result = await vies_breakers.call(cc, lambda: vies_client.check_vat(cc, num))
+    except ViesCircuitOpen as e:
+        # sofort, ohne VIES zu fragen; Reverse Charge degradiert über is_valid_vat zu "unavailable"
+        raise HTTPException(status_code=503, detail=f"VIES temporarily unavailable for {cc} ({e.reason}).",
+                            headers={"Retry-After": str(max(1, round(e.retry_after)))})
+    except ViesFault as e:
+        raise HTTPException(status_code=502, detail=f"VIES Fault: {e.code}")
+    except ViesUnavailable:
+        raise HTTPException(status_code=503, detail="VIES temporarily unavailable.")
     except Exception:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, error="Unexpected Error while checking with VIES.")
+        logger.exception("Unexpected error while checking with VIES")
+        raise HTTPException(status_code=500, detail="Unexpected Error while checking with VIES.")
+
+    return await vies_cache.put((cc, num), result), False
 
+
+def _validate_response(cc: str, num: str, entry: CachedViesResult, cached: bool) -> ValidateResponse:
+    result = entry.result
     return ValidateResponse(
-        valid=bool(result["valid"]),
-        country_code=str(result["countryCode"]) or cc,
-        vat_number=str(result["vatNumber"]) or num,
-        vies_request_date_raw=str(result["requestDate"]),      # einfach Rohstring übernehmen
-        checked_at=datetime.now(timezone.utc),                 # dein UTC Timestamp
-        name=(str(result["name"]).strip() or None),
-        address=(str(result["address"]).strip() or None),
+        valid=entry.valid,
+        country_code=result["countryCode"] or cc,
+        vat_number=result["vatNumber"] or num,
+        vies_request_date_raw=result["requestDate"],           # einfach Rohstring übernehmen
+        checked_at=entry.checked_at,                           # UTC-Zeitpunkt der VIES-Abfrage
+        name=((result["name"] or "").strip() or None),
+        address=((result["address"] or "").strip() or None),
+        cached=cached,
+        cache_age_seconds=vies_cache.age(entry) if cached else None,
     )
 
 def handle_get_rates(country: str) -> Dict[str, Any]:
@@ -192,95 +234,180 @@ def handle_get_rates(country: str) -> Dict[str, Any]:
     if country not in EU_COUNTRY_CODES:
         raise HTTPException(status_code=400, detail=f"Invalid country code: {country}")
 
-    with open(f"scripts/data/{country}.json", "r", encoding="utf-8") as f:
-        import json
-        data = json.load(f)
-
-    return {"country": country, **data, "source": "EU/VATify"}
-
-
-def handle_calculate_vat(payload: CalcRequest) -> CalcResult:
-    messages: list[str] = []
-    should_rc, vat_status, rc_notes = should_reverse_charge(payload.supplier, payload.customer, payload.b2x)
-    messages += rc_notes
-
-    if should_rc:
-        net = payload.amount  # unabhängig von basis, unter RC gibt's keine inländische VAT
-        return CalcResult(
-            country_code=payload.customer.country_code.upper(),
-            applied_rate=0.0,
-            net=net,
-            vat=0.0,
-            gross=net,
-            mechanism="reverse_charge",
-            messages=messages + ["Reverse Charge applied; invoice net without VAT."],
-            vat_check_status=vat_status,
-        )
-
-    target_country = payload.customer.country_code.upper()
-    rate = get_rate(
-        country_code=target_country,
-        rate_type=payload.rate_type,
-        supply_date=payload.supply_date,
-        category_hint=payload.category_hint,
+    data = country_payload(rate_repository.table, country)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"No rates available for {country}")
+
+    return data
+
+def handle_get_rates_cached(request: Request, country: str) -> Response:
+    """Wie handle_get_rates, aber mit vorab serialisiertem Body, ETag und 304-Handling."""
+    country = country.upper()
+
+    if country not in EU_COUNTRY_CODES:
+        raise HTTPException(status_code=400, detail=f"Invalid country code: {country}")
+
+    prepared = rate_responses.get(country)
+    if prepared is None:
+        raise HTTPException(status_code=404, detail=f"No rates available for {country}")
+
+    return conditional_response(request, prepared)
+
+def handle_get_rates_bulk(request: Request, countries: Optional[str] = None, on: Optional[date] = None) -> Response:
+    """Alle (oder ausgewählte) Länder in einem Dokument; zählt als ein Quota-Request."""
+    selected = None
+    if countries:
+        selected = {c.strip().upper() for c in countries.split(",") if c.strip()}
+        invalid = sorted(selected - EU_COUNTRY_CODES)
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid country code(s): {', '.join(invalid)}")
+
+    return conditional_response(request, rate_responses.get_bulk(selected, on))
+
+
+def handle_get_rate_categories(country: str, on: Optional[date] = None) -> Dict[str, Any]:
+    country = country.upper()
+
+    if country not in EU_COUNTRY_CODES:
+        raise HTTPException(status_code=400, detail=f"Invalid country code: {country}")
+
+    history = rate_repository.get_history(country)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No rates available for {country}")
+
+    on = on or date.today()
+    categories = []
+    for cat_id in sorted(history.categories):
+        rates = history.category_rates_on(cat_id, on)
+        if not rates:
+            continue
+        categories.append({
+            "id": cat_id,
+            "aliases": history.aliases_of(cat_id),
+            "rates": [{"rate": rr.rate, "label": rr.label} for rr in rates],
+        })
+    return {"country": country, "date": on.isoformat(), "categories": categories}
+
+
+async def handle_calculate_vat_batch(payload: CalcBatchRequest) -> CalcBatchResult:
+    rounding = Rounding(mode=payload.rounding_mode, scope=payload.rounding_scope)
+    items = await BatchCalculator(is_valid_vat, rounding).calculate(payload.items)
+    return CalcBatchResult(
+        count=len(items),
+        errors=sum(1 for item in items if item.error is not None),
+        results=items,
     )
 
-    if payload.basis == "net":
-        net = round(payload.amount, 2)
-        vat = round(net * rate, 2)
-        gross = round(net + vat, 2)
-    else:
-        gross = round(payload.amount, 2)
-        net = round(gross / (1 + rate), 2)
-        vat = round(gross - net, 2)
-
-    mechanism: Literal["normal","reverse_charge","zero_rated","out_of_scope"] = "normal"
-    if rate == 0.0:
-        mechanism = "zero_rated"
-
-    # Wenn B2B aber kein RC möglich war, Hinweise mitgeben
-    if payload.b2x == "B2B" and payload.supplier.country_code.upper() != payload.customer.country_code.upper():
-        messages.append("No Reverse Charge applied; VAT charged normally.")
-
-    return CalcResult(
-        country_code=target_country,
-        applied_rate=rate,
-        net=net,
-        vat=vat,
-        gross=gross,
-        mechanism=mechanism,
-        messages=messages,
-        vat_check_status=vat_status if vat_status != "n/a" else None,
+
+def handle_calculate_vat_stream(request: Request, rounding_mode: RoundingMode = "half_up") -> StreamingResponse:
+    """NDJSON/CSV rein, NDJSON/CSV raus – chunkweise, ohne den Body zu puffern."""
+    fmt = stream_format(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Use application/x-ndjson or text/csv")
+
+    api_key_id = getattr(request.state, "api_key_id", None)
+    prepaid = 1  # die Middleware hat den Request bereits als 1 Einheit gezählt
+
+    async def reserve_items(count: int) -> int:
+        # vor jedem Chunk buchen: Limit gilt auch mitten im Stream, Abbrüche sind bezahlt
+        nonlocal prepaid
+        covered, prepaid = min(prepaid, count), max(prepaid - count, 0)
+        if api_key_id is None or covered == count:
+            return count
+        return covered + await reserve_api_key_quota(api_key_id, count - covered, request.state.quota_limit)
+
+    return StreamingResponse(
+        # Rundung pro Zeile: rechnungsweise Rundung bräuchte den ganzen Stream im Speicher
+        stream_calculation(request.stream(), fmt, BatchCalculator(is_valid_vat, Rounding(mode=rounding_mode)).calculate,
+                           reserve=reserve_items),
+        media_type=STREAM_MEDIA_TYPES[fmt],
     )
 
 # Endpoints - all secured by middleware
 
 # API-Endpunkte (API-Key-basiert)
 @app.post("/v1/calculate", response_model=CalcResult)
-def calculate_vat(payload: CalcRequest):
-    return handle_calculate_vat(payload)
+async def calculate_vat(payload: CalcRequest):
+    return await handle_calculate_vat(payload)
+
+@app.post("/v1/calculate/batch", response_model=CalcBatchResult)
+async def calculate_vat_batch(payload: CalcBatchRequest):
+    # Quota: Middleware zählt jedes Item (batch_item_count); direkt serialisieren statt erneut zu validieren
+    result = await handle_calculate_vat_batch(payload)
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+@app.post("/v1/calculate/stream")
+async def calculate_vat_stream(request: Request, rounding_mode: RoundingMode = Query("half_up")):
+    return handle_calculate_vat_stream(request, rounding_mode)
 
 @app.post("/v1/validate-vat", response_model=ValidateResponse, tags=["vat"])
 async def validate_vat(payload: ValidateRequest):
     return await handle_validate_vat(payload)
 
+@app.post("/v1/validate-vat/batch", response_model=ValidateBatchResult, tags=["vat"])
+async def validate_vat_batch(payload: ValidateBatchRequest):
+    # Quota: Middleware zählt jedes Item (batch_item_count), wie bei /v1/calculate/batch
+    result = await handle_validate_vat_batch(payload)
+    return Response(content=result.model_dump_json(), media_type="application/json")
+
+@app.post("/v1/validate-vat/jobs", response_model=ValidationJobStatus, status_code=202, tags=["vat"])
+async def create_validation_job(payload: ValidationJobRequest, request: Request):
+    # Quota: jedes Item eine Einheit (wie Batch); Status/Ergebnisse danach per GET oder Callback
+    return await handle_create_validation_job(payload, getattr(request.state, "api_key_id", None))
+
+@app.get("/v1/validate-vat/jobs/{job_id}", response_model=ValidationJobStatus, tags=["vat"])
+async def get_validation_job(job_id: uuid.UUID, request: Request):
+    return await handle_get_validation_job(job_id, getattr(request.state, "api_key_id", None))
+
+@app.get("/v1/validate-vat/jobs/{job_id}/results", response_model=ValidationJobResults, tags=["vat"])
+async def get_validation_job_results(job_id: uuid.UUID, request: Request, offset: int = Query(0, ge=0),
+                                     limit: int = Query(1000, ge=1, le=5000)):
+    return await handle_get_validation_job(job_id, getattr(request.state, "api_key_id", None), offset, limit)
+
+@app.get("/v1/rates")
+def get_rates_bulk(request: Request, countries: Optional[str] = Query(None, description="Comma-separated, e.g. DE,FR"), on: Optional[date] = Query(None, alias="date")):
+    return handle_get_rates_bulk(request, countries, on)
+
+# muss vor /v1/rates/{country} registriert sein
+@app.get("/v1/rates/changes")
+def get_rate_changes(request: Request, since: int = Query(..., ge=0, description="Last data_version the client has")):
+    return conditional_response(request, rate_responses.get_changes(since))
+
 @app.get("/v1/rates/{country}")
-def get_rates(country: str):
-    return handle_get_rates(country)
+def get_rates(country: str, request: Request):
+    return handle_get_rates_cached(request, country)
+
+@app.get("/v1/rates/{country}/categories")
+def get_rate_categories(country: str, on: Optional[date] = Query(None, alias="date")):
+    return handle_get_rate_categories(country, on)
 
 # --- App-Endpunkte (auth + user-basiert) ---
 @app.post("/app/calculate", response_model=CalcResult)
 async def endpoint_a_app(payload: CalcRequest, user=Depends(get_current_user), _=Depends(check_and_increment_user_quota)):
-    return  handle_calculate_vat(payload)
+    return await handle_calculate_vat(payload)
 
 @app.post("/app/validate-vat", response_model=ValidateResponse)
 async def endpoint_b_app(payload: ValidateRequest, user=Depends(get_current_user), _=Depends(check_and_increment_user_quota)):
     return await handle_validate_vat(payload)
 
+@app.post("/app/rates")
+async def endpoint_e_app(request: Request, countries: Optional[str] = Query(None), on: Optional[date] = Query(None, alias="date"), user=Depends(get_current_user), _=Depends(check_and_increment_user_quota)):
+    return handle_get_rates_bulk(request, countries, on)
+
 @app.post("/app/rates/{country}")
 async def endpoint_c_app(country: str, user=Depends(get_current_user), _=Depends(check_and_increment_user_quota)):
     return handle_get_rates(country)
 
+@app.post("/app/rates/{country}/categories")
+async def endpoint_d_app(country: str, on: Optional[date] = Query(None, alias="date"), user=Depends(get_current_user), _=Depends(check_and_increment_user_quota)):
+    return handle_get_rate_categories(country, on)
+
 @app.get("/api/health")
 def health():
     return {"ok": True}
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    # pro Worker-Prozess
+    return {"vies": {"single_flight": vies_single_flight.stats(), "breakers": vies_breakers.stats()},
+            "api_keys": api_key_cache.stats()}
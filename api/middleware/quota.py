@@ -5,6 +5,7 @@ from starlette.responses import Response, JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from datetime import datetime, date
+from typing import Callable, Optional
 import asyncio
 
 from deps import get_current_user
@@ -12,11 +13,50 @@ from db.session import AsyncSessionLocal
 from db.models import ApiKey, MonthlyQuota, UsageCounter, User
 from core.config import settings
 from core.security import API_KEY_PREFIX, hash_api_key
+from api_key_cache import ApiKeyCache, CachedApiKey
+
+# key_hash -> Key/User-Daten; invalidiert von routers/apikeys.py (revoke/rotate) und routers/billing.py (Webhooks)
+api_key_cache = ApiKeyCache(ttl=settings.API_KEY_CACHE_TTL_SECONDS, max_entries=settings.API_KEY_CACHE_MAX_ENTRIES)
+
+def monthly_limit(subscription_status: Optional[str]) -> int:
+    if subscription_status == "active":
+        return 1000  # für Pro-User
+    return settings.FREE_MONTHLY_QUOTA  # für MVP: planabhängig => Join User + plan
+
+
+async def reserve_api_key_quota(api_key_id, units: int, limit: int) -> int:
+    """
+    Bucht während des Requests weitere Einheiten (z.B. Streaming-Chunks), höchstens bis `limit`.
+    Gibt die gebuchte Anzahl zurück (0..units); die Zeile ist gesperrt, parallele Requests
+    desselben Keys können das Limit also nicht gemeinsam überschreiten.
+    """
+    month = date.today().replace(day=1)
+    params = {"m": month, "k": str(api_key_id)}
+    async with AsyncSessionLocal() as db:
+        used = await db.scalar(text("SELECT requests FROM monthly_quota WHERE month=:m AND api_key_id=:k FOR UPDATE"),
+                               params)
+        granted = max(0, min(units, limit - (used or 0)))
+        if granted:
+            await db.execute(text("UPDATE monthly_quota SET requests = requests + :n WHERE month=:m AND api_key_id=:k"),
+                             {**params, "n": granted})
+        await db.commit()
+    return granted
+
 
 class APIKeyAuthQuotaMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, protected_prefixes: list[str]):
+    def __init__(self, app, protected_prefixes: list[str],
+                 request_costs: Optional[dict[str, Callable[[bytes], int]]] = None):
         super().__init__(app)
         self.protected_prefixes = protected_prefixes
+        # Pfad -> Funktion(body) -> Anzahl Quota-Einheiten (z.B. Items eines Batch-Requests)
+        self.request_costs = request_costs or {}
+
+    async def _request_cost(self, request: Request) -> int:
+        cost_of = self.request_costs.get(request.url.path)
+        if cost_of is None:
+            return 1
+        # Body wird von Starlette gecacht und steht dem Endpoint weiterhin zur Verfügung
+        return cost_of(await request.body())
 
     async def dispatch(self, request: Request, call_next):
         path = request.url.path
@@ -38,41 +78,49 @@ class APIKeyAuthQuotaMiddleware(BaseHTTPMiddleware):
             return JSONResponse({"error":"Invalid API key format"}, status_code=401)
 
         async with AsyncSessionLocal() as db:  # eigener Session-Scope
-            rec = await db.scalar(select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.revoked == False))
-            if not rec:
-                return JSONResponse({"error":"Invalid API key"}, status_code=401)
+            # warmer Key: keine DB-Abfrage für die Authentifizierung
+            entry = api_key_cache.get(key_hash)
+            if entry is None:
+                generation = api_key_cache.generation
+                rec = await db.scalar(select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.revoked == False))
+                if not rec:
+                    return JSONResponse({"error":"Invalid API key"}, status_code=401)
+                user = await db.get(User, rec.user_id)
+                if not user:
+                    return JSONResponse({"error": "User not found for API key"}, status_code=401)
+                entry = CachedApiKey(key_id=rec.id, user_id=user.id, plan=user.plan,
+                                     subscription_status=user.subscription_status)
+                api_key_cache.put(key_hash, entry, generation)
 
             # Quota prüfen
             month = date.today().replace(day=1)
-            agg = await db.get(MonthlyQuota, {"month": month, "api_key_id": rec.id})
+            agg = await db.get(MonthlyQuota, {"month": month, "api_key_id": entry.key_id})
             used = agg.requests if agg else 0
 
-            user = await db.get(User, rec.user_id)
-            if not user:
-                return JSONResponse({"error": "User not found for API key"}, status_code=401)
-            
-            if user.subscription_status == "active":
-                limit = 1000  # für Pro-User
-            else:
-                limit = settings.FREE_MONTHLY_QUOTA  # für MVP: planabhängig => Join User + plan
+            limit = monthly_limit(entry.subscription_status)
             
-            if used >= limit:
+            cost = await self._request_cost(request)
+            if used + cost > limit:
                 return JSONResponse({"error":"Free Monthly quota exceeded"}, status_code=429)
 
             # Rate Limit (einfaches In-Memory Token-Bucket pro Worker – für Prod besser Redis)
             # Für MVP: überspringen oder minimaler Sleep/Counter -> hier weggelassen.
 
-            # Zählung (idealerweise asynchron/Queue; MVP: direkt)
+            # Zählung (idealerweise asynchron/Queue; MVP: direkt) – ein Write, auch für Batches
             now = datetime.utcnow()
             endpoint = path
-            db.add(UsageCounter(api_key_id=rec.id, endpoint=endpoint, timestamp=now))
+            db.add(UsageCounter(api_key_id=entry.key_id, endpoint=endpoint, timestamp=now))
             if agg:
-                await db.execute(text("UPDATE monthly_quota SET requests = requests + 1 WHERE month=:m AND api_key_id=:k"),
-                                 {"m": month, "k": str(rec.id)})
+                await db.execute(text("UPDATE monthly_quota SET requests = requests + :n WHERE month=:m AND api_key_id=:k"),
+                                 {"n": cost, "m": month, "k": str(entry.key_id)})
             else:
-                db.add(MonthlyQuota(month=month, api_key_id=rec.id, requests=1))
+                db.add(MonthlyQuota(month=month, api_key_id=entry.key_id, requests=cost))
             await db.commit()
 
+        # für Endpoints, die während des Requests nachbuchen (reserve_api_key_quota)
+        request.state.api_key_id = entry.key_id
+        request.state.quota_limit = limit
+
         # weiter zum Endpoint
         response = await call_next(request)
         return response
@@ -0,0 +1,41 @@
+"""add vies_results cache
+
+Revision ID: 5b1e0c7d9a21
+Revises: 767d76585fcb
+Create Date: 2025-10-02 10:14:52.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e0c7d9a21'
+down_revision: Union[str, Sequence[str], None] = '767d76585fcb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "vies_results",
+        sa.Column("country_code", sa.String(length=2), nullable=False),
+        sa.Column("vat_number", sa.String(), nullable=False),
+        sa.Column("valid", sa.Boolean(), nullable=False),
+        sa.Column("request_date_raw", sa.String(), nullable=True),
+        sa.Column("name", sa.Text(), nullable=True),
+        sa.Column("address", sa.Text(), nullable=True),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("country_code", "vat_number"),
+    )
+    # für Aufräumjobs (abgelaufene Einträge löschen)
+    op.create_index("ix_vies_results_checked_at", "vies_results", ["checked_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_vies_results_checked_at", table_name="vies_results")
+    op.drop_table("vies_results")
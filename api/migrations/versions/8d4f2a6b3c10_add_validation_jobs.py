@@ -0,0 +1,88 @@
+"""add validation jobs
+
+Revision ID: 8d4f2a6b3c10
+Revises: 5b1e0c7d9a21
+Create Date: 2025-10-06 09:41:07.552310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2a6b3c10'
+down_revision: Union[str, Sequence[str], None] = '5b1e0c7d9a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "validation_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("api_key_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("processed", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("callback_url", sa.Text(), nullable=True),
+        sa.Column("callback_status", sa.String(), nullable=True),
+        sa.Column("callback_attempts", sa.Integer(), nullable=False),
+        sa.Column("callback_next_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["api_key_id"], ["api_keys.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_validation_jobs_api_key_id", "validation_jobs", ["api_key_id"], unique=False)
+    # Webhook-Zustellung: nur Jobs mit offenem Callback
+    op.create_index(
+        "ix_validation_jobs_callback_due",
+        "validation_jobs",
+        ["callback_next_at"],
+        unique=False,
+        postgresql_where=sa.text("callback_status = 'pending'"),
+    )
+
+    op.create_table(
+        "validation_job_items",
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("idx", sa.Integer(), nullable=False),
+        sa.Column("country_code", sa.String(length=2), nullable=True),
+        sa.Column("vat_number", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("leased_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("lease_token", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("valid", sa.Boolean(), nullable=True),
+        sa.Column("name", sa.Text(), nullable=True),
+        sa.Column("address", sa.Text(), nullable=True),
+        sa.Column("request_date_raw", sa.String(), nullable=True),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["validation_jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "idx"),
+    )
+    # Worker-Queue: nur offene Items, nach Fälligkeit
+    op.create_index(
+        "ix_validation_job_items_pending",
+        "validation_job_items",
+        ["next_attempt_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_validation_job_items_pending", table_name="validation_job_items")
+    op.drop_table("validation_job_items")
+    op.drop_index("ix_validation_jobs_callback_due", table_name="validation_jobs")
+    op.drop_index("ix_validation_jobs_api_key_id", table_name="validation_jobs")
+    op.drop_table("validation_jobs")
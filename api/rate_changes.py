@@ -0,0 +1,103 @@
+# rate_changes.py
+"""
+Änderungs-Feed der Rate-Daten: jeder Build von scripts/load_vat_rates.py bekommt
+eine fortlaufende Nummer und eine Datei scripts/data/changes/{nummer:06d}.json mit
+dem Diff zum vorherigen Build (added / removed / changed je Land und Kategorie).
+
+/v1/rates/changes?since=<version> liefert nur die Deltas danach.
+"""
+import json
+import os
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+CHANGES_DIR_NAME = "changes"
+STANDARD_KEY = "STANDARD"
+
+
+def _entries(country) -> Dict[str, List[Dict[str, Any]]]:
+    """CountryRates -> {Kategorie: [{"rate", "label"}, ...]} (STANDARD für den Normalsatz)."""
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    if country.standard_rate is not None:
+        out[STANDARD_KEY] = [{"rate": country.standard_rate, "label": "standard"}]
+    for rr in country.reduced_rates:
+        cat = rr.label.split(":", 1)[1].upper() if ":" in rr.label else rr.label.upper()
+        out.setdefault(cat, []).append({"rate": rr.rate, "label": rr.label})
+    return out
+
+
+def diff_countries(old: Mapping[str, Any], new: Mapping[str, Any]) -> Dict[str, Dict[str, list]]:
+    """Diff zweier {cc: CountryRates}-Mappings; Länder ohne Änderung fehlen im Ergebnis."""
+    result: Dict[str, Dict[str, list]] = {}
+    for cc in sorted(set(old) | set(new)):
+        before = _entries(old[cc]) if cc in old else {}
+        after = _entries(new[cc]) if cc in new else {}
+        added = [{"category": k, "rates": after[k]} for k in sorted(after.keys() - before.keys())]
+        removed = [{"category": k, "rates": before[k]} for k in sorted(before.keys() - after.keys())]
+        changed = [
+            {"category": k, "from": before[k], "to": after[k]}
+            for k in sorted(before.keys() & after.keys())
+            if before[k] != after[k]
+        ]
+        if added or removed or changed:
+            result[cc] = {"added": added, "removed": removed, "changed": changed}
+    return result
+
+
+@dataclass(frozen=True)
+class ChangeFeed:
+    versions: tuple[int, ...]          # sortiert
+    entries: tuple[Mapping[str, Any], ...]
+
+    @property
+    def latest(self) -> int:
+        return self.versions[-1] if self.versions else 0
+
+    def since(self, version: int) -> tuple[Mapping[str, Any], ...]:
+        return self.entries[bisect_right(self.versions, version):]
+
+
+EMPTY_FEED = ChangeFeed(versions=(), entries=())
+
+
+def change_files(data_dir: Path) -> list[Path]:
+    return sorted(p for p in (Path(data_dir) / CHANGES_DIR_NAME).glob("*.json") if p.stem.isdigit())
+
+
+def load_change_feed(files: list[Path]) -> ChangeFeed:
+    entries = sorted((json.loads(p.read_bytes()) for p in files), key=lambda e: e["version"])
+    return ChangeFeed(
+        versions=tuple(e["version"] for e in entries),
+        entries=tuple(MappingProxyType(e) for e in entries),
+    )
+
+
+def record_build(data_dir: Path, old: Mapping[str, Any], new: Mapping[str, Any],
+                 content_id: Optional[str] = None) -> Optional[int]:
+    """
+    Legt die nächste Versionsdatei an, wenn sich etwas geändert hat.
+    Gibt die neue Versionsnummer zurück (None = keine Änderung).
+    """
+    changes = diff_countries(old, new)
+    if not changes:
+        return None
+    out_dir = Path(data_dir) / CHANGES_DIR_NAME
+    out_dir.mkdir(parents=True, exist_ok=True)
+    existing = change_files(data_dir)
+    version = (int(existing[-1].stem) + 1) if existing else 1
+    doc = {
+        "version": version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "content_id": content_id,
+        "changes": changes,
+    }
+    path = out_dir / f"{version:06d}.json"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return version
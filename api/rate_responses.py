@@ -0,0 +1,122 @@
+# rate_responses.py
+"""
+Pro Rate-Daten-Version einmal serialisierte Responses für /v1/rates/{country}
+und den Bulk-Endpoint /v1/rates. Ändert sich die RateTable (neue version),
+werden alle Länder und das Gesamtdokument neu vorbereitet – maximal komprimiert.
+Gefilterte Bulk-Varianten und Änderungs-Deltas entstehen im Request-Pfad und
+werden nur mit den schnellen Stufen (VARIANT_*) komprimiert.
+"""
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+from rate_store import RateRepository, RateTable, rate_repository
+from utils.http_cache import VARIANT_BROTLI_QUALITY, VARIANT_GZIP_LEVEL, PreparedBody, prepare_json_body
+
+
+def country_payload(table: RateTable, country: str) -> Optional[dict]:
+    data = table.get(country)
+    if data is None:
+        return None
+    return {**data.as_dict(), "source": "EU/VATify"}
+
+
+def country_payload_on(table: RateTable, country: str, on: date) -> Optional[dict]:
+    history = table.get_history(country)
+    view = history.rates_on(on) if history else None
+    if view is None:
+        return None
+    return {**view.as_dict(), "source": "EU/VATify"}
+
+
+def bulk_payload(table: RateTable, countries: Iterable[str], on: Optional[date] = None) -> dict:
+    out = {}
+    for cc in countries:
+        data = country_payload(table, cc) if on is None else country_payload_on(table, cc, on)
+        if data is not None:
+            out[cc] = data
+    return {
+        "version": table.version,
+        # Stand des Änderungs-Feeds – Startwert für /v1/rates/changes?since=
+        "data_version": table.changes.latest,
+        "date": on.isoformat() if on else None,
+        "countries": out,
+    }
+
+
+def changes_payload(table: RateTable, since: int) -> dict:
+    return {
+        "since": since,
+        "latest": table.changes.latest,
+        "versions": [dict(e) for e in table.changes.since(since)],
+    }
+
+
+def _prepare_variant(obj: dict) -> PreparedBody:
+    return prepare_json_body(obj, gzip_level=VARIANT_GZIP_LEVEL, br_quality=VARIANT_BROTLI_QUALITY)
+
+
+class RateResponseCache:
+    # gefilterte Bulk-Varianten (Länderliste/Datum) – klein halten, die Daten ändern sich selten
+    MAX_BULK_VARIANTS = 256
+
+    def __init__(self, repo: RateRepository):
+        self.repo = repo
+        # (version, {cc: PreparedBody}, Gesamtdokument) – wird als Ganzes ausgetauscht
+        self._prepared: tuple[Optional[str], Dict[str, PreparedBody], Optional[PreparedBody]] = (None, {}, None)
+        self._bulk_variants: "OrderedDict[tuple, PreparedBody]" = OrderedDict()
+        self._bulk_lock = Lock()
+        # ((version, feed.latest), {since: PreparedBody})
+        self._changes: tuple[Optional[tuple], Dict[int, PreparedBody]] = (None, {})
+
+    def _current(self) -> tuple[RateTable, Dict[str, PreparedBody], PreparedBody]:
+        table = self.repo.table
+        version, bodies, bulk = self._prepared
+        if version != table.version:
+            bodies = {cc: prepare_json_body(country_payload(table, cc)) for cc in table.countries}
+            bulk = prepare_json_body(bulk_payload(table, sorted(table.countries)))
+            self._prepared = (table.version, bodies, bulk)
+        return table, bodies, bulk
+
+    def get(self, country: str) -> Optional[PreparedBody]:
+        _, bodies, _ = self._current()
+        return bodies.get(country.upper())
+
+    def get_changes(self, since: int) -> PreparedBody:
+        """Deltas nach `since`; je Feed-Stand und since-Wert nur einmal serialisiert."""
+        table = self.repo.table
+        key = (table.version, table.changes.latest)
+        cached = self._changes
+        if cached[0] != key:
+            cached = (key, {})
+            self._changes = cached
+        # since > latest -> leeres Ergebnis, alle solchen Anfragen teilen sich einen Eintrag
+        since = max(0, min(since, table.changes.latest + 1))
+        prepared = cached[1].get(since)
+        if prepared is None:
+            prepared = cached[1].setdefault(since, _prepare_variant(changes_payload(table, since)))
+        return prepared
+
+    def get_bulk(self, countries: Optional[Iterable[str]] = None, on: Optional[date] = None) -> PreparedBody:
+        """Alle Länder (vorgebaut) oder eine gefilterte Variante aus einem kleinen LRU."""
+        table, _, bulk = self._current()
+        selected = tuple(sorted({cc.upper() for cc in countries})) if countries else tuple(sorted(table.countries))
+        if on is None and selected == tuple(sorted(table.countries)):
+            return bulk
+
+        key = (table.version, selected, on)
+        with self._bulk_lock:
+            prepared = self._bulk_variants.get(key)
+            if prepared is not None:
+                self._bulk_variants.move_to_end(key)
+                return prepared
+        prepared = _prepare_variant(bulk_payload(table, selected, on))
+        with self._bulk_lock:
+            self._bulk_variants[key] = prepared
+            while len(self._bulk_variants) > self.MAX_BULK_VARIANTS:
+                self._bulk_variants.popitem(last=False)
+        return prepared
+
+
+rate_responses = RateResponseCache(rate_repository)
@@ -0,0 +1,334 @@
+# rate_snapshot.py
+"""
+Kompakter, versionierter Binär-Snapshot der Rate-Daten (Länder, Kategorien,
+Gültigkeitsdaten, Sätze) mit festem Layout.
+
+Der Snapshot wird read-only per mmap geöffnet: alle uvicorn-Worker teilen sich
+dieselben Page-Cache-Seiten, beim Start wird nichts geparst. Lookups lesen
+direkt aus dem Mapping (struct.unpack_from / memoryview.cast, keine Kopien).
+
+Layout (little endian, alle Sektionen 8-Byte-aligned, direkt hintereinander):
+
+  Header       HEADER (siehe _HEADER)
+  countries    n_countries  x _COUNTRY   sortiert nach cc
+  categories   n_categories x _CATEGORY  je Land sortiert nach Name
+  point_dates  n_points     x uint32     date.toordinal(), je Zeitreihe sortiert
+  point_rates  n_points     x _POINT     Bereich in `rates`
+  rates        n_rates      x _RATE
+  strings      strings_size Bytes UTF-8 (Kategorie-IDs, Labels)
+
+Erzeugen:  python -m rate_snapshot   (aus api/, liest scripts/data/*.json)
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_right
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional
+
+from rate_store import CATEGORY_ALIASES, DATA_DIR, RateTable, ReducedRate, build_rate_table, normalize_category
+
+logger = logging.getLogger("vatify")
+
+SNAPSHOT_PATH = DATA_DIR / "rates.snapshot"
+
+MAGIC = b"VATRSNAP"
+FORMAT_VERSION = 1
+
+# magic, format, reserved, data_version, built_at, content_id,
+# n_countries, n_categories, n_points, n_rates, strings_size, body_crc32
+_HEADER = struct.Struct("<8sHHIq16sIIIIII")
+# cc, currency, pad, std_point_start, std_point_count, cat_start, cat_count, valid_on (ordinal, 0 = unbekannt)
+_COUNTRY = struct.Struct("<2s3sxIIIII")
+# name_off, name_len, point_start, point_count
+_CATEGORY = struct.Struct("<IIII")
+# rate_start, rate_count
+_POINT = struct.Struct("<II")
+# rate, label_off, label_len
+_RATE = struct.Struct("<dII")
+
+
+def _align8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+# ---------- Writer ----------
+def encode_snapshot(table: RateTable, data_version: int, built_at: Optional[int] = None) -> bytes:
+    strings = bytearray()
+    string_offsets: Dict[str, int] = {}
+
+    def add_string(s: str) -> tuple[int, int]:
+        raw = s.encode("utf-8")
+        if s not in string_offsets:
+            string_offsets[s] = len(strings)
+            strings.extend(raw)
+        return string_offsets[s], len(raw)
+
+    countries, categories, point_dates, points, rates = [], [], [], [], []
+
+    def add_timeline(tl, to_rates) -> tuple[int, int]:
+        start = len(point_dates)
+        for d, value in zip(tl.dates, tl.values):
+            rate_start = len(rates)
+            for rr in to_rates(value):
+                rates.append((rr.rate, *add_string(rr.label)))
+            point_dates.append(d.toordinal())
+            points.append((rate_start, len(rates) - rate_start))
+        return start, len(point_dates) - start
+
+    for cc in sorted(table.history):
+        h = table.history[cc]
+        std_start, std_count = add_timeline(h.standard, lambda v: (ReducedRate(rate=v, label=""),))
+        cat_start = len(categories)
+        for cat_id in sorted(h.categories, key=lambda c: c.encode("utf-8")):
+            name_off, name_len = add_string(cat_id)
+            p_start, p_count = add_timeline(h.categories[cat_id], lambda v: v)
+            categories.append((name_off, name_len, p_start, p_count))
+        valid_on = date.fromisoformat(h.snapshot_valid_on).toordinal() if h.snapshot_valid_on else 0
+        countries.append((cc.encode("ascii"), h.currency.encode("ascii")[:3].ljust(3),
+                          std_start, std_count, cat_start, len(categories) - cat_start, valid_on))
+
+    body = bytearray()
+
+    def section(st: Optional[struct.Struct], rows, fmt: Optional[str] = None):
+        if fmt:
+            body.extend(struct.pack(f"<{len(rows)}{fmt}", *rows))
+        else:
+            for row in rows:
+                body.extend(st.pack(*row))
+        body.extend(b"\0" * (_align8(len(body)) - len(body)))
+
+    section(_COUNTRY, countries)
+    section(_CATEGORY, categories)
+    section(None, point_dates, fmt="I")
+    section(_POINT, points)
+    section(_RATE, rates)
+    body.extend(strings)
+
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, data_version,
+        int(built_at if built_at is not None else time.time()),
+        table.version.encode("ascii")[:16].ljust(16, b"\0"),
+        len(countries), len(categories), len(point_dates), len(rates), len(strings),
+        zlib.crc32(body),
+    )
+    return header + b"\0" * (_align8(len(header)) - len(header)) + bytes(body)
+
+
+def read_header(path: Path = SNAPSHOT_PATH) -> Optional[tuple]:
+    """Liest nur den Header (für billige Änderungserkennung); None, wenn es keine Datei gibt."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(raw) < _HEADER.size:
+        return None
+    return _HEADER.unpack(raw)
+
+
+def write_snapshot(table: RateTable, path: Path = SNAPSHOT_PATH, data_version: Optional[int] = None) -> int:
+    """
+    Schreibt den Snapshot atomar (temp + os.replace). Ohne explizite data_version wird
+    die Version der vorhandenen Datei hochgezählt – aber nur, wenn sich der Inhalt geändert hat.
+    Gibt die geschriebene data_version zurück.
+    """
+    path = Path(path)
+    previous = read_header(path)
+    if data_version is None:
+        if previous and previous[0] == MAGIC and previous[5].rstrip(b"\0").decode() == table.version:
+            return previous[3]
+        data_version = (previous[3] + 1) if previous and previous[0] == MAGIC else 1
+
+    blob = encode_snapshot(table, data_version)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return data_version
+
+
+# ---------- Reader ----------
+class _CategoryNames:
+    """Sequenz-Sicht auf die (sortierten) Kategorie-Namen eines Landes – für bisect."""
+
+    def __init__(self, snap: "RateSnapshot", start: int, count: int):
+        self.snap, self.start, self.count = snap, start, count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        name_off, name_len, _, _ = self.snap._category(self.start + i)
+        return self.snap._string_bytes(name_off, name_len)
+
+
+class SnapshotCountry:
+    """
+    Sicht auf ein Land im Snapshot. Gleiche Lookup-Schnittstelle wie
+    rate_store.CountryHistory (standard_rate_on / resolve_category / category_rates_on).
+    """
+
+    def __init__(self, snap: "RateSnapshot", index: int):
+        self.snap = snap
+        (cc, currency, self._std_start, self._std_count,
+         self._cat_start, self._cat_count, valid_on) = _COUNTRY.unpack_from(snap._buf, snap._countries_off + index * _COUNTRY.size)
+        self.country = cc.decode("ascii")
+        self.currency = currency.decode("ascii")
+        self.snapshot_valid_on = date.fromordinal(valid_on).isoformat() if valid_on else None
+        self._names = _CategoryNames(snap, self._cat_start, self._cat_count)
+        # normalisierter Hint -> Kategorie-Index; nur Treffer werden gemerkt, der Schlüssel ist also
+        # immer eine Kategorie-ID oder ein Alias – Schreibvarianten der Clients legen nichts an
+        self._resolved: Dict[str, int] = {}
+
+    def standard_rate_on(self, on: date) -> Optional[float]:
+        rates = self.snap._rates_on(self._std_start, self._std_count, on)
+        return rates[0].rate if rates else None
+
+    def _find_category(self, category_id: str) -> Optional[int]:
+        key = category_id.encode("utf-8")
+        i = bisect_right(self._names, key) - 1
+        if i >= 0 and self._names[i] == key:
+            return self._cat_start + i
+        return None
+
+    def resolve_category(self, hint: str) -> Optional[str]:
+        idx = self._resolve(hint)
+        if idx is None:
+            return None
+        name_off, name_len, _, _ = self.snap._category(idx)
+        return self.snap._string_bytes(name_off, name_len).decode("utf-8")
+
+    def _resolve(self, hint: str) -> Optional[int]:
+        key = normalize_category(hint)
+        idx = self._resolved.get(key)
+        if idx is not None:
+            return idx
+        # wie rate_store._build_category_index: echte ID vor Alias
+        idx = self._find_category(key)
+        if idx is None:
+            for target in CATEGORY_ALIASES.get(key, ()):
+                idx = self._find_category(target)
+                if idx is not None:
+                    break
+        if idx is not None:
+            self._resolved[key] = idx
+        return idx
+
+    def category_rates_on(self, hint: str, on: date) -> tuple[ReducedRate, ...]:
+        idx = self._resolve(hint)
+        if idx is None:
+            return ()
+        _, _, p_start, p_count = self.snap._category(idx)
+        return self.snap._rates_on(p_start, p_count, on)
+
+
+class RateSnapshot:
+    """Read-only mmap auf eine Snapshot-Datei. Prüft Magic, Format-Version und CRC beim Öffnen."""
+
+    def __init__(self, path: Path = SNAPSHOT_PATH, verify: bool = True):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        if len(self._buf) < _HEADER.size:
+            raise SnapshotError(f"{self.path}: file too short")
+
+        (magic, fmt, _, self.data_version, self.built_at, content_id,
+         n_countries, n_categories, n_points, n_rates, strings_size, body_crc) = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path}: bad magic")
+        if fmt != FORMAT_VERSION:
+            raise SnapshotError(f"{self.path}: unsupported format version {fmt}")
+        self.content_id = content_id.rstrip(b"\0").decode("ascii")
+        self.body_crc = body_crc
+
+        off = _align8(_HEADER.size)
+        body_start = off
+        self._countries_off = off
+        off = _align8(off + n_countries * _COUNTRY.size)
+        self._categories_off = off
+        off = _align8(off + n_categories * _CATEGORY.size)
+        self._point_dates = self._buf[off:off + n_points * 4].cast("I")
+        off = _align8(off + n_points * 4)
+        self._points_off = off
+        off = _align8(off + n_points * _POINT.size)
+        self._rates_off = off
+        off = _align8(off + n_rates * _RATE.size)
+        self._strings_off = off
+        end = off + strings_size
+        if end != len(self._buf):
+            raise SnapshotError(f"{self.path}: size mismatch ({len(self._buf)} != {end})")
+        if verify and zlib.crc32(self._buf[body_start:end]) != body_crc:
+            raise SnapshotError(f"{self.path}: checksum mismatch")
+
+        # 28 Einträge – das einzige, was beim Öffnen materialisiert wird
+        self._country_index = {
+            _COUNTRY.unpack_from(self._buf, self._countries_off + i * _COUNTRY.size)[0].decode("ascii"): i
+            for i in range(n_countries)
+        }
+        self._views: Dict[str, SnapshotCountry] = {}
+
+    @property
+    def header_key(self) -> tuple[int, str, int]:
+        return self.data_version, self.content_id, self.body_crc
+
+    def countries(self) -> list[str]:
+        return sorted(self._country_index)
+
+    def get(self, country_code: str) -> Optional[SnapshotCountry]:
+        cc = country_code.upper()
+        view = self._views.get(cc)
+        if view is None:
+            i = self._country_index.get(cc)
+            if i is None:
+                return None
+            view = self._views.setdefault(cc, SnapshotCountry(self, i))
+        return view
+
+    # --- Low-Level-Zugriffe ---
+    def _category(self, i: int) -> tuple[int, int, int, int]:
+        return _CATEGORY.unpack_from(self._buf, self._categories_off + i * _CATEGORY.size)
+
+    def _string_bytes(self, off: int, length: int) -> bytes:
+        start = self._strings_off + off
+        return bytes(self._buf[start:start + length])
+
+    def _rates_on(self, p_start: int, p_count: int, on: date) -> tuple[ReducedRate, ...]:
+        if p_count == 0:
+            return ()
+        i = bisect_right(self._point_dates, on.toordinal(), p_start, p_start + p_count) - 1
+        if i < p_start:
+            return ()
+        rate_start, rate_count = _POINT.unpack_from(self._buf, self._points_off + i * _POINT.size)
+        out = []
+        for r in range(rate_start, rate_start + rate_count):
+            rate, label_off, label_len = _RATE.unpack_from(self._buf, self._rates_off + r * _RATE.size)
+            out.append(ReducedRate(rate=rate, label=self._string_bytes(label_off, label_len).decode("utf-8")))
+        return tuple(out)
+
+
+def open_snapshot(path: Path = SNAPSHOT_PATH) -> Optional[RateSnapshot]:
+    """Öffnet den Snapshot, falls vorhanden und gültig; sonst None (Fallback: JSON-Tabelle)."""
+    if not Path(path).exists():
+        return None
+    try:
+        return RateSnapshot(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning("Ignoring rate snapshot %s: %s", path, e)
+        return None
+
+
+if __name__ == "__main__":
+    version = write_snapshot(build_rate_table(DATA_DIR))
+    print(f"Wrote {SNAPSHOT_PATH} (data_version {version})")
@@ -0,0 +1,493 @@
+# rate_store.py
+"""
+In-Memory-Rate-Tabelle für /v1/calculate und /v1/rates/{country}.
+
+Alle Länderdateien aus scripts/data/{cc}.json werden einmal geladen und als
+unveränderliche Struktur (RateTable) abgelegt. Ein Reload baut immer eine
+komplett neue Tabelle und tauscht sie mit einer einzigen Zuweisung aus –
+Leser sehen also entweder die alte oder die neue Tabelle, nie einen Zwischenstand.
+Lookups machen keinerlei I/O.
+
+Historische Sätze (scripts/data/history/{cc}.json, erzeugt aus TEDB-Periodenabfragen)
+liegen als sortierte Zeitreihen je Land und Kategorie vor; "Satz gültig am Tag X"
+ist eine binäre Suche.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Generic, Mapping, Optional, TypeVar
+
+from rate_changes import EMPTY_FEED, ChangeFeed, change_files, load_change_feed
+
+logger = logging.getLogger("vatify")
+
+DATA_DIR = Path(__file__).resolve().parent / "scripts" / "data"
+HISTORY_DIR_NAME = "history"
+SNAPSHOT_NAME = "rates.snapshot"
+
+T = TypeVar("T")
+
+# Aliase für category_hint -> TEDB-Kategorie-IDs, in Prioritätsreihenfolge.
+# Pro Land wird das erste Ziel genommen, das dort tatsächlich existiert.
+CATEGORY_ALIASES: Dict[str, tuple[str, ...]] = {
+    "FOOD": ("FOODSTUFFS",),
+    "GROCERIES": ("FOODSTUFFS",),
+    "HOSPITALITY": ("ACCOMMODATION", "HOLIDAY_ACCOMMODATION", "RESTAURANT", "FOOD_SERVICE"),
+    "HOTEL": ("ACCOMMODATION", "HOLIDAY_ACCOMMODATION"),
+    "HOTELS": ("ACCOMMODATION", "HOLIDAY_ACCOMMODATION"),
+    "RESTAURANTS": ("RESTAURANT", "FOOD_SERVICE"),
+    "CATERING": ("RESTAURANT", "FOOD_SERVICE"),
+    "BOOK": ("BOOKS", "IMPRESSIONS"),
+    "EBOOK": ("BOOKS", "IMPRESSIONS"),
+    "EBOOKS": ("BOOKS", "IMPRESSIONS"),
+    "NEWSPAPER": ("NEWSPAPERS", "PERIODICALS"),
+    "MAGAZINES": ("PERIODICALS", "NEWSPAPERS"),
+    "MEDICINE": ("PHARMACEUTICAL_PRODUCTS",),
+    "PHARMA": ("PHARMACEUTICAL_PRODUCTS",),
+    "MEDICAL": ("MEDICAL_EQUIPMENT", "MEDICAL_CARE"),
+    "WATER": ("SUPPLY_WATER",),
+    "ELECTRICITY": ("SUPPLY_ELECTRICITY",),
+    "GAS": ("SUPPLY_GAS",),
+    "HEATING": ("SUPPLY_HEATING", "HEAT_COOLING_STEAM"),
+    "TRANSPORT": ("TRANSPORT_PASSENGERS",),
+    "PASSENGER_TRANSPORT": ("TRANSPORT_PASSENGERS",),
+    "CULTURE": ("CULTURAL_EVENTS", "EVENT_ACCESS"),
+    "EVENTS": ("CULTURAL_EVENTS", "EVENT_ACCESS"),
+    "SPORT": ("SPORTING_EVENTS", "ADMISSION_SPORTING_EVENTS", "SPORTING_FACILITY_ACCESS"),
+    "ART": ("PICTURES", "SCULPTURES"),
+    "PLANTS": ("PLANT",),
+    "FLOWERS": ("PLANT",),
+    "RENOVATION_PRIVATE": ("RESIDENTIAL_RENOVATION", "RENOVATION", "PRIVATE_DWELLINGS"),
+    "SOLAR": ("SOLAR_PANELS",),
+    "FUNERALS": ("FUNERAL", "UNDERTAKERS_SERVICES"),
+    "HAIRDRESSER": ("HAIRDRESSING",),
+    "LIBRARIES": ("LOAN_LIBRARIES",),
+}
+
+_category_sep = re.compile(r"[\s\-]+")
+
+
+def normalize_category(hint: str) -> str:
+    """'reduced_rate:Foodstuffs' / ' passenger-transport ' -> 'FOODSTUFFS' / 'PASSENGER_TRANSPORT'"""
+    return _category_sep.sub("_", hint.rsplit(":", 1)[-1].strip()).upper()
+
+
+@dataclass(frozen=True)
+class ReducedRate:
+    rate: float
+    label: str
+
+
+@dataclass(frozen=True)
+class CountryRates:
+    country: str
+    standard_rate: Optional[float]
+    reduced_rates: tuple[ReducedRate, ...]
+    currency: str
+    valid_on: Optional[str]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Frische (mutable) Kopie im Format der JSON-Dateien, z. B. für Responses."""
+        return {
+            "country": self.country,
+            "standard_rate": self.standard_rate,
+            "reduced_rates": [{"rate": rr.rate, "label": rr.label} for rr in self.reduced_rates],
+            "currency": self.currency,
+            "valid_on": self.valid_on,
+        }
+
+
+@dataclass(frozen=True)
+class Timeline(Generic[T]):
+    """Sortierte Gültigkeitsdaten + Werte; values[i] gilt ab dates[i] bis zum nächsten Eintrag."""
+    dates: tuple[date, ...]
+    values: tuple[T, ...]
+
+    def at(self, on: date) -> Optional[T]:
+        i = bisect_right(self.dates, on) - 1
+        return self.values[i] if i >= 0 else None
+
+    def effective_date(self, on: date) -> Optional[date]:
+        i = bisect_right(self.dates, on) - 1
+        return self.dates[i] if i >= 0 else None
+
+
+def _timeline(points: Dict[date, T]) -> Timeline[T]:
+    ordered = sorted(points.items())
+    return Timeline(dates=tuple(d for d, _ in ordered), values=tuple(v for _, v in ordered))
+
+
+@dataclass(frozen=True)
+class CountryHistory:
+    """
+    Zeitreihen eines Landes: Standardsatz und je Kategorie-ID (z. B. FOODSTUFFS)
+    die an einem Tag gültigen reduzierten Sätze, sortiert nach (rate, label).
+    """
+    country: str
+    currency: str
+    standard: Timeline[float]
+    categories: Mapping[str, Timeline[tuple[ReducedRate, ...]]]
+    # Sätze ohne Kategorie-ID gelten nur für die Anzeige
+    uncategorized: Timeline[tuple[ReducedRate, ...]]
+    # normalisierte Kategorie-ID bzw. Alias -> kanonische Kategorie-ID (beim Laden gebaut)
+    category_index: Mapping[str, str]
+    # Anzeige-Datum, falls nur der aktuelle Snapshot (ohne Historie) bekannt ist
+    snapshot_valid_on: Optional[str] = None
+
+    def standard_rate_on(self, on: date) -> Optional[float]:
+        return self.standard.at(on)
+
+    def resolve_category(self, hint: str) -> Optional[str]:
+        return self.category_index.get(normalize_category(hint))
+
+    def category_rates_on(self, hint: str, on: date) -> tuple[ReducedRate, ...]:
+        """Reduzierte Sätze der Kategorie (ID oder Alias) am Tag `on`, niedrigster zuerst."""
+        cat_id = self.category_index.get(normalize_category(hint))
+        if cat_id is None:
+            return ()
+        return self.categories[cat_id].at(on) or ()
+
+    def aliases_of(self, category_id: str) -> list[str]:
+        return sorted(k.lower() for k, v in self.category_index.items() if v == category_id and k != category_id)
+
+    def rates_on(self, on: date) -> Optional[CountryRates]:
+        """Sicht auf alle am Tag `on` gültigen Sätze – im Format der Länderdateien."""
+        eff = self.standard.effective_date(on)
+        if eff is None:
+            return None
+        reduced = list(self.uncategorized.at(on) or ())
+        for tl in self.categories.values():
+            reduced.extend(tl.at(on) or ())
+            cat_eff = tl.effective_date(on)
+            if cat_eff and cat_eff > eff:
+                eff = cat_eff
+        reduced.sort(key=lambda rr: (rr.rate, rr.label))
+        return CountryRates(
+            country=self.country,
+            standard_rate=self.standard.at(on),
+            reduced_rates=tuple(reduced),
+            currency=self.currency,
+            valid_on=self.snapshot_valid_on if eff == date.min else eff.isoformat(),
+        )
+
+
+def _category_of(label: str) -> Optional[str]:
+    # "reduced_rate:FOODSTUFFS" -> "FOODSTUFFS"
+    return label.split(":", 1)[1].upper() if ":" in label else None
+
+
+def _build_history(current: CountryRates, history: Optional[Dict[str, Any]]) -> CountryHistory:
+    """
+    Baut die Zeitreihen aus der Historiendatei (falls vorhanden) und legt den aktuellen
+    Snapshot ab dessen valid_on darüber. Ohne Historie gilt der Snapshot unbegrenzt
+    rückwirkend (date.min) – wie bisher, als supply_date ignoriert wurde. Kategorien, die
+    nur noch in der Historie stehen, enden am valid_on des Snapshots.
+    """
+    std_points: Dict[date, float] = {}
+    cat_points: Dict[str, Dict[date, tuple[ReducedRate, ...]]] = {}
+    uncategorized: Dict[date, tuple[ReducedRate, ...]] = {}
+
+    if history:
+        for p in history.get("standard", []):
+            std_points[date.fromisoformat(p["from"])] = float(p["rate"])
+        for cat_id, points in history.get("categories", {}).items():
+            for p in points:
+                cat_points.setdefault(cat_id.upper(), {})[date.fromisoformat(p["from"])] = tuple(
+                    ReducedRate(rate=float(r["rate"]), label=str(r["label"])) for r in p["rates"]
+                )
+
+    snapshot_from = date.min
+    if history and current.valid_on:
+        snapshot_from = date.fromisoformat(current.valid_on)
+
+    if current.standard_rate is not None:
+        std_points[snapshot_from] = current.standard_rate
+    by_cat: Dict[Optional[str], list[ReducedRate]] = {}
+    for rr in current.reduced_rates:
+        by_cat.setdefault(_category_of(rr.label), []).append(rr)
+    # abgeschaffte Sätze: leerer Eintrag ab snapshot_from, sonst gälte der letzte Historienwert weiter
+    uncategorized[snapshot_from] = tuple(by_cat.pop(None, ()))
+    for cat_id in cat_points:
+        cat_points[cat_id][snapshot_from] = ()
+    for cat_id, rrs in by_cat.items():
+        cat_points.setdefault(cat_id, {})[snapshot_from] = tuple(rrs)
+
+    return CountryHistory(
+        country=current.country,
+        currency=current.currency,
+        standard=_timeline(std_points),
+        categories=MappingProxyType({k: _timeline(v) for k, v in cat_points.items()}),
+        uncategorized=_timeline(uncategorized),
+        category_index=_build_category_index(cat_points.keys()),
+        snapshot_valid_on=current.valid_on,
+    )
+
+
+def _build_category_index(category_ids) -> Mapping[str, str]:
+    index: Dict[str, str] = {}
+    for alias, targets in CATEGORY_ALIASES.items():
+        for target in targets:
+            if target in category_ids:
+                index[alias] = target
+                break
+    # echte Kategorie-IDs haben Vorrang vor gleichnamigen Aliasen
+    for cat_id in category_ids:
+        index[normalize_category(cat_id)] = cat_id
+    return MappingProxyType(index)
+
+
+@dataclass(frozen=True)
+class RateTable:
+    countries: Mapping[str, CountryRates]
+    history: Mapping[str, CountryHistory]
+    # sha256 über alle Dateiinhalte – ändert sich genau dann, wenn sich die Daten ändern
+    version: str
+    # (name, mtime_ns, size) je Datei – billiger Vergleich für reload_if_changed()
+    fingerprint: tuple[tuple[str, int, int], ...]
+    loaded_at: datetime
+    # nummerierte Builds mit Diffs (rate_changes.py); changes.latest = aktuelle Datenversion
+    changes: ChangeFeed = EMPTY_FEED
+
+    def get(self, country_code: str) -> Optional[CountryRates]:
+        return self.countries.get(country_code.upper())
+
+    def get_history(self, country_code: str) -> Optional[CountryHistory]:
+        return self.history.get(country_code.upper())
+
+
+def _is_country_file(path: Path) -> bool:
+    # nur {cc}.json, keine Sammeldateien wie vat_rates.json
+    return len(path.stem) == 2 and path.stem.isalpha() and path.stem.isupper()
+
+
+def _country_files(data_dir: Path) -> list[Path]:
+    files = [p for p in data_dir.glob("*.json") if _is_country_file(p)]
+    files += [p for p in (data_dir / HISTORY_DIR_NAME).glob("*.json") if _is_country_file(p)]
+    return sorted(files)
+
+
+def _data_files(data_dir: Path) -> list[Path]:
+    # Länderdateien + Historie + Änderungs-Feed (für den Reload-Fingerprint)
+    return _country_files(data_dir) + change_files(data_dir)
+
+
+def _fingerprint(files: list[Path]) -> tuple[tuple[str, int, int], ...]:
+    out = []
+    for p in files:
+        st = p.stat()
+        out.append((f"{p.parent.name}/{p.name}", st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def _content_version(raw_files: list[tuple[Path, bytes]]) -> str:
+    digest = hashlib.sha256()
+    for p, raw in raw_files:
+        digest.update(f"{p.parent.name}/{p.name}".encode())
+        digest.update(raw)
+    return digest.hexdigest()[:16]
+
+
+def content_version(data_dir: Path = DATA_DIR) -> str:
+    """RateTable.version der Länderdateien, ohne JSON zu parsen (Abgleich mit dem Snapshot)."""
+    return _content_version([(p, p.read_bytes()) for p in _country_files(data_dir)])
+
+
+def _parse_country(cc: str, data: Dict[str, Any]) -> CountryRates:
+    std = data.get("standard_rate")
+    return CountryRates(
+        country=cc,
+        standard_rate=float(std) if std is not None else None,
+        reduced_rates=tuple(
+            ReducedRate(rate=float(rr["rate"]), label=str(rr["label"]))
+            for rr in data.get("reduced_rates", [])
+        ),
+        currency=data.get("currency", "EUR"),
+        valid_on=data.get("valid_on"),
+    )
+
+
+def build_rate_table(data_dir: Path = DATA_DIR) -> RateTable:
+    """Liest alle Länderdateien und baut eine neue, unveränderliche RateTable."""
+    files = _country_files(data_dir)
+    feed_files = change_files(data_dir)
+    fingerprint = _fingerprint(files + feed_files)
+    raw_files = [(p, p.read_bytes()) for p in files]
+    countries: Dict[str, CountryRates] = {}
+    histories: Dict[str, Dict[str, Any]] = {}
+    for p, raw in raw_files:
+        if p.parent.name == HISTORY_DIR_NAME:
+            histories[p.stem] = json.loads(raw)
+        else:
+            countries[p.stem] = _parse_country(p.stem, json.loads(raw))
+
+    return RateTable(
+        countries=MappingProxyType(countries),
+        history=MappingProxyType({cc: _build_history(cr, histories.get(cc)) for cc, cr in countries.items()}),
+        version=_content_version(raw_files),
+        fingerprint=fingerprint,
+        loaded_at=datetime.now(timezone.utc),
+        changes=load_change_feed(feed_files),
+    )
+
+
+class RateRepository:
+    """
+    Hält die aktuelle RateTable. Leser greifen ohne Lock auf `table` zu;
+    der Lock serialisiert nur konkurrierende Reloads.
+
+    Liegt ein Binär-Snapshot (rate_snapshot.py) vor, bedient get_rate_source() die
+    Lookups direkt aus dem mmap und die JSON-Tabelle wird erst bei Bedarf geladen.
+    Die JSON-Dateien bleiben die Quelle: der Snapshot wird nur benutzt, solange seine
+    content_id zum Inhalt der Länderdateien passt, sonst rechnet auch /v1/calculate
+    mit der JSON-Tabelle, bis ein passender Snapshot geschrieben wird.
+    """
+
+    def __init__(self, data_dir: Path = DATA_DIR, snapshot_path: Optional[Path] = None):
+        self.data_dir = Path(data_dir)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else self.data_dir / SNAPSHOT_NAME
+        self._table: Optional[RateTable] = None
+        self._snapshot = None
+        # (Snapshot-Header, JSON-Fingerprint) der letzten Prüfung, ob der Snapshot zu den JSON-Daten passt
+        self._snapshot_checked = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def table(self) -> RateTable:
+        table = self._table
+        if table is None:
+            table = self.load()
+        return table
+
+    def get(self, country_code: str) -> Optional[CountryRates]:
+        return self.table.get(country_code)
+
+    def get_history(self, country_code: str) -> Optional[CountryHistory]:
+        return self.table.get_history(country_code)
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def get_rate_source(self, country_code: str):
+        """
+        Quelle für Satz-Lookups (standard_rate_on / category_rates_on): der mmap-Snapshot,
+        falls geladen, sonst die Historie aus der JSON-Tabelle.
+        """
+        snap = self._snapshot
+        if snap is not None:
+            return snap.get(country_code)
+        return self.get_history(country_code)
+
+    def load_snapshot(self) -> bool:
+        """
+        Öffnet den Binär-Snapshot (falls vorhanden, gültig und zum JSON-Stand passend) und
+        tauscht ihn atomar ein. Ein veralteter Snapshot wird verworfen.
+        """
+        from rate_snapshot import open_snapshot
+
+        fingerprint = _fingerprint(_data_files(self.data_dir))
+        snap = open_snapshot(self.snapshot_path)
+        self._snapshot_checked = (snap.header_key if snap else None, fingerprint)
+        current = self._snapshot
+        if snap is None or (current is not None and snap.header_key == current.header_key):
+            # gleiche Datei (oder keine gültige mehr): den gemappten Snapshot nur neu abgleichen
+            snap = current
+        if snap is None:
+            return False
+        version = content_version(self.data_dir)
+        if snap.content_id != version:
+            logger.warning("Rate snapshot content %s does not match JSON data %s; using JSON",
+                           snap.content_id, version)
+            self._snapshot = None
+            return False
+        if snap is not current:
+            self._snapshot = snap  # alte Mappings schließt der GC, sobald kein Leser sie mehr hält
+            logger.info("Rate snapshot mapped: data_version %d, content %s", snap.data_version, snap.content_id)
+        return True
+
+    def _snapshot_outdated(self) -> bool:
+        """Neuer Snapshot-Header oder geänderte JSON-Dateien seit der letzten Prüfung?"""
+        from rate_snapshot import read_header
+
+        header = read_header(self.snapshot_path)
+        # (data_version, content_id, body_crc32)
+        key = (header[3], header[5].rstrip(b"\0").decode("ascii", "replace"), header[-1]) if header else None
+        if key is None and self._snapshot_checked is None:
+            return False
+        return (key, _fingerprint(_data_files(self.data_dir))) != self._snapshot_checked
+
+    def load(self) -> RateTable:
+        with self._lock:
+            table = build_rate_table(self.data_dir)
+            self._table = table  # atomarer Swap
+        logger.info("Rate table loaded: %d countries, version %s", len(table.countries), table.version)
+        return table
+
+    def reload_if_changed(self) -> bool:
+        """
+        Lädt neu, wenn sich mtime/Größe einer Datei geändert hat (oder Dateien
+        hinzugekommen/weggefallen sind) bzw. der Snapshot-Header eine neue
+        Version/Prüfsumme trägt. Nach JSON-Änderungen wird der Snapshot erneut
+        abgeglichen und, wenn er nicht mehr passt, verworfen. Schlägt der Reload
+        fehl – etwa weil eine Datei gerade halb geschrieben ist – bleibt die alte
+        Tabelle aktiv.
+        """
+        changed = False
+        try:
+            if self._snapshot_outdated():
+                before = self._snapshot
+                self.load_snapshot()
+                changed = self._snapshot is not before
+        except OSError as e:
+            logger.warning("Rate snapshot check failed: %s", e)
+
+        current = self._table
+        if current is None and self._snapshot is not None:
+            # JSON-Tabelle wird noch nicht gebraucht (lazy)
+            return changed
+        try:
+            fingerprint = _fingerprint(_data_files(self.data_dir))
+        except OSError as e:
+            logger.warning("Rate data stat failed: %s", e)
+            return changed
+        if current is not None and fingerprint == current.fingerprint:
+            return changed
+        try:
+            new_table = self.load()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Rate data reload failed, keeping version %s: %s",
+                           current.version if current else None, e)
+            return changed
+        return changed or current is None or new_table.version != current.version
+
+    def start_watcher(self, interval: float = 30.0) -> None:
+        """Startet einen Daemon-Thread, der alle `interval` Sekunden reload_if_changed() aufruft."""
+        if interval <= 0 or (self._watcher and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=_run, name="rate-store-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=1)
+            self._watcher = None
+
+
+# Prozessweite Instanz
+rate_repository = RateRepository()
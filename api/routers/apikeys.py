@@ -6,6 +6,7 @@ from db.models import ApiKey, MonthlyQuota
 from schemas.apikey import APIKeyCreateIn, APIKeyCreateOut, APIKeyListItem
 from core.security import generate_api_key, hash_api_key
 from deps import get_current_user
+from middleware.quota import api_key_cache
 from datetime import date
 
 router = APIRouter()
@@ -31,6 +32,7 @@ async def revoke_key(key_id: str, user=Depends(get_current_user), db: AsyncSessi
         raise HTTPException(404, "Key not found")
     key.revoked = True
     await db.commit()
+    api_key_cache.invalidate(key.key_hash)
     return {"ok": True}
 
 @router.post("/{key_id}/rotate", response_model=APIKeyCreateOut)
@@ -44,6 +46,7 @@ async def rotate_key(key_id: str, user=Depends(get_current_user), db: AsyncSessi
     new_hash = hash_api_key(secret)
     new_key = ApiKey(user_id=user.id, name=key.name, key_hash=new_hash, prefix=prefix, last4=last4)
     db.add(new_key); await db.commit(); await db.refresh(new_key)
+    api_key_cache.invalidate(key.key_hash)
     return APIKeyCreateOut(id=str(new_key.id), name=new_key.name, created_at=new_key.created_at, prefix=new_key.prefix, last4=new_key.last4, revoked=new_key.revoked, secret=secret)
 
 @router.get("/{key_id}/usage")
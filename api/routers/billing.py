@@ -1,4 +1,5 @@
-import os, stripe
+import os
+from functools import cache
 from fastapi import APIRouter, HTTPException, Request, Depends
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,8 +9,15 @@ from db.stripe_user import (
     find_user, find_user_by_customer, find_user_by_subscription
 )
 from core.config import settings
+from middleware.quota import api_key_cache
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+@cache
+def _stripe():
+    # Das stripe-SDK kostet beim Import mehrere hundert ms (alle Ressourcen-Module);
+    # erst beim ersten Billing-Request laden statt bei jedem Kaltstart der App.
+    import stripe
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    return stripe
 
 router = APIRouter(prefix="/billing", tags=["billing"])
 
@@ -22,7 +30,7 @@ async def ensure_stripe_customer(db: AsyncSession, user_id: str) -> str:
     user = await find_user(db, user_id)
     if user.stripe_customer_id:
         return user.stripe_customer_id
-    cust = stripe.Customer.create(email=user.email, metadata={"app_user_id": user_id})
+    cust = _stripe().Customer.create(email=user.email, metadata={"app_user_id": user_id})
     user.stripe_customer_id = cust.id
     await db.commit()
     return cust.id
@@ -35,6 +43,7 @@ async def upsert_user_subscription(db: AsyncSession, customer_id: str, subscript
         from datetime import datetime, timezone
         user.current_period_end = datetime.fromtimestamp(current_period_end, tz=timezone.utc)
     await db.commit()
+    api_key_cache.invalidate_user(user.id)   # Quota-Limit hängt am Abo-Status
 
 async def update_subscription_status(db: AsyncSession, subscription_id: str, status: str, current_period_end: int | None = None):
     user = await find_user_by_subscription(db, subscription_id)
@@ -43,6 +52,7 @@ async def update_subscription_status(db: AsyncSession, subscription_id: str, sta
         from datetime import datetime, timezone
         user.current_period_end = datetime.fromtimestamp(current_period_end, tz=timezone.utc)
     await db.commit()
+    api_key_cache.invalidate_user(user.id)   # Quota-Limit hängt am Abo-Status
 
 # ---------- Endpoints ----------
 @router.post("/checkout/session")
@@ -50,7 +60,7 @@ async def create_checkout_session(db: AsyncSession = Depends(get_db), user=Depen
     user_id = user.id
     customer_id = await ensure_stripe_customer(db, user_id)
 
-    session = stripe.checkout.Session.create(
+    session = _stripe().checkout.Session.create(
         mode="subscription",
         customer=customer_id,
         line_items=[{"price": settings.STRIPE_PRICE_BASIC, "quantity": 1}],
@@ -67,7 +77,7 @@ async def create_checkout_session(db: AsyncSession = Depends(get_db), user=Depen
 async def create_portal_session(data: CreatePortalIn, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
     user_id = user.id
     customer_id = await ensure_stripe_customer(db, user_id)
-    portal = stripe.billing_portal.Session.create(
+    portal = _stripe().billing_portal.Session.create(
         customer=customer_id,
         return_url=settings.BASE_URL + data.return_path,
     )
@@ -79,7 +89,7 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.body()
     sig = request.headers.get("stripe-signature")
     try:
-        event = stripe.Webhook.construct_event(payload, sig, settings.STRIPE_WEBHOOK_SECRET)
+        event = _stripe().Webhook.construct_event(payload, sig, settings.STRIPE_WEBHOOK_SECRET)
     except Exception as e:
         print(f"Webhook error: {e}")
         raise HTTPException(status_code=400, detail=f"Webhook error: {e}")
@@ -93,7 +103,7 @@ async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
         subscription_id = obj.get("subscription")
         # hole Subscription, um period_end zu bekommen
         if subscription_id:
-            sub = stripe.Subscription.retrieve(subscription_id)
+            sub = _stripe().Subscription.retrieve(subscription_id)
             await upsert_user_subscription(
                 db,
                 customer_id=customer_id,
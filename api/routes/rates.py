@@ -1,9 +1,11 @@
 # app/routes/rates.py
 from datetime import date
-from typing import List, Optional, Dict, Literal
+from typing import List, Optional, Literal
 from fastapi import APIRouter, HTTPException, Query, Path
 from pydantic import BaseModel, Field
 
+from rate_store import rate_repository
+
 router = APIRouter(prefix="/rates", tags=["rates"])
 
 class ReducedRate(BaseModel):
@@ -18,30 +20,7 @@ class CountryRates(BaseModel):
     valid_on: date
     source: str = "VATify/static"
 
-# --- Minimaler Datenspeicher (kann später aus einer DB/EU-Quelle gespeist werden) ---
-# Struktur erlaubt versions-/datumsabhängige Sätze
-_VAT_RATES: Dict[str, Dict[date, Dict]] = {
-    "DE": {
-        date(2021, 1, 1): {
-            "standard_rate": 19.0,
-            "reduced_rates": [{"rate": 7.0, "label": "reduced"}, {"rate": 0.0, "label": "zero"}],
-            "currency": "EUR",
-        }
-    },
-    "FR": {
-        date(2021, 1, 1): {
-            "standard_rate": 20.0,
-            "reduced_rates": [{"rate": 10.0, "label": "reduced"}, {"rate": 5.5, "label": "reduced2"}],
-            "currency": "EUR",
-        }
-    },
-    # weitere Länder hier …
-}
-
-def _pick_effective_date(rates_by_date: Dict[date, Dict], wanted: date) -> Optional[date]:
-    # nimmt den jüngsten Eintrag <= wanted
-    candidates = [d for d in rates_by_date.keys() if d <= wanted]
-    return max(candidates) if candidates else None
+# Datenquelle: historischer Rate-Store (scripts/data + scripts/data/history), siehe rate_store.py
 
 @router.get("/{country}", response_model=CountryRates)
 def get_rates(
@@ -50,25 +29,24 @@ def get_rates(
 ):
     key = country.upper()
     if len(key) != 2 or not key.isalpha():
-        raise HTTPException(status_code=400, error="country must be a 2-character ISO Alpha-2 code (e.g. DE).")
+        raise HTTPException(status_code=400, detail="country must be a 2-character ISO Alpha-2 code (e.g. DE).")
 
     today = date.today()
     wanted = date_param or today
 
-    country_data = _VAT_RATES.get(key)
-    if not country_data:
-        raise HTTPException(status_code=404, error=f"Unknown Country Key: {key}")
+    history = rate_repository.get_history(key)
+    if not history:
+        raise HTTPException(status_code=404, detail=f"Unknown Country Key: {key}")
 
-    eff = _pick_effective_date(country_data, wanted)
-    if eff is None:
-        raise HTTPException(status_code=404, error=f"No rates found for {key} on {wanted.isoformat()}.")
+    view = history.rates_on(wanted)
+    if view is None:
+        raise HTTPException(status_code=404, detail=f"No rates found for {key} on {wanted.isoformat()}.")
 
-    payload = country_data[eff]
     return CountryRates(
         country=key,
-        standard_rate=payload["standard_rate"],
-        reduced_rates=[ReducedRate(**r) for r in payload.get("reduced_rates", [])],
-        currency=payload.get("currency", "EUR"),
-        valid_on=eff,
-        source="VATify/static",
+        standard_rate=view.standard_rate,
+        reduced_rates=[ReducedRate(rate=rr.rate, label=rr.label) for rr in view.reduced_rates],
+        currency=view.currency,
+        valid_on=view.valid_on,
+        source="VATify/TEDB",
     )
@@ -0,0 +1,221 @@
+# scripts/bulk_calculate.py
+"""
+Offline-Massenberechnung für Rechnungsexporte (CSV, NDJSON oder Parquet) mit den
+gleichen Modellen und Regeln wie /v1/calculate (calculate.py), ohne HTTP/DB/Netz.
+
+- Verteilung in Chunks auf einen Prozess-Pool (Standard: alle Kerne); jeder Worker
+  lädt die Rate-Tabelle (bzw. den mmap-Snapshot) genau einmal.
+- Reverse-Charge-Prüfungen über einen austauschbaren Validator:
+    --vies-cache FILE   frühere VIES-Ergebnisse (JSON), unbekannte Nummern = "unavailable"
+    --vies-stub ANTWORT feste Antwort (valid | invalid | unavailable), Standard: unavailable
+- Ausgabe in Eingabereihenfolge als CSV oder NDJSON (nach Dateiendung, sonst CSV auf stdout).
+
+CSV-/Parquet-Spalten wie bei /v1/calculate/stream (calc_stream.CSV_COLUMNS).
+
+Aufruf (aus api/):  python scripts/bulk_calculate.py invoices-2024.csv -o results.csv --vies-cache vies.json
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from calc_stream import REQUIRED_CSV_COLUMNS, RESULT_CSV_COLUMNS, csv_row_to_item, render_items  # noqa: E402
+from calculate import BatchCalculator, VatValidator  # noqa: E402
+from rate_store import rate_repository  # noqa: E402
+from vat_kernel import Rounding  # noqa: E402
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # optional, nur für .parquet-Eingaben
+    pq = None
+
+CHUNK_ITEMS = 5_000
+_STUB_ANSWERS = {
+    "valid": (True, "validated"),
+    "invalid": (False, "validated"),
+    "unavailable": (False, "unavailable"),
+}
+_clean_non_alnum = re.compile(r"[^A-Za-z0-9]")
+
+
+# --- Validatoren ---
+
+def _vat_key(country_code: str, vat_number: Optional[str]) -> str:
+    cc = country_code.upper()
+    num = _clean_non_alnum.sub("", vat_number or "").upper()
+    return num if num.startswith(cc) else cc + num
+
+
+class StubValidator:
+    """Feste Antwort für alle Nummern (Testläufe ohne Netz)."""
+
+    def __init__(self, answer: str):
+        self.result = _STUB_ANSWERS[answer]
+
+    async def __call__(self, country_code: str, vat_number: Optional[str]) -> Tuple[bool, str]:
+        return self.result
+
+
+class CacheFileValidator:
+    """
+    Frühere VIES-Ergebnisse aus einer JSON-Datei: {"DE123456789": true, ...} oder eine Liste
+    von /v1/validate-vat-Antworten ({"country_code", "vat_number", "valid"}).
+    """
+
+    def __init__(self, path):
+        data = json.loads(Path(path).read_bytes())
+        if isinstance(data, dict):
+            pairs = ((_vat_key(k[:2], k), v) for k, v in data.items())
+        else:
+            pairs = ((_vat_key(r["country_code"], r["vat_number"]), r["valid"]) for r in data)
+        self.results: Dict[str, bool] = {k: bool(v) for k, v in pairs}
+
+    async def __call__(self, country_code: str, vat_number: Optional[str]) -> Tuple[bool, str]:
+        valid = self.results.get(_vat_key(country_code, vat_number))
+        if valid is None:
+            return False, "unavailable"  # wie ein VIES-Ausfall: kein Reverse Charge
+        return valid, "validated"
+
+
+def build_validator(spec: str) -> VatValidator:
+    """"stub:<antwort>" oder "cache:<pfad>" – als String, damit er an die Worker gepickelt werden kann."""
+    kind, _, arg = spec.partition(":")
+    if kind == "cache":
+        return CacheFileValidator(arg)
+    return StubValidator(arg)
+
+
+# --- Eingabe ---
+
+def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+
+
+def _check_columns(columns) -> None:
+    missing = REQUIRED_CSV_COLUMNS - {str(c).strip().lower() for c in columns}
+    if missing:
+        raise SystemExit(f"input misses column(s): {', '.join(sorted(missing))}")
+
+
+def iter_chunks(path: Path, chunk_items: int = CHUNK_ITEMS) -> Iterator[List[Dict[str, Any]]]:
+    """Liest die Eingabe stückweise als CalcRequest-förmige Dicts."""
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        if pq is None:
+            raise SystemExit("Parquet input needs pyarrow (pip install pyarrow)")
+        parquet = pq.ParquetFile(path)
+        _check_columns(parquet.schema_arrow.names)
+        for batch in parquet.iter_batches(batch_size=chunk_items):
+            yield [csv_row_to_item(_normalize_row(row)) for row in batch.to_pylist()]
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if suffix in (".ndjson", ".jsonl"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            reader = csv.DictReader(f)
+            _check_columns(reader.fieldnames or [])
+            rows = (csv_row_to_item(_normalize_row(row)) for row in reader)
+
+        chunk: List[Dict[str, Any]] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_items:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+# --- Worker ---
+
+_calculator: Optional[BatchCalculator] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(validator_spec: str, rounding_mode: str) -> None:
+    global _calculator, _loop
+    if not rate_repository.load_snapshot():
+        rate_repository.load()
+    _loop = asyncio.new_event_loop()
+    _calculator = BatchCalculator(build_validator(validator_spec), Rounding(mode=rounding_mode))
+
+
+def _process_chunk(fmt: str, start: int, raw_items: List[Dict[str, Any]]) -> Tuple[bytes, int]:
+    items = _loop.run_until_complete(_calculator.calculate(raw_items))
+    for offset, item in enumerate(items):
+        item.index = start + offset
+    return render_items(fmt, items), sum(1 for item in items if item.error is not None)
+
+
+def run(input_path: Path, out, fmt: str = "csv", workers: Optional[int] = None,
+        validator_spec: str = "stub:unavailable", rounding_mode: str = "half_up",
+        chunk_items: int = CHUNK_ITEMS) -> Dict[str, Any]:
+    """Rechnet `input_path` durch und schreibt nach `out` (binär). Höchstens 2 Chunks je Worker in Arbeit."""
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    count = errors = 0
+
+    if fmt == "csv":
+        out.write((",".join(RESULT_CSV_COLUMNS) + "\n").encode("utf-8"))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(validator_spec, rounding_mode)) as pool:
+        pending = deque()
+
+        def drain_one():
+            nonlocal errors
+            body, chunk_errors = pending.popleft().result()
+            out.write(body)
+            errors += chunk_errors
+
+        for chunk in iter_chunks(input_path, chunk_items):
+            pending.append(pool.submit(_process_chunk, fmt, count, chunk))
+            count += len(chunk)
+            if len(pending) >= 2 * workers:
+                drain_one()
+        while pending:
+            drain_one()
+
+    return {"items": count, "errors": errors, "workers": workers, "seconds": time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate VAT for a CSV/NDJSON/Parquet invoice export offline")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("-o", "--output", type=Path, help=".csv or .ndjson (default: CSV on stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ITEMS)
+    parser.add_argument("--rounding-mode", choices=["half_up", "half_even"], default="half_up")
+    vies = parser.add_mutually_exclusive_group()
+    vies.add_argument("--vies-cache", metavar="FILE", help="JSON with earlier VIES results")
+    vies.add_argument("--vies-stub", choices=sorted(_STUB_ANSWERS), default="unavailable")
+    args = parser.parse_args(argv)
+
+    validator_spec = f"cache:{args.vies_cache}" if args.vies_cache else f"stub:{args.vies_stub}"
+    fmt = "ndjson" if args.output and args.output.suffix.lower() in (".ndjson", ".jsonl") else "csv"
+
+    if args.output:
+        with open(args.output, "wb") as out:
+            stats = run(args.input, out, fmt, args.workers, validator_spec, args.rounding_mode, args.chunk_size)
+    else:
+        stats = run(args.input, sys.stdout.buffer, fmt, args.workers, validator_spec, args.rounding_mode,
+                    args.chunk_size)
+        sys.stdout.flush()
+
+    print(f"--- {stats['items']} items ({stats['errors']} errors) in {stats['seconds']:.2f}s "
+          f"with {stats['workers']} workers ---", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,28 @@
 # pip install zeep requests lxml
+import argparse
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
-from typing import Dict, Any, List, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional
 import requests
+import requests.adapters
 from lxml import etree
-from zeep import Client, Settings
-from zeep.transports import Transport
+
+if TYPE_CHECKING:
+    from zeep import Client
 
 WSDL_URL = "https://ec.europa.eu/taxation_customs/tedb/ws/VatRetrievalService.wsdl"
+# lokale Kopie von WSDL + XSDs (Pfad zur .wsdl, XSD-Imports relativ dazu); sonst vom EU-Server
+TEDB_WSDL = os.environ.get("TEDB_WSDL") or WSDL_URL
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+# Periodenabfragen über viele Jahre brauchen huge_tree (wie Settings(xml_huge_tree=True))
+_huge_tree_parser = etree.XMLParser(huge_tree=True, resolve_entities=False)
 
 def _safe_iso_date_str(s: Optional[str]) -> Optional[str]:
     if not s:
@@ -24,32 +40,191 @@ def _date_key(s: Optional[str]) -> date:
     except Exception:
         return date.min
 
-def build_client() -> Client:
-    settings = Settings(strict=True, xml_huge_tree=True)
-    transport = Transport(session=requests.Session(), timeout=30)
-    return Client(wsdl=WSDL_URL, settings=settings, transport=transport)
+def build_client(session: Optional[requests.Session] = None, wsdl: Optional[str] = None) -> "Client":
+    # zeep erst hier: Parser, Offline-Quelle und Tests kommen ohne zeep-Import aus
+    from zeep import Client, Settings
+    from zeep.transports import Transport
 
-def retrieve_vat_rates_raw(country_iso: str,
-                           situation_on: Optional[date] = None,
-                           period_from: Optional[date] = None,
-                           period_to: Optional[date] = None) -> List[Dict[str, Any]]:
-    client = build_client()
-    memberStates = {"isoCode": [country_iso.upper()]}
+    # raw_response fest eingestellt: client.settings(...) als Context-Manager ist nicht thread-safe
+    settings = Settings(strict=True, xml_huge_tree=True, raw_response=True)
+    transport = Transport(session=session or requests.Session(), timeout=30)
+    return Client(wsdl=wsdl or TEDB_WSDL, settings=settings, transport=transport)
+
+def _recording_name(country_iso: str,
+                    situation_on: Optional[date] = None,
+                    period_from: Optional[date] = None,
+                    period_to: Optional[date] = None) -> str:
+    cc = country_iso.upper()
+    if period_from and period_to:
+        return f"{cc}_{period_from.isoformat()}_{period_to.isoformat()}.xml"
+    return f"{cc}_{(situation_on or date.today()).isoformat()}.xml"
+
+class TedbSource:
+    """
+    Live-Quelle: ein Zeep-Client (WSDL wird beim ersten Abruf einmal geladen,
+    aus `wsdl` bzw. TEDB_WSDL) und ein Connection-Pool für alle Länder/Threads.
+    """
+
+    def __init__(self, pool_size: int = 8, wsdl: Optional[str] = None):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.wsdl = wsdl
+        self._client: Optional["Client"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> "Client":
+        with self._lock:
+            if self._client is None:
+                self._client = build_client(self.session, self.wsdl)
+            return self._client
 
-    with client.settings(raw_response=True):
+    def fetch(self, country_iso: str,
+              situation_on: Optional[date] = None,
+              period_from: Optional[date] = None,
+              period_to: Optional[date] = None) -> bytes:
+        memberStates = {"isoCode": [country_iso.upper()]}
         if period_from and period_to:
-            resp = client.service.retrieveVatRates(
+            resp = self.client.service.retrieveVatRates(
                 memberStates=memberStates,
                 from_=period_from.isoformat(),
                 to_=period_to.isoformat(),
             )
         else:
-            resp = client.service.retrieveVatRates(
+            resp = self.client.service.retrieveVatRates(
                 memberStates=memberStates,
                 situationOn=(situation_on or date.today()).isoformat(),
             )
+        return resp.content
+
+class RecordedTedbSource:
+    """
+    Offline-Stand-in: liefert aufgezeichnete SOAP-Responses aus `directory`
+    ({CC}_{situationOn}.xml bzw. {CC}_{from}_{to}.xml). Mit `record_from` werden
+    fehlende Responses live geholt und gespeichert. `latency` simuliert die
+    Antwortzeit des Dienstes (für Benchmarks).
+    """
+
+    def __init__(self, directory, record_from: Optional[TedbSource] = None, latency: float = 0.0):
+        self.directory = Path(directory)
+        self.record_from = record_from
+        self.latency = latency
+
+    def fetch(self, country_iso: str,
+              situation_on: Optional[date] = None,
+              period_from: Optional[date] = None,
+              period_to: Optional[date] = None) -> bytes:
+        path = self.directory / _recording_name(country_iso, situation_on, period_from, period_to)
+        if not path.exists():
+            if self.record_from is None:
+                raise FileNotFoundError(f"No recorded TEDB response: {path}")
+            content = self.record_from.fetch(country_iso, situation_on, period_from, period_to)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            return content
+        if self.latency:
+            time.sleep(self.latency)
+        return path.read_bytes()
+
+_default_source: Optional[TedbSource] = None
+_default_source_lock = threading.Lock()
+
+def default_source() -> TedbSource:
+    global _default_source
+    with _default_source_lock:
+        if _default_source is None:
+            _default_source = TedbSource()
+        return _default_source
+
+def retrieve_vat_rates_raw(country_iso: str,
+                           situation_on: Optional[date] = None,
+                           period_from: Optional[date] = None,
+                           period_to: Optional[date] = None,
+                           source=None) -> List[Dict[str, Any]]:
+    content = (source or default_source()).fetch(country_iso, situation_on, period_from, period_to)
+    return parse_vat_rates_response(content)
+
+def parse_vat_rates_response(content) -> List[Dict[str, Any]]:
+    return list(iter_vat_rate_results(content))
+
+_RESULT_TAGS = ("{*}vatRateResult", "{*}vatRateResults", "{*}Fault")
+
+def _local(tag) -> Optional[str]:
+    # "{ns}name" -> "name"; Kommentare/PIs haben keinen String-Tag
+    return tag.rpartition("}")[2] if isinstance(tag, str) else None
+
+def _first_child(node, local_name: str):
+    for child in node:
+        if _local(child.tag) == local_name:
+            return child
+    return None
+
+def iter_vat_rate_results(content) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming-Parser (iterparse) für retrieveVatRates-Responses: liefert die
+    Result-Dicts einzeln und räumt verarbeitete Elemente sofort ab, damit
+    Mehrjahres-Periodenabfragen nicht als kompletter Baum im Speicher liegen.
+    Ergebnis identisch zu parse_vat_rates_response_xpath().
+    `content`: bytes oder file-like.
+    """
+    source = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    for _, el in etree.iterparse(source, events=("end",), tag=_RESULT_TAGS,
+                                 huge_tree=True, resolve_entities=False):
+        if _local(el.tag) == "Fault":
+            fs = _first_child(el, "faultstring")
+            if fs is not None and fs.text is not None:
+                raise RuntimeError(f"TEDB SOAP Fault: {fs.text}")
+            continue
+
+        fields: Dict[str, Any] = {}
+        for child in el:
+            name = _local(child.tag)
+            if name is not None and name not in fields:  # wie XPath [0]: erstes Vorkommen zählt
+                fields[name] = child
+
+        def find_txt(name):
+            node = fields.get(name)
+            return node.text.strip() if node is not None and node.text else None
+
+        rate_value = None
+        rate_kind = None
+        rate_node = fields.get("rate")
+        if rate_node is not None:
+            value_node = _first_child(rate_node, "value")
+            kind_node = _first_child(rate_node, "type")
+            rate_value_txt = value_node.text if value_node is not None else None
+            rate_kind = kind_node.text if kind_node is not None else None
+            if rate_value_txt:
+                try:
+                    rate_value = float(rate_value_txt.replace(",", "."))
+                except ValueError:
+                    rate_value = None
+
+        cat_node = fields.get("category")
+        cat_id = None
+        if cat_node is not None:
+            ident = _first_child(cat_node, "identifier")
+            cat_id = ident.text if ident is not None else None
 
-    root = etree.fromstring(resp.content)
+        yield {
+            "memberState": find_txt("memberState"),
+            "type": find_txt("type"),  # 'STANDARD' | 'REDUCED'
+            "situationOn": _safe_iso_date_str(find_txt("situationOn")),  # normalized 'YYYY-MM-DD'
+            "rate": {"value": rate_value, "type": rate_kind},  # rate.type like 'DEFAULT', 'EXEMPTED', ...
+            "categoryId": cat_id,
+        }
+
+        # verarbeitete Elemente freigeben (inkl. bereits abgearbeiteter Geschwister)
+        el.clear(keep_tail=True)
+        parent = el.getparent()
+        if parent is not None:
+            while el.getprevious() is not None:
+                del parent[0]
+
+def parse_vat_rates_response_xpath(content: bytes) -> List[Dict[str, Any]]:
+    """Bisheriger Parser (kompletter Baum + XPath je Feld) – Referenz für Tests/Benchmarks."""
+    root = etree.fromstring(content, parser=_huge_tree_parser)
 
     # Fault detection
     fault = root.xpath("//*[local-name()='Fault']/*[local-name()='faultstring']/text()")
@@ -147,17 +322,206 @@ def map_results_to_api_json(country_iso: str,
         "source": "TEDB SOAP VatRetrievalService",
     }
 
+# ---------- Historie (Periodenabfrage) für den Rate-Store ----------
+HISTORY_FROM = date(2000, 1, 1)
+
+def map_results_to_history(country_iso: str,
+                           results: List[Dict[str, Any]],
+                           period_from: date,
+                           period_to: date,
+                           current: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Baut aus einer TEDB-Periodenabfrage Zeitreihen je Kategorie:
+      standard:   [{"from": "YYYY-MM-DD", "rate": 19.0}, ...]
+      categories: {"FOODSTUFFS": [{"from": ..., "rates": [{"rate", "label"}, ...]}, ...]}
+    Jeder Eintrag gilt ab "from" bis zum nächsten Eintrag derselben Kategorie. Mit `current`
+    (map_results_to_api_json) endet jede Kategorie, die dort fehlt, mit "rates": [] ab valid_on.
+    """
+    standard: Dict[str, float] = {}
+    categories: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for r in results:
+        val = r.get("rate", {}).get("value")
+        since = r.get("situationOn")
+        if val is None or not since:
+            continue
+        if r.get("type") == "STANDARD":
+            standard[since] = float(val)
+        elif r.get("type") == "REDUCED" and r.get("categoryId"):
+            cat_id = r["categoryId"]
+            label = f"{(r.get('rate', {}).get('type') or 'REDUCED_RATE').lower()}:{cat_id}"
+            entries = categories.setdefault(cat_id, {}).setdefault(since, [])
+            if not any(e["rate"] == float(val) and e["label"] == label for e in entries):
+                entries.append({"rate": float(val), "label": label})
+
+    if current and current.get("valid_on"):
+        in_current = {rr["label"].split(":", 1)[1] for rr in current["reduced_rates"] if ":" in rr["label"]}
+        for cat_id, points in categories.items():
+            if cat_id not in in_current and _date_key(max(points, key=_date_key)) < _date_key(current["valid_on"]):
+                points[current["valid_on"]] = []
+
+    return {
+        "country": country_iso.upper(),
+        "period_from": period_from.isoformat(),
+        "period_to": period_to.isoformat(),
+        "standard": [{"from": d, "rate": standard[d]} for d in sorted(standard, key=_date_key)],
+        "categories": {
+            cat_id: [
+                {"from": d, "rates": sorted(points[d], key=lambda x: (x["rate"], x["label"]))}
+                for d in sorted(points, key=_date_key)
+            ]
+            for cat_id, points in sorted(categories.items())
+        },
+        "source": "TEDB SOAP VatRetrievalService",
+    }
+
 # ---------- Beispielnutzung ----------
-if __name__ == "__main__":
-    EU_COUNTRY_CODES = {
-        "AT","BE","BG","CY","CZ","DE","DK","EE","EL","ES","FI","FR","HR","HU",
-        "IE","IT","LT","LU","LV","MT","NL","PL","PT","RO","SE","SI","SK","XI"
+# ---------- Pipeline ----------
+EU_COUNTRY_CODES = {
+    "AT","BE","BG","CY","CZ","DE","DK","EE","EL","ES","FI","FR","HR","HU",
+    "IE","IT","LT","LU","LV","MT","NL","PL","PT","RO","SE","SI","SK","XI"
+}
+
+def write_json_if_changed(path: Path, obj: Dict[str, Any]) -> bool:
+    """Schreibt nur, wenn sich der Inhalt geändert hat (atomar via temp + os.replace)."""
+    content = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    try:
+        if path.read_bytes() == content:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+    return True
+
+def _without_volatile(obj: Dict[str, Any]) -> Dict[str, Any]:
+    # period_to ist immer "heute" und allein kein Grund, die Datei neu zu schreiben
+    return {k: v for k, v in obj.items() if k != "period_to"}
+
+def load_country(cc: str, source, data_dir: Path, with_history: bool = True,
+                 situation_on: Optional[date] = None) -> List[str]:
+    """Holt + mappt ein Land; gibt die tatsächlich geschriebenen Dateien zurück."""
+    written = []
+    today = situation_on or date.today()
+    api_json = map_results_to_api_json(cc, retrieve_vat_rates_raw(cc, situation_on=today, source=source))
+    if write_json_if_changed(data_dir / f"{cc}.json", api_json):
+        written.append(f"{cc}.json")
+
+    if with_history:
+        raw_history = retrieve_vat_rates_raw(cc, period_from=HISTORY_FROM, period_to=today, source=source)
+        history_json = map_results_to_history(cc, raw_history, HISTORY_FROM, today, current=api_json)
+        path = data_dir / "history" / f"{cc}.json"
+        try:
+            unchanged = _without_volatile(json.loads(path.read_bytes())) == _without_volatile(history_json)
+        except (FileNotFoundError, ValueError):
+            unchanged = False
+        if not unchanged and write_json_if_changed(path, history_json):
+            written.append(f"history/{cc}.json")
+    return written
+
+class RateLoadError(RuntimeError):
+    """Einzelne Länder sind fehlgeschlagen; Feed und Snapshot enthalten den Rest (stats)."""
+
+    def __init__(self, stats: Dict[str, Any]):
+        super().__init__("TEDB load failed for " + ", ".join(
+            f"{cc} ({err})" for cc, err in sorted(stats["failed"].items())))
+        self.stats = stats
+
+def run(source=None, data_dir: Path = DATA_DIR, workers: int = 6, countries=None,
+        with_history: bool = True, situation_on: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Lädt alle Länder parallel (höchstens `workers` gleichzeitig), schreibt nur geänderte
+    Dateien und aktualisiert danach Änderungs-Feed und Binär-Snapshot. Schlägt ein Land
+    fehl, werden Feed und Snapshot trotzdem für alles Geschriebene nachgezogen und erst
+    danach RateLoadError geworfen – sonst fehlten diese Änderungen beim nächsten Lauf im Diff.
+    """
+    from rate_store import build_rate_table
+    from rate_snapshot import read_header, write_snapshot
+    from rate_changes import record_build
+
+    source = source or TedbSource(pool_size=workers)
+    data_dir = Path(data_dir)
+    countries = sorted(countries or EU_COUNTRY_CODES)
+
+    # Stand vor dem Build – Basis für den Diff im Änderungs-Feed
+    previous = build_rate_table(data_dir)
+
+    started = time.perf_counter()
+    written: List[str] = []
+    failed: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {cc: pool.submit(load_country, cc, source, data_dir, with_history, situation_on)
+                   for cc in countries}
+        for cc, future in futures.items():
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                failed[cc] = f"{type(e).__name__}: {e}"
+
+    # am Inhalt entscheiden, nicht an `written`: ein Land kann vor seinem Fehler schon geschrieben haben
+    version = None
+    data_version = None
+    current = build_rate_table(data_dir)
+    if current.version != previous.version:
+        # Nummerierte Version + Diff zum vorherigen Build (rate_changes.py)
+        version = record_build(data_dir, previous.countries, current.countries, content_id=current.version)
+        current = build_rate_table(data_dir)
+    snapshot_path = data_dir / "rates.snapshot"
+    header = read_header(snapshot_path)
+    if version is not None or header is None or header[5].rstrip(b"\0").decode("ascii", "replace") != current.version:
+        # Binär-Snapshot für die API-Worker (mmap, siehe rate_snapshot.py)
+        data_version = write_snapshot(current, snapshot_path, data_version=current.changes.latest or None)
+
+    stats = {
+        "countries": len(countries),
+        "written": written,
+        "failed": failed,
+        "change_version": version,
+        "snapshot_version": data_version,
+        "seconds": time.perf_counter() - started,
     }
-    for cc in sorted(EU_COUNTRY_CODES):
-        print(f"--- {cc} ---")
-        raw = retrieve_vat_rates_raw(cc)
-        api_json = map_results_to_api_json(cc, raw)
-
-        with open(f"data/{cc}.json", "w", encoding="utf-8") as f:
-            import json
-            json.dump(api_json, f, ensure_ascii=False, indent=2)
+    if failed:
+        raise RateLoadError(stats)
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load EU VAT rates from TEDB into data/*.json")
+    parser.add_argument("--workers", type=int, default=6, help="max. parallel member states")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--offline", metavar="DIR", help="use recorded TEDB responses from DIR (no network)")
+    parser.add_argument("--record", metavar="DIR", help="fetch live and save responses to DIR")
+    parser.add_argument("--situation-on", type=date.fromisoformat, default=None,
+                        help="YYYY-MM-DD (default: today; set it to replay recordings)")
+    parser.add_argument("--no-history", action="store_true", help="skip the period query")
+    parser.add_argument("--wsdl", default=TEDB_WSDL,
+                        help="local VatRetrievalService.wsdl (XSDs next to it) or URL (default: $TEDB_WSDL or EU server)")
+    parser.add_argument("countries", nargs="*", help="subset, e.g. DE FR")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        source = RecordedTedbSource(args.offline)
+    elif args.record:
+        source = RecordedTedbSource(args.record, record_from=TedbSource(pool_size=args.workers, wsdl=args.wsdl))
+    else:
+        source = TedbSource(pool_size=args.workers, wsdl=args.wsdl)
+
+    try:
+        stats = run(source, Path(args.data_dir), args.workers, [c.upper() for c in args.countries] or None,
+                    with_history=not args.no_history, situation_on=args.situation_on)
+    except RateLoadError as e:
+        stats = e.stats
+    for f in stats["written"]:
+        print(f"updated {f}")
+    for cc, err in sorted(stats["failed"].items()):
+        print(f"FAILED {cc}: {err}")
+    print(f"--- {stats['countries']} countries in {stats['seconds']:.2f}s, "
+          f"{len(stats['written'])} files changed, change version {stats['change_version']}, "
+          f"snapshot {stats['snapshot_version']} ---")
+    if stats["failed"]:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    import sys
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    main()
@@ -0,0 +1,89 @@
+# scripts/tedb_fixtures.py
+"""
+Erzeugt TEDB-artige SOAP-Responses (retrieveVatRates) aus den vorhandenen
+data/{cc}.json-Dateien – als Offline-Stand-in für load_vat_rates.py
+(RecordedTedbSource) und für Benchmarks. Echte Aufzeichnungen entstehen mit
+`python load_vat_rates.py --record DIR`.
+"""
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from xml.sax.saxutils import escape
+
+from load_vat_rates import _recording_name
+
+_ENVELOPE_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+    '<ns2:retrieveVatRatesRespMsg xmlns:ns2="urn:ec.europa.eu:taxud:tedb:services:v1:IVatRetrievalService" '
+    'xmlns="urn:ec.europa.eu:taxud:tedb:services:v1:IVatRetrievalService:types">'
+    "<additionalInformation><country>{cc}</country></additionalInformation>"
+)
+_ENVELOPE_TAIL = "</ns2:retrieveVatRatesRespMsg></soap:Body></soap:Envelope>"
+
+
+def records_from_country(data: Dict[str, Any], situation_on: str) -> List[Dict[str, Any]]:
+    """data/{cc}.json -> Records im Format von retrieve_vat_rates_raw()."""
+    cc = data["country"]
+    records = []
+    if data.get("standard_rate") is not None:
+        records.append({"memberState": cc, "type": "STANDARD", "situationOn": situation_on,
+                        "rate": {"value": data["standard_rate"], "type": "DEFAULT"}, "categoryId": None})
+    for rr in data.get("reduced_rates", []):
+        kind, _, cat = rr["label"].partition(":")
+        records.append({"memberState": cc, "type": "REDUCED", "situationOn": situation_on,
+                        "rate": {"value": rr["rate"], "type": kind.upper()}, "categoryId": cat or None})
+    return records
+
+
+def _fmt_rate(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def render_response(cc: str, records: Iterable[Dict[str, Any]]) -> bytes:
+    parts = [_ENVELOPE_HEAD.format(cc=cc)]
+    for r in records:
+        parts.append("<vatRateResults>")
+        parts.append(f"<memberState>{escape(r['memberState'])}</memberState>")
+        parts.append(f"<type>{escape(r['type'])}</type>")
+        parts.append(f"<rate><type>{escape(r['rate']['type'])}</type>"
+                     f"<value>{_fmt_rate(r['rate']['value'])}</value></rate>")
+        parts.append(f"<situationOn>{r['situationOn']}+01:00</situationOn>")
+        if r.get("categoryId"):
+            parts.append(f"<category><identifier>{escape(r['categoryId'])}</identifier>"
+                         f"<description>{escape(r['categoryId'].title())}</description></category>")
+        parts.append("<comments/></vatRateResults>")
+    parts.append(_ENVELOPE_TAIL)
+    return "".join(parts).encode("utf-8")
+
+
+def history_records(data: Dict[str, Any], period_from: date, period_to: date, years: int) -> List[Dict[str, Any]]:
+    """Synthetische Mehrjahres-Historie: jedes Jahr ein neuer Eintrag je Kategorie."""
+    records = []
+    first = max(period_from.year, period_to.year - years + 1)
+    for year in range(first, period_to.year + 1):
+        records.extend(records_from_country(data, date(year, 1, 1).isoformat()))
+    return records
+
+
+def write_recordings(directory, data_dir, situation_on: date,
+                     period_from: Optional[date] = None, period_to: Optional[date] = None,
+                     years: int = 1, countries: Optional[Iterable[str]] = None) -> int:
+    """Schreibt für jedes Land eine Aufzeichnung (und optional die Periodenabfrage)."""
+    directory, data_dir = Path(directory), Path(data_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    n = 0
+    for path in sorted(Path(data_dir).glob("??.json")):
+        cc = path.stem
+        if countries and cc not in countries:
+            continue
+        data = json.loads(path.read_bytes())
+        current = records_from_country(data, data.get("valid_on") or situation_on.isoformat())
+        (directory / _recording_name(cc, situation_on=situation_on)).write_bytes(render_response(cc, current))
+        n += 1
+        if period_from and period_to:
+            hist = history_records(data, period_from, period_to, years)
+            (directory / _recording_name(cc, period_from=period_from, period_to=period_to)).write_bytes(
+                render_response(cc, hist))
+    return n
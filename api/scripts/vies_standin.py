@@ -0,0 +1,174 @@
+# scripts/vies_standin.py
+"""
+Lokaler Stand-in für den VIES-SOAP-Dienst (checkVat) – für Benchmarks und Tests
+ohne Netz. Liefert WSDL (GET ?wsdl) und beantwortet checkVat-POSTs:
+
+- Nummern, die auf "0" enden, sind ungültig, alle anderen gültig
+- nicht alphanumerische Nummern -> Fault INVALID_INPUT
+- `faults={"IT": "MS_UNAVAILABLE"}` -> Fault für ganze Mitgliedstaaten
+- `flaky_calls=n` -> die ersten n Anfragen je Nummer scheitern mit MS_UNAVAILABLE
+- `latency` simuliert die Antwortzeit (asynchron, blockiert den Server nicht)
+
+Aufruf (aus api/):  python scripts/vies_standin.py --port 8099 --latency 0.05
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import socket
+import time
+from datetime import date
+from typing import Dict, Optional
+from xml.sax.saxutils import escape
+
+from lxml import etree
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+SERVICE_PATH = "/taxation_customs/vies/services/checkVatService"
+
+WSDL_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<wsdl:definitions xmlns:wsdl="http://schemas.xmlsoap.org/wsdl/" xmlns:wsdlsoap="http://schemas.xmlsoap.org/wsdl/soap/"
+    xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:tns1="urn:ec.europa.eu:taxud:vies:services:checkVat:types"
+    xmlns:impl="urn:ec.europa.eu:taxud:vies:services:checkVat" targetNamespace="urn:ec.europa.eu:taxud:vies:services:checkVat">
+  <wsdl:types>
+    <xsd:schema elementFormDefault="qualified" targetNamespace="urn:ec.europa.eu:taxud:vies:services:checkVat:types">
+      <xsd:element name="checkVat"><xsd:complexType><xsd:sequence>
+        <xsd:element name="countryCode" type="xsd:string"/>
+        <xsd:element name="vatNumber" type="xsd:string"/>
+      </xsd:sequence></xsd:complexType></xsd:element>
+      <xsd:element name="checkVatResponse"><xsd:complexType><xsd:sequence>
+        <xsd:element name="countryCode" type="xsd:string"/>
+        <xsd:element name="vatNumber" type="xsd:string"/>
+        <xsd:element name="requestDate" type="xsd:date"/>
+        <xsd:element name="valid" type="xsd:boolean"/>
+        <xsd:element name="name" type="xsd:string" minOccurs="0" nillable="true"/>
+        <xsd:element name="address" type="xsd:string" minOccurs="0" nillable="true"/>
+      </xsd:sequence></xsd:complexType></xsd:element>
+    </xsd:schema>
+  </wsdl:types>
+  <wsdl:message name="checkVatRequest"><wsdl:part name="parameters" element="tns1:checkVat"/></wsdl:message>
+  <wsdl:message name="checkVatResponse"><wsdl:part name="parameters" element="tns1:checkVatResponse"/></wsdl:message>
+  <wsdl:portType name="checkVatPortType">
+    <wsdl:operation name="checkVat">
+      <wsdl:input name="checkVatRequest" message="impl:checkVatRequest"/>
+      <wsdl:output name="checkVatResponse" message="impl:checkVatResponse"/>
+    </wsdl:operation>
+  </wsdl:portType>
+  <wsdl:binding name="checkVatBinding" type="impl:checkVatPortType">
+    <wsdlsoap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <wsdl:operation name="checkVat">
+      <wsdlsoap:operation soapAction=""/>
+      <wsdl:input name="checkVatRequest"><wsdlsoap:body use="literal"/></wsdl:input>
+      <wsdl:output name="checkVatResponse"><wsdlsoap:body use="literal"/></wsdl:output>
+    </wsdl:operation>
+  </wsdl:binding>
+  <wsdl:service name="checkVatService">
+    <wsdl:port name="checkVatPort" binding="impl:checkVatBinding">
+      <wsdlsoap:address location="{location}"/>
+    </wsdl:port>
+  </wsdl:service>
+</wsdl:definitions>
+"""
+
+_ENVELOPE = ('<env:Envelope xmlns:env="http://schemas.xmlsoap.org/soap/envelope/">'
+             "<env:Header/><env:Body>{body}</env:Body></env:Envelope>")
+
+
+def render_check_vat_response(country_code: str, number: str, valid: bool,
+                              name: Optional[str] = None, address: Optional[str] = None,
+                              request_date: Optional[date] = None) -> bytes:
+    body = (
+        '<ns2:checkVatResponse xmlns:ns2="urn:ec.europa.eu:taxud:vies:services:checkVat:types">'
+        f"<ns2:countryCode>{escape(country_code)}</ns2:countryCode>"
+        f"<ns2:vatNumber>{escape(number)}</ns2:vatNumber>"
+        f"<ns2:requestDate>{(request_date or date.today()).isoformat()}+01:00</ns2:requestDate>"
+        f"<ns2:valid>{'true' if valid else 'false'}</ns2:valid>"
+        f"<ns2:name>{escape(name or '---')}</ns2:name>"
+        f"<ns2:address>{escape(address or '---')}</ns2:address>"
+        "</ns2:checkVatResponse>"
+    )
+    return _ENVELOPE.format(body=body).encode("utf-8")
+
+
+def render_fault(code: str) -> bytes:
+    body = f"<env:Fault><faultcode>env:Server</faultcode><faultstring>{escape(code)}</faultstring></env:Fault>"
+    return _ENVELOPE.format(body=body).encode("utf-8")
+
+
+def _xml(content: bytes, status_code: int = 200) -> Response:
+    return Response(content, status_code=status_code, media_type="text/xml; charset=utf-8")
+
+
+def build_app(latency: float = 0.0, faults: Optional[Dict[str, str]] = None, flaky_calls: int = 0) -> Starlette:
+    faults = faults or {}
+    stats = {"requests": 0}
+    seen: Dict[tuple, int] = {}
+
+    async def wsdl(request: Request) -> Response:
+        location = str(request.url.replace(query=""))
+        return _xml(WSDL_TEMPLATE.format(location=escape(location)).encode("utf-8"))
+
+    async def check_vat(request: Request) -> Response:
+        stats["requests"] += 1
+        root = etree.fromstring(await request.body())
+        cc = (root.findtext(".//{*}countryCode") or "").strip()
+        number = (root.findtext(".//{*}vatNumber") or "").strip()
+        if latency:
+            await asyncio.sleep(latency)
+        if cc in faults:
+            return _xml(render_fault(faults[cc]), 500)
+        if flaky_calls:
+            seen[cc, number] = seen.get((cc, number), 0) + 1
+            if seen[cc, number] <= flaky_calls:
+                return _xml(render_fault("MS_UNAVAILABLE"), 500)
+        if not cc or not number.isalnum():
+            return _xml(render_fault("INVALID_INPUT"), 500)
+        valid = not number.endswith("0")
+        return _xml(render_check_vat_response(cc, number, valid, name="Stand-in GmbH" if valid else None))
+
+    app = Starlette(routes=[
+        Route(SERVICE_PATH, wsdl, methods=["GET"]),
+        Route(SERVICE_PATH, check_vat, methods=["POST"]),
+    ])
+    app.state.stats = stats
+    return app
+
+
+def serve(port: int, latency: float = 0.0, faults: Optional[Dict[str, str]] = None, flaky_calls: int = 0) -> None:
+    import uvicorn
+    uvicorn.run(build_app(latency, faults, flaky_calls), host="127.0.0.1", port=port, log_level="warning",
+                backlog=4096, limit_concurrency=None)
+
+
+def start_in_background(port: int, latency: float = 0.0, faults: Optional[Dict[str, str]] = None,
+                        flaky_calls: int = 0, timeout: float = 10.0) -> mp.Process:
+    """Startet serve() in einem eigenen Prozess und wartet, bis der Port offen ist."""
+    proc = mp.get_context("spawn").Process(target=serve, args=(port, latency, faults, flaky_calls), daemon=True)
+    proc.start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError(f"VIES stand-in did not start on port {port}")
+
+
+def endpoint_url(port: int) -> str:
+    return f"http://127.0.0.1:{port}{SERVICE_PATH}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local VIES checkVat stand-in")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per checkVat")
+    parser.add_argument("--fault", action="append", default=[], metavar="CC=CODE",
+                        help="e.g. IT=MS_UNAVAILABLE (repeatable)")
+    parser.add_argument("--flaky", type=int, default=0, metavar="N",
+                        help="first N requests per number fail with MS_UNAVAILABLE")
+    args = parser.parse_args()
+    serve(args.port, args.latency, dict(f.split("=", 1) for f in args.fault), args.flaky)
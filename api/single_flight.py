@@ -0,0 +1,50 @@
+# single_flight.py
+"""
+In-flight-Deduplizierung: gleichzeitige Aufrufe mit gleichem Schlüssel warten auf
+genau eine Ausführung und teilen sich deren Ergebnis bzw. Exception.
+
+Die Ausführung läuft als eigener Task: bricht der erste Aufrufer ab (Client weg),
+bekommen die übrigen trotzdem ihr Ergebnis.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0      # alle Aufrufe von do()
+        self.executions = 0  # davon tatsächlich ausgeführt (Rest: angehängt)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield: ein abgebrochener Aufrufer bricht nicht die geteilte Ausführung ab
+        return await asyncio.shield(task)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # als abgerufen markieren, falls kein Aufrufer mehr wartet
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, Any]:
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": round(coalesced / self.calls, 4) if self.calls else 0.0,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import middleware.quota as quota
+from api_key_cache import ApiKeyCache, CachedApiKey
+from core.security import hash_api_key
+from db.models import ApiKey, User
+from routers import apikeys, billing
+
+USER_ID = uuid.uuid4()
+KEY = "vk_live_test-key"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDB:
+    """Gleiche Aufrufe wie AsyncSession in Middleware/Routern; zählt die Lesezugriffe je Modell."""
+
+    def __init__(self, key, user):
+        self.key, self.user = key, user
+        self.reads = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def scalar(self, stmt):
+        self.reads.append("ApiKey")
+        return None if self.key.revoked else self.key
+
+    async def get(self, model, ident):
+        self.reads.append(model.__name__)
+        return self.user if model is User else None
+
+    def add(self, obj):
+        pass
+
+    async def execute(self, stmt, params=None):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def _entry(key_id=None, user_id=USER_ID, status=None):
+    return CachedApiKey(key_id=key_id or uuid.uuid4(), user_id=user_id, plan="free", subscription_status=status)
+
+
+def _fixture(monkeypatch):
+    key = ApiKey(id=uuid.uuid4(), user_id=USER_ID, name="ci", key_hash=hash_api_key(KEY), prefix="vk_live_",
+                 last4=KEY[-4:], revoked=False)
+    user = User(id=USER_ID, email="a@example.com", username="a", password_hash="x", plan="free",
+                subscription_status=None, stripe_subscription_id="sub_1")
+    db = FakeDB(key, user)
+    monkeypatch.setattr(quota, "AsyncSessionLocal", lambda: db)
+    monkeypatch.setattr(quota, "api_key_cache", ApiKeyCache(ttl=60))
+    monkeypatch.setattr(apikeys, "api_key_cache", quota.api_key_cache)
+    monkeypatch.setattr(billing, "api_key_cache", quota.api_key_cache)
+
+    app = FastAPI()
+    app.add_middleware(quota.APIKeyAuthQuotaMiddleware, protected_prefixes=["/v1/"])
+
+    @app.get("/v1/ping")
+    def ping():
+        return {"ok": True}
+
+    return TestClient(app), db, key, user
+
+
+def test_ttl_and_lru():
+    clock = Clock()
+    cache = ApiKeyCache(ttl=60, max_entries=2, clock=clock)
+    for h in ("a", "b", "c"):
+        cache.put(h, _entry(), cache.generation)
+    assert cache.get("a") is None and cache.get("b") is not None
+    clock.now += 60
+    assert cache.get("b") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_invalidation_discards_stale_fill():
+    cache = ApiKeyCache(ttl=60)
+    other = uuid.uuid4()
+    cache.put("a", _entry(), cache.generation)
+    cache.put("b", _entry(user_id=other), cache.generation)
+    generation = cache.generation           # DB-Abfrage beginnt ...
+    cache.invalidate_user(str(USER_ID))     # ... Webhook kommt dazwischen
+    cache.put("a", _entry(status="active"), generation)
+    assert cache.get("a") is None and cache.get("b") is not None
+
+
+def test_warm_key_needs_no_auth_queries(monkeypatch):
+    client, db, key, user = _fixture(monkeypatch)
+    assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 200
+    assert db.reads == ["ApiKey", "User", "MonthlyQuota"]
+
+    db.reads.clear()
+    for _ in range(3):
+        assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 200
+    assert db.reads == ["MonthlyQuota"] * 3
+
+
+def test_revoke_invalidates_cached_key(monkeypatch):
+    client, db, key, user = _fixture(monkeypatch)
+    assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 200
+
+    asyncio.run(apikeys.revoke_key(str(key.id), user=user, db=db))
+    assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 401
+
+
+def test_subscription_webhook_invalidates_user(monkeypatch):
+    client, db, key, user = _fixture(monkeypatch)
+    assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 200
+
+    async def find_user_by_subscription(db, subscription_id):
+        return user
+
+    monkeypatch.setattr(billing, "find_user_by_subscription", find_user_by_subscription)
+    asyncio.run(billing.update_subscription_status(db, "sub_1", "active"))
+    assert quota.api_key_cache.get(hash_api_key(KEY)) is None
+
+    db.reads.clear()
+    assert client.get("/v1/ping", headers={"x-api-key": KEY}).status_code == 200
+    assert db.reads == ["ApiKey", "User", "MonthlyQuota"]
+    assert quota.api_key_cache.get(hash_api_key(KEY)).subscription_status == "active"
@@ -0,0 +1,67 @@
+import asyncio
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from bulk_calculate import CacheFileValidator, StubValidator, run  # noqa: E402
+from calculate import CalcRequest, calculate_item  # noqa: E402
+from calc_stream import csv_row_to_item  # noqa: E402
+from rate_store import rate_repository  # noqa: E402
+
+HEADER = "amount,basis,supply_date,b2x,supplier_country,customer_country,customer_vat,category_hint"
+ROWS = [
+    "100,net,2025-03-01,B2C,DE,DE,,",
+    "119,gross,2025-03-01,B2C,DE,DE,,",
+    "50,net,2025-03-01,B2B,DE,FR,FR12345678901,",
+    "50,net,2025-03-01,B2B,DE,AT,ATU00000000,",
+    "10.50,net,2025-03-01,B2C,DE,DE,,food",
+    "-3,net,2025-03-01,B2C,DE,DE,,",
+    "20,net,2025-03-01,B2C,DE,XX,,",
+]
+
+
+def test_cli_matches_api_rules(tmp_path):
+    src = tmp_path / "invoices.csv"
+    src.write_text("\n".join([HEADER] + ROWS * 3) + "\n")
+    cache = tmp_path / "vies.json"
+    cache.write_text(json.dumps({"FR12345678901": True}))
+
+    out = io.BytesIO()
+    stats = run(src, out, "csv", workers=2, validator_spec=f"cache:{cache}", chunk_items=4)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue().decode())))
+    assert stats["items"] == len(rows) == 3 * len(ROWS)
+    assert stats["errors"] == 3 * 2
+    assert [int(r["index"]) for r in rows] == list(range(len(rows)))
+
+    rate_repository.load()
+    validator = CacheFileValidator(cache)
+    inputs = list(csv.DictReader(io.StringIO("\n".join([HEADER] + ROWS))))
+    for i, row in enumerate(rows):
+        raw = inputs[i % len(ROWS)]
+        try:
+            request = CalcRequest.model_validate(csv_row_to_item(raw))
+        except ValueError:
+            assert row["status_code"] == "422"
+            continue
+        if raw["customer_country"] == "XX":
+            assert row["status_code"] == "400"
+            continue
+        expected = asyncio.run(calculate_item(request, validator))
+        assert (row["mechanism"], float(row["net"]), float(row["vat"]), float(row["gross"])) == \
+            (expected.mechanism, expected.net, expected.vat, expected.gross)
+    assert [r["mechanism"] for r in rows[2:4]] == ["reverse_charge", "normal"]
+
+
+def test_validators(tmp_path):
+    assert asyncio.run(StubValidator("valid")("DE", "DE123")) == (True, "validated")
+
+    cache = tmp_path / "vies.json"
+    cache.write_text(json.dumps([{"country_code": "FR", "vat_number": "12345678901", "valid": True}]))
+    validator = CacheFileValidator(cache)
+    assert asyncio.run(validator("FR", "fr 123-456-789-01")) == (True, "validated")
+    assert asyncio.run(validator("FR", "FR12345678901")) == (True, "validated")
+    assert asyncio.run(validator("AT", "ATU1")) == (False, "unavailable")
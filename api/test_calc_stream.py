@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import io
+import json
+
+from calc_stream import stream_calculation
+from calculate import BatchCalculator, CalcBatchItem, CalcRequest, CalcResult
+
+
+async def fake_calculate(raw_items):
+    items = []
+    for i, raw in enumerate(raw_items):
+        req = CalcRequest.model_validate(raw)
+        items.append(CalcBatchItem(index=i, result=CalcResult(
+            country_code=req.customer.country_code, applied_rate=0.0, net=req.amount,
+            vat=0.0, gross=req.amount, mechanism="normal")))
+    return items
+
+
+async def _body(data: bytes, size: int = 7):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def run(data: bytes, fmt: str, **kwargs) -> bytes:
+    async def collect():
+        return b"".join([part async for part in stream_calculation(_body(data), fmt, fake_calculate, **kwargs)])
+    return asyncio.run(collect())
+
+
+def test_ndjson_keeps_order_across_chunks():
+    lines = [json.dumps({"amount": i + 1, "supplier": {"country_code": "DE"}, "customer": {"country_code": "FR"}})
+             for i in range(5)]
+    seen = []
+
+    async def reserve(count):
+        seen.append(count)
+        return count
+
+    out = run(("\n".join(lines[:3]) + "\n\nnot json\n" + "\n".join(lines[3:])).encode(), "ndjson",
+              chunk_items=2, reserve=reserve)
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["index"] for r in records] == list(range(6))
+    assert [r["result"]["net"] for r in records if r["result"]] == [1, 2, 3, 4, 5]
+    assert records[3]["status_code"] == 400 and "Invalid JSON" in records[3]["error"]
+    assert seen == [2, 2, 2]
+
+
+def test_stream_stops_when_quota_is_exhausted():
+    lines = [json.dumps({"amount": i + 1, "supplier": {"country_code": "DE"}, "customer": {"country_code": "FR"}})
+             for i in range(7)]
+    budget = {"left": 3}
+
+    async def reserve(count):
+        granted = min(count, budget["left"])
+        budget["left"] -= granted
+        return granted
+
+    out = run("\n".join(lines).encode(), "ndjson", chunk_items=2, reserve=reserve)
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["result"]["net"] for r in records[:-1]] == [1, 2, 3]
+    assert records[-1] == {**records[-1], "index": 3, "status_code": 429, "error": "Monthly quota exceeded"}
+    assert budget["left"] == 0
+
+
+def test_csv_roundtrip():
+    data = ("customer_country,amount,supplier_country\r\n"
+            "AT,10.5,DE\r\n"
+            "FR,20,DE\r\n").encode()
+    rows = list(csv.DictReader(io.StringIO(run(data, "csv").decode())))
+    assert [(r["index"], r["country_code"], r["net"]) for r in rows] == [("0", "AT", "10.5"), ("1", "FR", "20.0")]
+
+
+def test_csv_header_must_have_required_columns():
+    rows = list(csv.DictReader(io.StringIO(run(b"amount\n10\n", "csv").decode())))
+    assert len(rows) == 1
+    assert "supplier_country" in rows[0]["error"]
+
+
+def test_overlong_line_ends_stream_with_error():
+    item = b'{"amount": 1, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"}}\n'
+    out = run(item + b"x" * 200, "ndjson", chunk_items=10, max_line=100)
+    first, last = out.splitlines()
+    assert json.loads(first)["result"]["net"] == 1
+    assert "exceeds" in json.loads(last)["error"]
+
+
+def test_api_stream_charges_per_chunk(monkeypatch):
+    import main
+    from starlette.requests import Request
+
+    charged = []
+
+    async def reserve_api_key_quota(api_key_id, units, limit):
+        charged.append(units)
+        return min(units, limit - 1)   # 1 Einheit hat die Middleware schon gebucht
+
+    monkeypatch.setattr(main, "reserve_api_key_quota", reserve_api_key_quota)
+    body = "\n".join(json.dumps({"amount": 10, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"}})
+                     for _ in range(5)).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "path": "/v1/calculate/stream", "query_string": b"",
+                       "headers": [(b"content-type", b"application/x-ndjson")],
+                       "state": {"api_key_id": "k", "quota_limit": 4}}, receive)
+
+    async def collect():
+        response = main.handle_calculate_vat_stream(request)
+        return b"".join([part async for part in response.body_iterator])
+
+    records = [json.loads(line) for line in asyncio.run(collect()).splitlines()]
+    assert [r["status_code"] for r in records] == [None] * 4 + [429]
+    assert charged == [4]   # 5 Zeilen, eine davon vorab bezahlt
+
+
+def test_calculator_caches_stay_bounded():
+    checked = []
+
+    async def validator(country_code, vat_number):
+        checked.append(vat_number)
+        return vat_number.endswith("1"), "validated"
+
+    calc = BatchCalculator(validator, cache_entries=4)
+    lines = [json.dumps({"amount": 100, "b2x": "B2B", "supplier": {"country_code": "DE"},
+                         "customer": {"country_code": "FR", "vat_number": f"FR{i}"}, "category_hint": f"hint-{i}"})
+             for i in range(40)]
+
+    async def collect():
+        return b"".join([part async for part in stream_calculation(
+            _body("\n".join(lines).encode(), 512), "ndjson", calc.calculate, chunk_items=10)])
+
+    out = asyncio.run(collect())
+    records = [json.loads(line) for line in out.splitlines()]
+    assert [r["result"]["mechanism"] for r in records[:3]] == ["normal", "reverse_charge", "normal"]
+    assert len(checked) == 40
+    assert len(calc.reverse_charge) == 4 and len(calc.rates) == 4
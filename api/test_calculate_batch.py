@@ -0,0 +1,96 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+
+import calculate
+import main
+from calculate import MAX_BATCH_ITEMS, CalcBatchRequest, CalcRequest, batch_item_count
+from validate_vat import ValidateResponse
+
+ITEMS = [
+    {"amount": 100, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"}},
+    {"amount": 119, "basis": "gross", "supplier": {"country_code": "DE"}, "customer": {"country_code": "FR"}},
+    {"amount": 10.555, "category_hint": "food", "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"},
+     "supply_date": "2025-01-15"},
+    {"amount": 50, "supplier": {"country_code": "DE"}, "customer": {"country_code": "XX"}},
+    {"amount": -1, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"}},
+    {"amount": 100, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"}},
+]
+
+
+def test_batch_matches_single_calculation():
+    result = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=ITEMS)))
+    assert result.count == len(ITEMS)
+    assert [item.index for item in result.results] == list(range(len(ITEMS)))
+
+    for raw, item in zip(ITEMS, result.results):
+        if item.error is None:
+            assert item.result == asyncio.run(main.handle_calculate_vat(CalcRequest.model_validate(raw)))
+
+
+def test_batch_reports_errors_per_item():
+    result = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=ITEMS)))
+    assert result.errors == 2
+    assert result.results[3].status_code == 400
+    assert result.results[4].status_code == 422
+    assert "amount" in result.results[4].error
+    assert result.results[5].result is not None
+
+
+def test_batch_resolves_each_rate_once(monkeypatch):
+    calls = []
+    real_get_rate = calculate.get_rate
+
+    def counting_get_rate(*args):
+        calls.append(args)
+        return real_get_rate(*args)
+
+    monkeypatch.setattr(calculate, "get_rate", counting_get_rate)
+    items = [{"amount": i + 1, "supplier": {"country_code": "DE"}, "customer": {"country_code": "AT"},
+              "supply_date": date(2025, 1, 1).isoformat()} for i in range(500)]
+    result = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=items)))
+    assert result.errors == 0
+    assert len(calls) == 1
+
+
+def test_reverse_charge_checks_each_customer_once(monkeypatch):
+    checked = []
+
+    async def fake_validate(payload):
+        checked.append(payload.vat_number)
+        return ValidateResponse(
+            valid=payload.vat_number.endswith("1"), country_code=payload.country_code,
+            vat_number=payload.vat_number, checked_at=datetime.now(timezone.utc))
+
+    monkeypatch.setattr(main, "handle_validate_vat", fake_validate)
+    items = [{"amount": 100, "b2x": "B2B", "supplier": {"country_code": "DE"},
+              "customer": {"country_code": "FR", "vat_number": f"FR{i % 2}"}} for i in range(20)]
+    result = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=items)))
+
+    assert sorted(checked) == ["FR0", "FR1"]
+    mechanisms = [item.result.mechanism for item in result.results]
+    assert mechanisms[:2] == ["normal", "reverse_charge"]
+    assert result.results[0].result.vat_check_status == "validated"
+
+
+def test_invoice_rounding_scope():
+    items = [{"amount": 0.03, "supplier": {"country_code": "DE"}, "customer": {"country_code": "DE"},
+              "supply_date": "2025-01-01"}] * 3
+    per_line = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=items)))
+    per_invoice = asyncio.run(main.handle_calculate_vat_batch(CalcBatchRequest(items=items, rounding_scope="invoice")))
+    assert [item.result.vat for item in per_line.results] == [0.01, 0.01, 0.01]
+    assert sorted(item.result.vat for item in per_invoice.results) == [0.0, 0.01, 0.01]
+
+
+def test_batch_item_count():
+    assert batch_item_count(b'{"items": [{}, {}, {}]}') == 3
+    assert batch_item_count(b'{"items": []}') == 1
+    assert batch_item_count(b"not json") == 1
+
+
+def test_rejected_batch_costs_one_unit():
+    # wird mit 422 abgewiesen, also nicht nach Item-Zahl berechnen
+    over_limit = json.dumps({"items": [{}] * (MAX_BATCH_ITEMS + 1)}).encode()
+    assert batch_item_count(over_limit) == 1
+    assert batch_item_count(b'{"items": [{}, {}], "rounding_mode": "up"}') == 1
+    assert batch_item_count(b'{"items": [{}, 1, 2]}') == 1
@@ -0,0 +1,85 @@
+import gzip
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.http_cache import prepare_json_body, conditional_response
+
+PAYLOAD = {"country": "DE", "standard_rate": 19.0, "reduced_rates": [{"rate": 7.0, "label": "reduced_rate:FOODSTUFFS"}]}
+prepared = prepare_json_body(PAYLOAD)
+
+app = FastAPI()
+
+@app.get("/rates")
+def rates(request: Request):
+    return conditional_response(request, prepared)
+
+client = TestClient(app)
+
+
+def test_serves_identity_with_strong_etag():
+    r = client.get("/rates", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert r.json() == PAYLOAD
+    assert r.headers["etag"] == f'"{prepared.etag}"'
+    assert r.headers["cache-control"] == "private, max-age=3600"
+    assert "content-encoding" not in r.headers
+
+
+def test_serves_precompressed_variant():
+    r = client.get("/rates", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.headers["etag"] == f'"{prepared.etag}-gzip"'
+    assert json.loads(gzip.decompress(prepared.gzip)) == PAYLOAD
+
+
+def test_if_none_match_returns_304_without_body():
+    etag = client.get("/rates", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    r = client.get("/rates", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert "public" not in r.headers["cache-control"]
+    r = client.get("/rates", headers={"If-None-Match": '"something-else"'})
+    assert r.status_code == 200
+
+
+def test_bulk_document_is_prebuilt_per_version():
+    from datetime import date
+
+    from rate_responses import RateResponseCache
+    from rate_store import RateRepository
+
+    cache = RateResponseCache(RateRepository())
+    full = cache.get_bulk()
+    assert cache.get_bulk() is full
+    assert len(json.loads(full.body)["countries"]) == 28
+
+    subset = cache.get_bulk(["fr", "DE"], date(2024, 1, 15))
+    doc = json.loads(subset.body)
+    assert sorted(doc["countries"]) == ["DE", "FR"]
+    assert doc["date"] == "2024-01-15"
+    assert cache.get_bulk(["DE", "FR"], date(2024, 1, 15)) is subset
+
+
+def test_filtered_variants_use_fast_compression(monkeypatch):
+    from datetime import date
+
+    import rate_responses
+    from rate_store import RateRepository
+
+    levels = []
+
+    def prepare(obj, gzip_level=9, br_quality=11):
+        levels.append((gzip_level, br_quality))
+        return prepare_json_body(obj, gzip_level, br_quality)
+
+    monkeypatch.setattr(rate_responses, "prepare_json_body", prepare)
+    cache = rate_responses.RateResponseCache(RateRepository())
+    cache.get_bulk()
+    assert set(levels) == {(9, 11)}
+
+    levels.clear()
+    subset = cache.get_bulk(None, date(2024, 1, 15))
+    assert levels == [(6, 5)]
+    assert gzip.decompress(subset.gzip) == subset.body
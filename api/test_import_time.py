@@ -0,0 +1,19 @@
+import importlib
+import sys
+
+from benchmarks.bench_import_time import BUDGET_SECONDS, LAZY_MODULES, measure, top_imports
+
+
+def test_cold_import_within_budget():
+    result = measure(runs=3)
+    assert not result["loaded"], f"heavy modules imported eagerly: {result['loaded']}"
+    assert result["median"] <= BUDGET_SECONDS, (
+        f"import main took {result['median']:.3f}s (budget {BUDGET_SECONDS}s); top imports: {top_imports(5)}")
+
+
+def test_billing_loads_stripe_on_first_use():
+    billing = importlib.import_module("routers.billing")
+    stripe = billing._stripe()
+    assert sys.modules["stripe"] is stripe and billing._stripe() is stripe
+    assert stripe.api_key == billing.settings.STRIPE_SECRET_KEY
+    assert "stripe" in LAZY_MODULES
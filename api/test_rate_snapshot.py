@@ -0,0 +1,100 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+from rate_snapshot import RateSnapshot, SnapshotError, read_header, write_snapshot
+from rate_store import DATA_DIR, RateRepository, build_rate_table
+
+DATES = [date(1990, 1, 1), date(2020, 9, 1), date(2025, 7, 1), date.today()]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = tmp_path / "rates.snapshot"
+    write_snapshot(build_rate_table(DATA_DIR), path)
+    return path
+
+
+def test_snapshot_matches_json_table(snapshot_path):
+    table = build_rate_table(DATA_DIR)
+    snap = RateSnapshot(snapshot_path)
+    assert snap.countries() == sorted(table.history)
+    assert snap.content_id == table.version
+
+    for cc, history in table.history.items():
+        view = snap.get(cc)
+        for on in DATES:
+            assert view.standard_rate_on(on) == history.standard_rate_on(on)
+            for cat_id in history.categories:
+                assert view.category_rates_on(cat_id, on) == history.category_rates_on(cat_id, on)
+        for hint in ("food", "hospitality", "ebooks", "does_not_exist"):
+            assert view.resolve_category(hint) == history.resolve_category(hint)
+
+
+def test_hint_variants_share_one_cache_entry(snapshot_path):
+    de = RateSnapshot(snapshot_path).get("DE")
+    for hint in ("food", "FOOD", " Food ", "reduced_rate:food", "f00d", "no-such-category"):
+        de.category_rates_on(hint, date(2025, 7, 1))
+    assert set(de._resolved) == {"FOOD"}
+
+
+def test_version_only_bumps_on_content_change(snapshot_path):
+    table = build_rate_table(DATA_DIR)
+    assert read_header(snapshot_path)[3] == 1
+    assert write_snapshot(table, snapshot_path) == 1
+    assert write_snapshot(table, snapshot_path, data_version=7) == 7
+
+
+def test_corrupt_snapshot_is_rejected(snapshot_path):
+    raw = bytearray(snapshot_path.read_bytes())
+    raw[-1] ^= 0xFF
+    snapshot_path.write_bytes(bytes(raw))
+    with pytest.raises(SnapshotError):
+        RateSnapshot(snapshot_path)
+
+
+def test_repository_swaps_to_newer_snapshot(snapshot_path):
+    repo = RateRepository(DATA_DIR, snapshot_path=snapshot_path)
+    assert repo.load_snapshot()
+    first = repo.snapshot
+    assert repo.reload_if_changed() is False
+
+    write_snapshot(build_rate_table(DATA_DIR), snapshot_path, data_version=2)
+    assert repo.reload_if_changed() is True
+    assert repo.snapshot is not first
+    assert repo.snapshot.data_version == 2
+    assert repo.get_rate_source("DE").standard_rate_on(date.today()) == 19.0
+
+
+def _write_country(data_dir, cc, standard_rate):
+    (data_dir / f"{cc}.json").write_text(json.dumps({
+        "country": cc, "standard_rate": standard_rate, "reduced_rates": [], "currency": "EUR",
+        "valid_on": "2025-07-01"}), encoding="utf-8")
+
+
+def test_json_edit_after_snapshot_wins(tmp_path):
+    _write_country(tmp_path, "DE", 19.0)
+    snapshot_path = tmp_path / "rates.snapshot"
+    write_snapshot(build_rate_table(tmp_path), snapshot_path)
+    repo = RateRepository(tmp_path, snapshot_path=snapshot_path)
+    assert repo.load_snapshot()
+    assert repo.reload_if_changed() is False
+
+    _write_country(tmp_path, "DE", 16.0)
+    os.utime(tmp_path / "DE.json", ns=(1, 1))
+    assert repo.reload_if_changed() is True
+    assert repo.snapshot is None
+    # /v1/calculate und /v1/rates lesen wieder denselben Stand
+    assert repo.get_rate_source("DE").standard_rate_on(date.today()) == 16.0
+    assert repo.get("DE").standard_rate == 16.0
+
+    # beim Neustart wird der veraltete Snapshot gar nicht erst gemappt
+    assert not RateRepository(tmp_path, snapshot_path=snapshot_path).load_snapshot()
+
+    # passender Snapshot vom Loader: Lookups wieder aus dem mmap
+    write_snapshot(build_rate_table(tmp_path), snapshot_path)
+    assert repo.reload_if_changed() is True
+    assert repo.snapshot.content_id == repo.table.version
+    assert repo.get_rate_source("DE").standard_rate_on(date.today()) == 16.0
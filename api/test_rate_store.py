@@ -0,0 +1,153 @@
+import json
+import os
+from datetime import date
+
+from rate_store import RateRepository
+
+
+def _write(path, cc, standard_rate, reduced=()):
+    data = {
+        "country": cc,
+        "standard_rate": standard_rate,
+        "reduced_rates": [{"rate": r, "label": l} for r, l in reduced],
+        "currency": "EUR",
+        "valid_on": "2025-07-01",
+    }
+    (path / f"{cc}.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_loads_all_country_files_once(tmp_path):
+    _write(tmp_path, "DE", 19.0, [(7.0, "reduced_rate:FOODSTUFFS")])
+    _write(tmp_path, "FR", 20.0)
+    (tmp_path / "vat_rates.json").write_text("{}", encoding="utf-8")  # keine Länderdatei
+
+    repo = RateRepository(tmp_path)
+    assert set(repo.table.countries) == {"DE", "FR"}
+    assert repo.get("de").standard_rate == 19.0
+    assert repo.get("DE").reduced_rates[0].label == "reduced_rate:FOODSTUFFS"
+    assert repo.get("XX") is None
+
+
+def test_reload_only_when_files_change(tmp_path):
+    _write(tmp_path, "DE", 19.0)
+    repo = RateRepository(tmp_path)
+    first = repo.table
+    assert repo.reload_if_changed() is False
+    assert repo.table is first
+
+    _write(tmp_path, "DE", 16.0)
+    os.utime(tmp_path / "DE.json", ns=(1, 1))  # mtime sicher verändern
+    assert repo.reload_if_changed() is True
+    assert repo.get("DE").standard_rate == 16.0
+    assert repo.table.version != first.version
+    # alte Referenz bleibt unverändert (immutable Snapshot)
+    assert first.get("DE").standard_rate == 19.0
+
+
+def test_broken_file_keeps_previous_table(tmp_path):
+    _write(tmp_path, "DE", 19.0)
+    repo = RateRepository(tmp_path)
+    before = repo.table
+
+    (tmp_path / "DE.json").write_text('{"country": "DE", "standard_', encoding="utf-8")
+    os.utime(tmp_path / "DE.json", ns=(2, 2))
+    assert repo.reload_if_changed() is False
+    assert repo.table is before
+
+
+def test_history_lookup_honors_supply_date(tmp_path):
+    _write(tmp_path, "DE", 19.0, [(7.0, "reduced_rate:FOODSTUFFS")])
+    (tmp_path / "history").mkdir()
+    history = {
+        "country": "DE",
+        "standard": [
+            {"from": "2007-01-01", "rate": 19.0},
+            {"from": "2020-07-01", "rate": 16.0},
+            {"from": "2021-01-01", "rate": 19.0},
+        ],
+        "categories": {
+            "FOODSTUFFS": [
+                {"from": "2007-01-01", "rates": [{"rate": 7.0, "label": "reduced_rate:FOODSTUFFS"}]},
+                {"from": "2020-07-01", "rates": [{"rate": 5.0, "label": "reduced_rate:FOODSTUFFS"}]},
+                {"from": "2021-01-01", "rates": [{"rate": 7.0, "label": "reduced_rate:FOODSTUFFS"}]},
+            ]
+        },
+    }
+    (tmp_path / "history" / "DE.json").write_text(json.dumps(history), encoding="utf-8")
+
+    h = RateRepository(tmp_path).get_history("DE")
+    assert h.standard_rate_on(date(2006, 12, 31)) is None
+    assert h.standard_rate_on(date(2019, 5, 1)) == 19.0
+    assert h.standard_rate_on(date(2020, 7, 1)) == 16.0
+    assert h.standard_rate_on(date(2020, 12, 31)) == 16.0
+    assert h.standard_rate_on(date(2026, 1, 1)) == 19.0
+    assert h.category_rates_on("FOODSTUFFS", date(2020, 9, 1))[0].rate == 5.0
+    assert h.rates_on(date(2020, 9, 1)).valid_on == "2020-07-01"
+
+
+def test_category_dropped_from_current_file_ends_at_snapshot(tmp_path):
+    _write(tmp_path, "DE", 19.0)  # valid_on 2025-07-01, RESTAURANT abgeschafft
+    (tmp_path / "history").mkdir()
+    history = {
+        "country": "DE",
+        "standard": [{"from": "2007-01-01", "rate": 19.0}],
+        "categories": {
+            "RESTAURANT": [{"from": "2020-07-01", "rates": [{"rate": 7.0, "label": "reduced_rate:RESTAURANT"}]}],
+        },
+    }
+    (tmp_path / "history" / "DE.json").write_text(json.dumps(history), encoding="utf-8")
+
+    h = RateRepository(tmp_path).get_history("DE")
+    assert h.category_rates_on("RESTAURANT", date(2024, 1, 1))[0].rate == 7.0
+    assert h.category_rates_on("RESTAURANT", date(2026, 1, 1)) == ()
+    assert h.rates_on(date(2026, 1, 1)).reduced_rates == ()
+    assert h.rates_on(date(2026, 1, 1)).valid_on == "2025-07-01"
+
+
+def test_snapshot_without_history_applies_to_all_dates(tmp_path):
+    _write(tmp_path, "FR", 20.0)
+    h = RateRepository(tmp_path).get_history("FR")
+    assert h.standard_rate_on(date(1999, 1, 1)) == 20.0
+    assert h.rates_on(date(2024, 1, 15)).valid_on == "2025-07-01"
+
+
+def test_category_index_resolves_ids_and_aliases(tmp_path):
+    _write(tmp_path, "DE", 19.0, [
+        (0.0, "exempted:SUPPLY_ELECTRICITY"),
+        (7.0, "reduced_rate:ACCOMMODATION"),
+        (7.0, "reduced_rate:FOODSTUFFS"),
+    ])
+    h = RateRepository(tmp_path).get_history("DE")
+    today = date.today()
+
+    assert h.resolve_category("foodstuffs") == "FOODSTUFFS"
+    assert h.resolve_category("reduced_rate:FoodStuffs") == "FOODSTUFFS"
+    assert h.resolve_category("food") == "FOODSTUFFS"
+    assert h.resolve_category("hospitality") == "ACCOMMODATION"
+    assert h.resolve_category("supply-electricity") == "SUPPLY_ELECTRICITY"
+    assert h.resolve_category("ebooks") is None  # weder BOOKS noch IMPRESSIONS vorhanden
+    assert h.category_rates_on("food", today)[0].rate == 7.0
+    assert "food" in h.aliases_of("FOODSTUFFS")
+
+
+def test_change_feed_records_numbered_diffs(tmp_path):
+    from rate_changes import record_build
+    from rate_store import build_rate_table
+
+    _write(tmp_path, "DE", 19.0, [(7.0, "reduced_rate:FOODSTUFFS"), (7.0, "reduced_rate:BOOKS")])
+    _write(tmp_path, "FR", 20.0)
+    before = build_rate_table(tmp_path)
+    assert record_build(tmp_path, before.countries, before.countries) is None
+
+    _write(tmp_path, "DE", 19.0, [(5.0, "reduced_rate:FOODSTUFFS"), (0.0, "exempted:SUPPLY_WATER")])
+    after = build_rate_table(tmp_path)
+    assert record_build(tmp_path, before.countries, after.countries) == 1
+
+    feed = build_rate_table(tmp_path).changes
+    assert feed.latest == 1
+    assert feed.since(1) == ()
+    de = feed.since(0)[0]["changes"]["DE"]
+    assert [a["category"] for a in de["added"]] == ["SUPPLY_WATER"]
+    assert [r["category"] for r in de["removed"]] == ["BOOKS"]
+    assert de["changed"][0]["to"] == [{"rate": 5.0, "label": "reduced_rate:FOODSTUFFS"}]
+    assert "FR" not in feed.since(0)[0]["changes"]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from single_flight import SingleFlight
+from validate_vat import ValidateRequest
+from vies_cache import ViesResultCache
+from vies_client import ViesFault
+
+
+def _fresh_state(monkeypatch, check_vat):
+    monkeypatch.setattr(main.vies_client, "check_vat", check_vat)
+    monkeypatch.setattr(main, "vies_cache", ViesResultCache(valid_ttl=3600, invalid_ttl=60))
+    monkeypatch.setattr(main, "vies_single_flight", SingleFlight())
+
+
+def test_concurrent_validations_make_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def check_vat(cc, num):
+        calls.append((cc, num))
+        await asyncio.sleep(0.05)
+        return {"countryCode": cc, "vatNumber": num, "requestDate": "2025-10-01+02:00",
+                "valid": True, "name": "ACME", "address": None}
+
+    _fresh_state(monkeypatch, check_vat)
+
+    async def run():
+        spellings = ["DE811907980", "de 811 907 980", "DE-811.907.980"]
+        return await asyncio.gather(*(
+            main.handle_validate_vat(ValidateRequest(vat_number=spellings[i % 3])) for i in range(50)))
+
+    results = asyncio.run(run())
+    assert calls == [("DE", "811907980")]
+    assert all(r.valid and r.checked_at == results[0].checked_at for r in results)
+    assert main.vies_single_flight.stats() == {
+        "calls": 50, "executions": 1, "coalesced": 49, "coalescing_ratio": 0.98, "in_flight": 0}
+
+
+def test_errors_are_shared(monkeypatch):
+    calls = []
+
+    async def check_vat(cc, num):
+        calls.append((cc, num))
+        await asyncio.sleep(0.01)
+        raise ViesFault("MS_UNAVAILABLE")
+
+    _fresh_state(monkeypatch, check_vat)
+
+    async def run():
+        return await asyncio.gather(*(
+            main.handle_validate_vat(ValidateRequest(vat_number="IT00743110157")) for _ in range(20)),
+            return_exceptions=True)
+
+    errors = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(e, HTTPException) and e.status_code == 502 for e in errors)
+    # Fehler werden nicht gecacht: der nächste Aufruf geht wieder zu VIES
+    with pytest.raises(HTTPException):
+        asyncio.run(main.handle_validate_vat(ValidateRequest(vat_number="IT00743110157")))
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == (42, True)
+    assert flight.executions == 1 and flight.in_flight == 0
@@ -0,0 +1,109 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from load_vat_rates import (RateLoadError, RecordedTedbSource, map_results_to_history,  # noqa: E402
+                            parse_vat_rates_response, parse_vat_rates_response_xpath, run)
+from rate_snapshot import read_header  # noqa: E402
+from rate_store import build_rate_table  # noqa: E402
+from tedb_fixtures import history_records, render_response, write_recordings  # noqa: E402
+
+EDGE_CASES = b"""<?xml version="1.0"?>
+<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>
+<r:resp xmlns:r="urn:x" xmlns="urn:types">
+  <vatRateResults>
+    <memberState> IT </memberState><type>REDUCED</type>
+    <rate><type> REDUCED_RATE </type><value>5,5</value></rate>
+    <situationOn>2024-01-01T00:00:00Z</situationOn>
+    <category><!-- c --><identifier>FOODSTUFFS</identifier></category>
+  </vatRateResults>
+  <vatRateResult>
+    <memberState>IT</memberState><type>REDUCED</type>
+    <rate><type>EXEMPTED</type><value></value></rate>
+    <situationOn></situationOn>
+  </vatRateResult>
+  <vatRateResults><memberState>IT</memberState><rate><value>abc</value></rate></vatRateResults>
+</r:resp></S:Body></S:Envelope>"""
+
+FAULT = b"""<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>
+<S:Fault><faultcode>S:Server</faultcode><faultstring>Invalid member state</faultstring></S:Fault>
+</S:Body></S:Envelope>"""
+
+
+def _recorded(years):
+    data = json.loads((Path(__file__).resolve().parent / "scripts" / "data" / "DE.json").read_bytes())
+    return render_response("DE", history_records(data, date(2000, 1, 1), date(2025, 7, 1), years))
+
+
+@pytest.mark.parametrize("content", [_recorded(1), _recorded(10), EDGE_CASES], ids=["1y", "10y", "edge"])
+def test_streaming_parser_matches_xpath_parser(content):
+    assert parse_vat_rates_response(content) == parse_vat_rates_response_xpath(content)
+
+
+def test_fault_raises():
+    with pytest.raises(RuntimeError, match="Invalid member state"):
+        parse_vat_rates_response(FAULT)
+    with pytest.raises(RuntimeError, match="Invalid member state"):
+        parse_vat_rates_response_xpath(FAULT)
+
+
+def test_history_ends_categories_missing_from_current():
+    results = [
+        {"type": "STANDARD", "situationOn": "2007-01-01", "rate": {"value": 19.0, "type": "DEFAULT"}},
+        {"type": "REDUCED", "situationOn": "2020-07-01", "rate": {"value": 7.0, "type": "REDUCED_RATE"},
+         "categoryId": "RESTAURANT"},
+        {"type": "REDUCED", "situationOn": "2007-01-01", "rate": {"value": 7.0, "type": "REDUCED_RATE"},
+         "categoryId": "FOODSTUFFS"},
+    ]
+    current = {"reduced_rates": [{"rate": 7.0, "label": "reduced_rate:FOODSTUFFS"}], "valid_on": "2025-07-01"}
+    history = map_results_to_history("DE", results, date(2000, 1, 1), date(2025, 7, 1), current=current)
+    assert history["categories"]["RESTAURANT"][-1] == {"from": "2025-07-01", "rates": []}
+    assert len(history["categories"]["FOODSTUFFS"]) == 1
+
+
+class FlakySource(RecordedTedbSource):
+    def __init__(self, directory, failing):
+        super().__init__(directory)
+        self.failing = set(failing)
+
+    def fetch(self, country_iso, *args, **kwargs):
+        if country_iso in self.failing:
+            raise ConnectionError("TEDB timeout")
+        return super().fetch(country_iso, *args, **kwargs)
+
+
+def _country_file(directory, cc, standard_rate):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{cc}.json").write_text(json.dumps({
+        "country": cc, "standard_rate": standard_rate, "reduced_rates": [], "currency": "EUR",
+        "valid_on": "2025-01-01"}), encoding="utf-8")
+
+
+def test_failed_country_still_records_the_others(tmp_path):
+    situation_on = date(2025, 9, 1)
+    data_dir, upstream = tmp_path / "data", tmp_path / "upstream"
+    for cc, old, new in (("DE", 19.0, 21.0), ("FR", 20.0, 22.0)):
+        _country_file(data_dir, cc, old)
+        _country_file(upstream, cc, new)
+    write_recordings(tmp_path / "rec", upstream, situation_on)
+
+    with pytest.raises(RateLoadError) as exc:
+        run(FlakySource(tmp_path / "rec", {"FR"}), data_dir, workers=2, countries=["DE", "FR"], with_history=False,
+            situation_on=situation_on)
+    stats = exc.value.stats
+    assert stats["written"] == ["DE.json"] and list(stats["failed"]) == ["FR"]
+    assert stats["change_version"] == 1
+    table = build_rate_table(data_dir)
+    assert list(table.changes.since(0)[0]["changes"]) == ["DE"]
+    assert read_header(data_dir / "rates.snapshot")[5].rstrip(b"\0").decode() == table.version
+
+    # nächster Lauf: nur noch FR im Diff, DE ist bereits verbucht
+    stats = run(FlakySource(tmp_path / "rec", ()), data_dir, workers=2, countries=["DE", "FR"], with_history=False,
+                situation_on=situation_on)
+    assert stats["written"] == ["FR.json"] and stats["change_version"] == 2
+    assert list(build_rate_table(data_dir).changes.since(1)[0]["changes"]) == ["FR"]
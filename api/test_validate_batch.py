@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import main
+from calculate import batch_item_count
+from single_flight import SingleFlight
+from validate_batch import BatchValidator, ValidateBatchRequest
+from validate_vat import ValidateResponse, check_vat_syntax
+from vies_breaker import ViesBreakers
+from vies_cache import ViesResultCache
+from vies_client import ViesFault
+
+ITEMS = [
+    {"vat_number": "DE136695976"},
+    {"vat_number": "de 136 695 976"},              # Duplikat nach Normalisierung
+    {"country_code": "FR", "number": "40303265045"},
+    {"vat_number": "XX123456"},                    # kein EU-Land
+    {"vat_number": 42},                            # kein String
+    {"vat_number": "IT00743110157"},               # VIES-Fault
+    {"country_code": "DE", "number": "136695976"},
+    {"vat_number": "DE811907980"},                 # laut VIES ungültig
+    {"vat_number": "DE123456780"},                 # Prüfziffer falsch, geht nicht an VIES
+]
+
+
+def test_batch_dedupes_and_reports_per_item(monkeypatch):
+    calls = []
+
+    async def check_vat(cc, num):
+        calls.append((cc, num))
+        await asyncio.sleep(0.001)
+        if cc == "IT":
+            raise ViesFault("MS_UNAVAILABLE")
+        return {"countryCode": cc, "vatNumber": num, "requestDate": "2025-10-01+02:00",
+                "valid": not num.endswith("0"), "name": None, "address": None}
+
+    monkeypatch.setattr(main.vies_client, "check_vat", check_vat)
+    monkeypatch.setattr(main, "vies_cache", ViesResultCache(valid_ttl=3600, invalid_ttl=60))
+    monkeypatch.setattr(main, "vies_single_flight", SingleFlight())
+    monkeypatch.setattr(main, "vies_breakers", ViesBreakers())
+
+    result = asyncio.run(main.handle_validate_vat_batch(ValidateBatchRequest(items=ITEMS)))
+    assert sorted(calls) == [("DE", "136695976"), ("DE", "811907980"), ("FR", "40303265045"), ("IT", "00743110157")]
+    assert (result.count, result.unique, result.errors) == (9, 5, 3)
+    assert [item.index for item in result.results] == list(range(9))
+
+    by_index = result.results
+    assert by_index[0].result == by_index[1].result == by_index[6].result and by_index[0].result.valid
+    assert by_index[2].result.country_code == "FR"
+    assert (by_index[3].status_code, by_index[3].error) == (400, "Invalid EU country code: XX")
+    assert by_index[4].status_code == 422 and "vat_number" in by_index[4].error
+    assert (by_index[5].status_code, by_index[5].error) == (502, "VIES Fault: MS_UNAVAILABLE")
+    assert (by_index[7].result.valid, by_index[7].result.status) == (False, "invalid")
+    assert (by_index[8].result.valid, by_index[8].result.status) == (False, "syntax_invalid")
+    assert batch_item_count(json.dumps({"items": ITEMS}).encode(), model=ValidateBatchRequest) == 9
+    assert batch_item_count(json.dumps({"items": ITEMS * 1000}).encode(), model=ValidateBatchRequest) == 1
+
+
+def _with_check_digit(cc, prefix):
+    return next(prefix + c for c in "0123456789" if check_vat_syntax(cc, prefix + c))
+
+
+def test_fan_out_is_bounded_per_country_and_overall():
+    in_flight = {"total": 0}
+    peaks = {"total": 0}
+
+    async def lookup(cc, num):
+        for key in ("total", cc):
+            in_flight[key] = in_flight.get(key, 0) + 1
+            peaks[key] = max(peaks.get(key, 0), in_flight[key])
+        await asyncio.sleep(0.002)
+        for key in ("total", cc):
+            in_flight[key] -= 1
+        return ValidateResponse(valid=True, country_code=cc, vat_number=num, checked_at="2025-10-01T00:00:00Z")
+
+    templates = {"DE": "1{:07d}", "AT": "U1{:06d}", "EL": "{:08d}", "PT": "1{:07d}", "HR": "{:010d}"}
+    items = [{"country_code": cc, "number": _with_check_digit(cc, template.format(i))}
+             for cc, template in templates.items() for i in range(40)]
+    result = asyncio.run(BatchValidator(lookup, concurrency=12, per_country=3).validate(items))
+    assert result.errors == 0 and result.unique == 200
+    assert peaks["total"] == 12
+    assert all(peaks[cc] == 3 for cc in templates)
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+import main  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from single_flight import SingleFlight  # noqa: E402
+from validate_batch import normalize_items  # noqa: E402
+from validation_jobs import (ClaimedItem, DueCallback, ValidationJobRequest, ValidationJobWorker,  # noqa: E402
+                             job_status, result_item, validate_callback_url)
+from vies_breaker import ViesBreakers  # noqa: E402
+from vies_cache import ViesResultCache  # noqa: E402
+from vies_client import ViesClient  # noqa: E402
+from vies_standin import SERVICE_PATH, build_app  # noqa: E402
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class MemoryJobStore:
+    """Gleiche Schnittstelle und Lease-Semantik wie JobStore (Postgres), für Tests ohne DB."""
+
+    def __init__(self):
+        self.jobs = {}
+        self.items = {}
+
+    async def create(self, keys, callback_url, api_key_id):
+        invalid = sum(isinstance(k, HTTPException) for k in keys)
+        done = invalid == len(keys)
+        job = SimpleNamespace(id=uuid.uuid4(), api_key_id=api_key_id, total=len(keys), processed=invalid,
+                              failed=invalid, status="completed" if done else "queued", created_at=_now(),
+                              finished_at=_now() if done else None, callback_url=callback_url,
+                              callback_status="pending" if done and callback_url else None,
+                              callback_attempts=0, callback_next_at=_now())
+        self.jobs[job.id] = job
+        for i, k in enumerate(keys):
+            bad = isinstance(k, HTTPException)
+            self.items[job.id, i] = SimpleNamespace(
+                job_id=job.id, idx=i, country_code=None if bad else k[0], vat_number=None if bad else k[1],
+                status="failed" if bad else "pending", attempts=0, next_attempt_at=_now(), leased_until=None,
+                lease_token=None, valid=None, name=None, address=None, request_date_raw=None, checked_at=None,
+                error=str(k.detail) if bad else None, status_code=k.status_code if bad else None)
+        return job
+
+    async def get(self, job_id, api_key_id):
+        job = self.jobs.get(job_id)
+        return job if job is not None and job.api_key_id == api_key_id else None
+
+    async def results(self, job_id, offset, limit):
+        rows = sorted((r for r in self.items.values() if r.job_id == job_id), key=lambda r: r.idx)
+        return rows[offset:offset + limit]
+
+    async def claim(self, limit, lease_seconds):
+        token, now = uuid.uuid4(), _now()
+        due = [r for r in self.items.values() if r.status == "pending" and r.next_attempt_at <= now
+               and (r.leased_until is None or r.leased_until < now)][:limit]
+        for r in due:
+            r.leased_until, r.lease_token = now + timedelta(seconds=lease_seconds), token
+        return token, [ClaimedItem(r.job_id, r.idx, r.country_code, r.vat_number, r.attempts) for r in due]
+
+    async def complete(self, token, outcomes):
+        for o in outcomes:
+            row = self.items[o.job_id, o.idx]
+            if row.lease_token != token or row.status != "pending":
+                continue
+            row.status, row.attempts, row.error, row.status_code = o.status, o.attempts, o.error, o.status_code
+            row.leased_until = row.lease_token = None
+            if o.next_attempt_at is not None:
+                row.next_attempt_at = o.next_attempt_at
+            if o.result is not None:
+                row.valid, row.name, row.checked_at = o.result.valid, o.result.name, o.result.checked_at
+            job = self.jobs[o.job_id]
+            if job.status == "queued":
+                job.status = "running"
+            if o.status != "pending":
+                job.processed += 1
+                job.failed += o.status == "failed"
+                if job.processed >= job.total:
+                    job.status, job.finished_at = "completed", _now()
+                    if job.callback_url:
+                        job.callback_status, job.callback_next_at = "pending", _now()
+
+    async def claim_callbacks(self, limit, lease_seconds):
+        due = [j for j in self.jobs.values() if j.callback_status == "pending" and j.callback_next_at <= _now()]
+        for j in due:
+            j.callback_next_at = _now() + timedelta(seconds=lease_seconds)
+        return [DueCallback(job=job_status(j), url=j.callback_url, attempts=j.callback_attempts) for j in due]
+
+    async def callback_result(self, job_id, status, attempts, next_at):
+        job = self.jobs[job_id]
+        job.callback_status, job.callback_attempts, job.callback_next_at = status, attempts, next_at
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    """main.validate_normalized gegen den VIES-Stand-in (jede Nummer scheitert zuerst einmal, IT immer)."""
+    app = build_app(faults={"IT": "MS_UNAVAILABLE"}, flaky_calls=1)
+    client = ViesClient(endpoint=f"http://vies{SERVICE_PATH}", transport=httpx.ASGITransport(app=app))
+    monkeypatch.setattr(main, "vies_client", client)
+    monkeypatch.setattr(main, "vies_cache", ViesResultCache(valid_ttl=3600, invalid_ttl=60))
+    monkeypatch.setattr(main, "vies_single_flight", SingleFlight())
+    monkeypatch.setattr(main, "vies_breakers", ViesBreakers(failure_threshold=100))
+    return app
+
+
+def _resolver(*addresses):
+    async def resolve(host, port):
+        return list(addresses)
+    return resolve
+
+
+def _webhook_sink(received):
+    def handler(request):
+        received.append(request)
+        return httpx.Response(204 if len(received) > 1 else 500)  # erster Versuch schlägt fehl
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+async def _drain(worker, store, job_id, rounds=200):
+    for _ in range(rounds):
+        await worker.run_once()
+        if store.jobs[job_id].callback_status in ("delivered", "failed"):
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_with_retries_and_webhook(standin):
+    store, received = MemoryJobStore(), []
+    items = [{"vat_number": "DE136695976"}, {"vat_number": "XX1"}, {"country_code": "FR", "number": "40303265040"},
+             {"vat_number": "IT00743110157"}, {"vat_number": "de 136 695 976"}]
+
+    async def run():
+        worker = ValidationJobWorker(store, main.validate_normalized, webhooks=_webhook_sink(received),
+                                     max_attempts=3, backoff_base=0.001, webhook_secret="s3cret",
+                                     resolve=_resolver("93.184.215.14"))
+        job = await store.create(normalize_items(items), "https://example.test/hook", None)
+        await _drain(worker, store, job.id)
+        return job.id, [result_item(r) for r in await store.results(job.id, 0, 100)]
+
+    job_id, results = asyncio.run(run())
+    job = store.jobs[job_id]
+    assert (job.status, job.total, job.processed, job.failed) == ("completed", 5, 5, 2)
+
+    assert [r.index for r in results] == list(range(5))
+    assert results[0].status == "done" and results[0].result.valid and results[0].attempts == 2
+    assert results[1].status == "failed" and results[1].status_code == 400 and results[1].attempts == 0
+    assert (results[2].result.valid, results[2].result.status, results[2].attempts) == (False, "syntax_invalid", 1)
+    assert (results[3].status, results[3].attempts, results[3].error) == ("failed", 3, "VIES Fault: MS_UNAVAILABLE")
+    assert results[4].status == "done"
+
+    assert job.callback_status == "delivered" and len(received) == 2
+    body = received[-1].content
+    assert json.loads(body)["status"] == "completed"
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert received[-1].headers["X-Vatify-Signature"] == f"sha256={expected}"
+    # verbunden wird mit der geprüften IP, adressiert bleibt der Hostname
+    assert received[-1].url.host == "93.184.215.14" and received[-1].headers["Host"] == "example.test"
+    assert received[-1].extensions["sni_hostname"] == "example.test"
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.1.2.3", "169.254.169.254", "::1", "::ffff:192.168.0.1",
+                                     "fd00::1", "100.64.0.1", "0.0.0.0", "224.0.0.1"])
+def test_callbacks_into_internal_networks_are_rejected(address):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(validate_callback_url("https://hooks.example.test/x", _resolver("93.184.215.14", address)))
+    assert exc.value.status_code == 400
+
+
+def test_callback_url_must_be_https():
+    with pytest.raises(ValueError):
+        ValidationJobRequest(items=[{"vat_number": "DE136695976"}], callback_url="http://hooks.example.test/x")
+    assert asyncio.run(validate_callback_url("https://hooks.example.test/x", _resolver("93.184.215.14"))) is None
+
+
+def test_delivery_rechecks_address_and_ignores_redirects():
+    store, received = MemoryJobStore(), []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(302, headers={"Location": "http://169.254.169.254/latest/meta-data"})
+
+    async def run(address):
+        worker = ValidationJobWorker(store, main.validate_normalized, max_callback_attempts=1,
+                                     webhooks=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                                     resolve=_resolver(address))
+        job = await store.create([], "https://hooks.example.test/x", None)
+        await worker.deliver_callbacks()
+        return store.jobs[job.id]
+
+    # DNS zeigt inzwischen auf die Metadaten-Adresse: kein Request, Callback endgültig "failed"
+    assert asyncio.run(run("169.254.169.254")).callback_status == "failed" and received == []
+    # Redirect wird nicht verfolgt, zählt als fehlgeschlagene Zustellung
+    assert asyncio.run(run("93.184.215.14")).callback_status == "failed" and len(received) == 1
+
+
+def test_items_of_a_dead_worker_are_picked_up_after_lease(standin):
+    store = MemoryJobStore()
+    items = [{"vat_number": n} for n in ("DE136695976", "DE811907980", "FR40303265045", "LU15027442", "ATU13585627",
+                                         "NL004495445B01", "PL8567346215", "PT501964843", "EL094259216", "HU12892312")]
+
+    async def run():
+        job = await store.create(normalize_items(items), None, None)
+        # Worker A holt alles und stirbt vor dem Speichern
+        dead_token, claimed = await store.claim(50, lease_seconds=0.05)
+        assert len(claimed) == 10 and (await store.claim(50, 0.05))[1] == []
+        await asyncio.sleep(0.06)
+
+        worker_b = ValidationJobWorker(store, main.validate_normalized, backoff_base=0.001, lease_seconds=5)
+        for _ in range(100):
+            await worker_b.run_once()
+            if store.jobs[job.id].status == "completed":
+                break
+            await asyncio.sleep(0.005)
+
+        # ein verspätetes Ergebnis von A wird ignoriert
+        worker_a = ValidationJobWorker(store, main.validate_normalized)
+        await store.complete(dead_token, [await worker_a._process(claimed[0])])
+        return store.jobs[job.id]
+
+    job = asyncio.run(run())
+    assert (job.status, job.processed, job.failed) == ("completed", 10, 0)
+    assert all(r.status == "done" for r in store.items.values())
@@ -0,0 +1,96 @@
+import random
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+
+import pytest
+
+from vat_kernel import Rounding, calculate_amounts, calculate_lines, div_round, rate_multiplier, to_minor
+
+RATES = [0.0, 0.9, 1.05, 2.1, 5.5, 7.0, 8.5, 13.5, 17.0, 19.0, 20.0, 21.0, 25.5, 27.0]
+MODES = {"half_up": ROUND_HALF_UP, "half_even": ROUND_HALF_EVEN}
+CENT = Decimal("0.01")
+
+
+def random_amounts(rng: random.Random, n: int) -> list[float]:
+    # gemischt: ganze Cent, halbe Cent (Grenzfälle) und beliebige Nachkommastellen
+    out = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.4:
+            out.append(rng.randint(1, 10_000_000) / 100)
+        elif kind < 0.7:
+            out.append((rng.randint(1, 1_000_000) * 10 + 5) / 1000)
+        else:
+            out.append(round(rng.uniform(0.001, 100_000), rng.randint(0, 6)) or 0.01)
+    return out
+
+
+def decimal_line(amount: float, basis: str, rate: float, mode: str) -> tuple[Decimal, Decimal, Decimal]:
+    rounding = MODES[mode]
+    value = Decimal(repr(amount)).quantize(CENT, rounding=rounding)
+    r = Decimal(repr(rate)) / 100
+    if basis == "net":
+        vat = (value * r).quantize(CENT, rounding=rounding)
+        return value, vat, value + vat
+    net = (value / (1 + r)).quantize(CENT, rounding=rounding)
+    return net, value - net, value
+
+
+@pytest.mark.parametrize("mode", ["half_up", "half_even"])
+@pytest.mark.parametrize("basis", ["net", "gross"])
+def test_line_rounding_matches_decimal(mode, basis):
+    rng = random.Random(f"{mode}-{basis}")
+    amounts = random_amounts(rng, 5_000)
+    rates = [rng.choice(RATES) for _ in amounts]
+    nets, vats, grosses = calculate_amounts(amounts, [basis] * len(amounts), rates, Rounding(mode=mode))
+
+    for amount, rate, net, vat, gross in zip(amounts, rates, nets, vats, grosses):
+        expected = decimal_line(amount, basis, rate, mode)
+        assert (Decimal(repr(net)), Decimal(repr(vat)), Decimal(repr(gross))) == expected, (amount, rate)
+
+
+@pytest.mark.parametrize("mode", ["half_up", "half_even"])
+@pytest.mark.parametrize("basis", ["net", "gross"])
+def test_invoice_rounding_matches_decimal_totals(mode, basis):
+    rng = random.Random(f"invoice-{mode}-{basis}")
+    amounts_minor = [rng.randint(1, 100_000) for _ in range(2_000)]
+    rates = [rng.choice(RATES) for _ in amounts_minor]
+    multipliers = [rate_multiplier(r) for r in rates]
+    nets, vats, grosses = calculate_lines(amounts_minor, [basis] * len(amounts_minor), multipliers,
+                                          Rounding(mode=mode, scope="invoice"))
+
+    for rate in set(rates):
+        idx = [i for i, r in enumerate(rates) if r == rate]
+        total = sum(Decimal(amounts_minor[i]) / 100 for i in idx)
+        r = Decimal(repr(rate)) / 100
+        if basis == "net":
+            expected_vat = (total * r).quantize(CENT, rounding=MODES[mode])
+        else:
+            expected_vat = total - (total / (1 + r)).quantize(CENT, rounding=MODES[mode])
+        assert Decimal(sum(vats[i] for i in idx)) / 100 == expected_vat
+
+        for i in idx:
+            assert nets[i] + vats[i] == grosses[i]
+            exact = Decimal(amounts_minor[i]) * r if basis == "net" else Decimal(amounts_minor[i]) * r / (1 + r)
+            assert abs(Decimal(vats[i]) - exact) < 1
+
+
+def test_to_minor_halves():
+    assert to_minor(0.285) == 29
+    assert to_minor(0.285, "half_even") == 28
+    assert to_minor(10.555, "half_even") == 1056
+    assert to_minor(0.1 + 0.2) == 30
+    assert to_minor(1.004999) == 100
+
+
+def test_div_round():
+    assert div_round(5, 10, "half_up") == 1
+    assert div_round(5, 10, "half_even") == 0
+    assert div_round(15, 10, "half_even") == 2
+    assert div_round(-5, 10, "half_up") == -1
+
+
+def test_rates_are_percentages():
+    assert calculate_amounts([100.0], ["net"], [19.0]) == ([100.0], [19.0], [119.0])
+    assert calculate_amounts([119.0], ["gross"], [19.0]) == ([100.0], [19.0], [119.0])
+    with pytest.raises(ValueError):
+        rate_multiplier(19.00001)
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+import main
+from validate_vat import EU_COUNTRY_CODES, VAT_SYNTAX_CHECKS, check_vat_syntax
+
+# je Mitgliedstaat mindestens eine gültige Nummer (inkl. Sonderformate)
+VALID = [
+    ("AT", "U13585627"),
+    ("BE", "0403019261"), ("BE", "403019261"),            # alte 9-stellige Form
+    ("BG", "175074752"), ("BG", "7523169263"),            # juristische / natürliche Person
+    ("CY", "10259033P"),
+    ("CZ", "25123891"), ("CZ", "7103192745"), ("CZ", "640903926"),
+    ("DE", "136695976"), ("DE", "811907980"),
+    ("DK", "13585628"),
+    ("EE", "100931558"),
+    ("EL", "094259216"),
+    ("ES", "A13585625"), ("ES", "B12345674"), ("ES", "X5253868R"), ("ES", "54362315K"),
+    ("FI", "20774740"),
+    ("FR", "40303265045"), ("FR", "K7399859412"),
+    ("HR", "33392005961"),
+    ("HU", "12892312"),
+    ("IE", "6433435F"), ("IE", "8D79739I"), ("IE", "3628739UA"),
+    ("IT", "00743110157"),
+    ("LT", "119511515"), ("LT", "100001919017"),
+    ("LU", "15027442"),
+    ("LV", "40003521600"), ("LV", "16117519997"),
+    ("MT", "11679112"),
+    ("NL", "004495445B01"),
+    ("PL", "8567346215"),
+    ("PT", "501964843"),
+    ("RO", "18547290"), ("RO", "24736200"),
+    ("SE", "123456789701"),
+    ("SI", "50223054"),
+    ("SK", "2022749619"),
+    ("XI", "980780684"), ("XI", "980780684001"), ("XI", "GD100"),
+]
+
+INVALID = [
+    ("AT", "13585627"),        # ohne "U"
+    ("AT", "U13585628"),
+    ("BE", "2403019261"),      # muss mit 0 oder 1 beginnen
+    ("BE", "0403019262"),
+    ("BG", "175074753"),
+    ("CY", "12000000C"),       # "12..." wird nicht vergeben
+    ("CY", "10259033Q"),
+    ("CZ", "95123891"),        # 8-stellig mit 9 vorne
+    ("CZ", "25123892"),
+    ("DE", "036695976"),       # führende 0
+    ("DE", "811907981"),
+    ("DE", "13669597"),
+    ("DK", "13585629"),
+    ("EE", "200931558"),       # beginnt nicht mit 10
+    ("EL", "094259217"),
+    ("ES", "A13585626"),
+    ("ES", "54362315A"),
+    ("ES", "I1234567A"),       # kein zulässiger Anfangsbuchstabe
+    ("FI", "20774741"),
+    ("FR", "40303265046"),     # SIREN-Luhn
+    ("FR", "41303265045"),     # Schlüssel
+    ("FR", "IO303265045"),     # I und O kommen im Schlüssel nicht vor
+    ("HR", "33392005962"),
+    ("HU", "12892313"),
+    ("IE", "6433435G"),
+    ("IT", "00743110158"),
+    ("IT", "00000000000"),
+    ("LT", "119511525"),       # 8. Stelle muss 1 sein
+    ("LT", "119511516"),
+    ("LU", "15027443"),
+    ("LV", "40003521601"),
+    ("MT", "11679113"),
+    ("NL", "004495446B01"),
+    ("NL", "004495445A01"),
+    ("PL", "8567346216"),
+    ("PT", "501964844"),
+    ("RO", "18547291"),
+    ("RO", "018547290"),
+    ("SE", "123456789702"),    # Suffix muss 01 sein
+    ("SI", "50223055"),
+    ("SK", "2022749618"),
+    ("XI", "980780685"),
+    ("XI", "GD600"),           # GD nur 000-499
+]
+
+
+def test_every_member_state_has_a_check():
+    assert set(VAT_SYNTAX_CHECKS) == EU_COUNTRY_CODES
+
+
+@pytest.mark.parametrize("cc,number", VALID)
+def test_valid_numbers_pass(cc, number):
+    assert check_vat_syntax(cc, number)
+
+
+@pytest.mark.parametrize("cc,number", INVALID)
+def test_invalid_numbers_fail(cc, number):
+    assert not check_vat_syntax(cc, number)
+
+
+def test_lowercase_letters_are_accepted():
+    assert check_vat_syntax("AT", "u13585627") and check_vat_syntax("NL", "004495445b01")
+
+
+def test_syntax_invalid_skips_vies(monkeypatch):
+    async def check_vat(cc, num):
+        raise AssertionError("VIES must not be called")
+
+    monkeypatch.setattr(main.vies_client, "check_vat", check_vat)
+    resp = asyncio.run(main.validate_normalized("DE", "811907981"))
+    assert (resp.valid, resp.status, resp.vies_request_date_raw) == (False, "syntax_invalid", None)
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from single_flight import SingleFlight
+from validate_vat import ValidateRequest
+from vies_breaker import ViesBreakers, ViesCircuitOpen
+from vies_cache import ViesResultCache
+from vies_client import ViesFault, ViesUnavailable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Upstream:
+    """Fake-VIES: Faults pro Land umschaltbar, zählt Aufrufe."""
+
+    def __init__(self):
+        self.down = {}
+        self.calls = []
+
+    async def check_vat(self, cc, num, delay=0.0):
+        self.calls.append(cc)
+        if delay:
+            await asyncio.sleep(delay)
+        if cc in self.down:
+            raise self.down[cc]
+        return {"countryCode": cc, "vatNumber": num, "requestDate": None, "valid": True,
+                "name": None, "address": None}
+
+
+def _call(breakers, upstream, cc, delay=0.0):
+    return breakers.call(cc, lambda: upstream.check_vat(cc, "1", delay))
+
+
+def test_breaker_opens_per_country_and_probes():
+    clock, upstream = Clock(), Upstream()
+    breakers = ViesBreakers(failure_threshold=3, open_seconds=30, clock=clock)
+    upstream.down["IT"] = ViesFault("MS_UNAVAILABLE")
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(ViesFault):
+                await _call(breakers, upstream, "IT")
+        assert breakers.stats()["IT"]["state"] == "open"
+        with pytest.raises(ViesCircuitOpen) as rejected:
+            await _call(breakers, upstream, "IT")
+        assert rejected.value.retry_after == 30 and upstream.calls.count("IT") == 3
+        assert (await _call(breakers, upstream, "DE"))["valid"]
+
+        # half-open: genau eine Probe; schlägt sie fehl, bleibt der Breaker offen
+        clock.now += 30
+        with pytest.raises(ViesFault):
+            await _call(breakers, upstream, "IT")
+        assert breakers.stats()["IT"]["state"] == "open"
+
+        clock.now += 30
+        del upstream.down["IT"]
+        probe = asyncio.ensure_future(_call(breakers, upstream, "IT", delay=0.01))
+        await asyncio.sleep(0)
+        with pytest.raises(ViesCircuitOpen):
+            await _call(breakers, upstream, "IT")
+        assert (await probe)["valid"]
+
+    asyncio.run(run())
+    stats = breakers.stats()
+    assert stats["IT"]["state"] == "closed" and stats["IT"]["opened"] == 2 and stats["IT"]["rejected"] == 2
+    assert stats["DE"]["state"] == "closed"
+
+
+def test_aimd_limit():
+    upstream = Upstream()
+    breakers = ViesBreakers(initial_limit=4, max_limit=8, max_queue=0)
+
+    async def run():
+        results = await asyncio.gather(*(_call(breakers, upstream, "DE", delay=0.01) for _ in range(6)),
+                                       return_exceptions=True)
+        assert sum(isinstance(r, ViesCircuitOpen) for r in results) == 2
+
+        upstream.down["DE"] = ViesFault("MS_MAX_CONCURRENT_REQ")
+        with pytest.raises(ViesFault):
+            await _call(breakers, upstream, "DE")
+        after_overload = breakers.breaker("DE").limit
+        del upstream.down["DE"]
+        for _ in range(20):
+            await _call(breakers, upstream, "DE")
+        return after_overload
+
+    after_overload = asyncio.run(run())
+    b = breakers.breaker("DE")
+    assert after_overload == pytest.approx(4.92 / 2, abs=0.01)  # 4 Erfolge: 4 -> 4.92, dann halbiert
+    assert after_overload < b.limit <= 8
+    assert b.state == "closed" and b.failures == 0 and b.in_flight == 0
+
+
+def test_burst_over_limit_waits_for_a_slot():
+    upstream = Upstream()
+    breakers = ViesBreakers(initial_limit=10, max_queue=2, queue_timeout=1.0)
+
+    async def run():
+        burst = await asyncio.gather(*(_call(breakers, upstream, "DE", delay=0.01) for _ in range(11)))
+        assert all(r["valid"] for r in burst)
+
+        # Warteschlange voll -> sofort abgewiesen; was wartet, kommt nach dem Timeout dran oder nicht
+        slow = ViesBreakers(initial_limit=1, max_queue=1, queue_timeout=0.01)
+        results = await asyncio.gather(*(_call(slow, upstream, "FR", delay=0.05) for _ in range(3)),
+                                       return_exceptions=True)
+        return results, slow
+
+    results, slow = asyncio.run(run())
+    assert upstream.calls.count("DE") == 11 and breakers.stats()["DE"]["rejected"] == 0
+    assert isinstance(results[0], dict)
+    assert [r.reason for r in results[1:]] == ["concurrency limit reached"] * 2
+    assert slow.stats()["FR"] == {"state": "closed", "failures": 0, "limit": 2.0, "in_flight": 0, "queued": 0,
+                                  "opened": 0, "rejected": 2}
+
+
+def test_opening_breaker_fails_waiting_calls():
+    upstream = Upstream()
+    upstream.down["IT"] = ViesUnavailable("ConnectTimeout")
+    breakers = ViesBreakers(failure_threshold=1, open_seconds=30, initial_limit=1, queue_timeout=5.0)
+
+    async def run():
+        return await asyncio.gather(*(_call(breakers, upstream, "IT", delay=0.01) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert isinstance(results[0], ViesUnavailable) and not isinstance(results[0], ViesCircuitOpen)
+    assert all(isinstance(r, ViesCircuitOpen) and r.reason == "circuit open" for r in results[1:])
+    assert upstream.calls == ["IT"]
+
+
+def test_open_breaker_fails_fast_in_api(monkeypatch):
+    upstream = Upstream()
+    upstream.down["IT"] = ViesUnavailable("ConnectTimeout")
+    monkeypatch.setattr(main.vies_client, "check_vat", upstream.check_vat)
+    monkeypatch.setattr(main, "vies_cache", ViesResultCache(valid_ttl=3600, invalid_ttl=60))
+    monkeypatch.setattr(main, "vies_single_flight", SingleFlight())
+    monkeypatch.setattr(main, "vies_breakers", ViesBreakers(failure_threshold=2, open_seconds=30))
+
+    async def run():
+        for n in ("00000010017", "00000020016"):
+            with pytest.raises(HTTPException):
+                await main.handle_validate_vat(ValidateRequest(country_code="IT", number=n))
+        with pytest.raises(HTTPException) as exc:
+            await main.handle_validate_vat(ValidateRequest(country_code="IT", number="00000030015"))
+        return exc.value, await main.is_valid_vat("IT", "IT00743110157")
+
+    error, rc = asyncio.run(run())
+    assert error.status_code == 503 and error.headers == {"Retry-After": "30"}
+    assert rc == (False, "unavailable")
+    assert upstream.calls == ["IT", "IT"]
+
+
+def test_metrics_need_token(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setattr(main.settings, "METRICS_TOKEN", None)
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer "}).status_code == 404
+
+    monkeypatch.setattr(main.settings, "METRICS_TOKEN", "metrics-secret")
+    assert client.get("/api/metrics").status_code == 404
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer metrics-secret"})
+    assert response.status_code == 200 and "breakers" in response.json()["vies"]
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import main
+from validate_vat import ValidateRequest
+from vies_cache import ViesResultCache
+
+T0 = datetime(2025, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self):
+        self.now = T0
+
+    def __call__(self):
+        return self.now
+
+
+class MemoryStore:
+    """Gleiche Schnittstelle wie PostgresViesStore."""
+
+    def __init__(self):
+        self.rows = {}
+
+    async def fetch(self, key):
+        return self.rows.get(key)
+
+    async def save(self, key, entry):
+        self.rows[key] = entry
+
+
+def _result(cc, num, valid):
+    return {"countryCode": cc, "vatNumber": num, "requestDate": "2025-10-01+02:00",
+            "valid": valid, "name": "ACME" if valid else None, "address": None}
+
+
+def test_separate_ttls_for_valid_and_invalid():
+    clock = Clock()
+    cache = ViesResultCache(valid_ttl=3600, invalid_ttl=60, clock=clock)
+
+    async def run():
+        await cache.put(("DE", "1"), _result("DE", "1", True))
+        await cache.put(("DE", "2"), _result("DE", "2", False))
+        clock.now = T0 + timedelta(seconds=59)
+        both = (await cache.get(("DE", "1")), await cache.get(("DE", "2")))
+        clock.now = T0 + timedelta(seconds=61)
+        after_negative_ttl = (await cache.get(("DE", "1")), await cache.get(("DE", "2")))
+        clock.now = T0 + timedelta(hours=1)
+        return both, after_negative_ttl, await cache.get(("DE", "1"))
+
+    both, after_negative_ttl, expired = asyncio.run(run())
+    assert all(e is not None for e in both)
+    assert after_negative_ttl[0].valid and after_negative_ttl[1] is None
+    assert expired is None
+
+
+def test_lru_eviction_and_store_fallback():
+    clock = Clock()
+    store = MemoryStore()
+    cache = ViesResultCache(valid_ttl=3600, invalid_ttl=60, max_entries=2, store=store, clock=clock)
+
+    async def run():
+        for n in "123":
+            await cache.put(("DE", n), _result("DE", n, True))
+        assert ("DE", "1") not in cache._entries and len(store.rows) == 3
+        clock.now = T0 + timedelta(seconds=30)
+        from_store = await cache.get(("DE", "1"))
+        assert ("DE", "1") in cache._entries  # wieder in der LRU
+        cache.clear()
+        clock.now = T0 + timedelta(hours=2)
+        return from_store, await cache.get(("DE", "2"))
+
+    from_store, stale = asyncio.run(run())
+    assert from_store.valid and cache.age(from_store) == 7200
+    assert stale is None
+
+
+def test_validate_vat_served_from_cache(monkeypatch):
+    clock = Clock()
+    calls = []
+
+    async def check_vat(cc, num):
+        calls.append((cc, num))
+        return _result(cc, num, True)
+
+    monkeypatch.setattr(main.vies_client, "check_vat", check_vat)
+    monkeypatch.setattr(main, "vies_cache", ViesResultCache(valid_ttl=3600, invalid_ttl=60, clock=clock))
+
+    async def run():
+        first = await main.handle_validate_vat(ValidateRequest(vat_number="DE 811-907-980"))
+        clock.now = T0 + timedelta(seconds=42)
+        second = await main.handle_validate_vat(ValidateRequest(country_code="de", number="811907980"))
+        rc = await main.is_valid_vat("DE", "DE811907980")
+        return first, second, rc
+
+    first, second, rc = asyncio.run(run())
+    assert calls == [("DE", "811907980")]
+    assert first.cached is False and first.cache_age_seconds is None
+    assert second.cached is True and second.cache_age_seconds == 42
+    assert second.checked_at == first.checked_at == T0 and second.name == "ACME"
+    assert rc == (True, "validated")
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from vies_client import (ViesClient, ViesFault, ViesUnavailable, parse_check_vat_response,  # noqa: E402
+                         parse_check_vat_response_xpath)
+from vies_standin import SERVICE_PATH, build_app, render_check_vat_response  # noqa: E402
+
+ENDPOINT = f"http://vies{SERVICE_PATH}"
+CORPUS_DIR = Path(__file__).resolve().parent / "scripts" / "data" / "vies"
+CORPUS = json.loads((CORPUS_DIR / "expected.json").read_text(encoding="utf-8"))
+
+
+def _client(**kwargs) -> ViesClient:
+    app = build_app(faults={"IT": "MS_UNAVAILABLE"})
+    return ViesClient(endpoint=ENDPOINT, transport=httpx.ASGITransport(app=app), **kwargs)
+
+
+def test_check_vat_against_standin():
+    async def run():
+        client = _client()
+        try:
+            valid = await client.check_vat("DE", "811907981")
+            invalid = await client.check_vat("DE", "123456780")
+            with pytest.raises(ViesFault) as fault:
+                await client.check_vat("IT", "00743110157")
+            with pytest.raises(ViesFault) as bad_input:
+                await client.check_vat("DE", "12<3>")
+        finally:
+            await client.aclose()
+        return valid, invalid, fault.value, bad_input.value
+
+    valid, invalid, fault, bad_input = asyncio.run(run())
+    assert valid["valid"] is True and valid["countryCode"] == "DE" and valid["vatNumber"] == "811907981"
+    assert valid["name"] == "Stand-in GmbH" and valid["requestDate"]
+    assert invalid["valid"] is False
+    assert fault.code == "MS_UNAVAILABLE"
+    assert bad_input.code == "INVALID_INPUT"
+
+
+@pytest.mark.parametrize("handler", [
+    lambda request: httpx.Response(503, text="<html>Service Unavailable</html>"),
+    lambda request: httpx.Response(200, text="<html>not xml"),
+])
+def test_unusable_responses_are_unavailable(handler):
+    client = ViesClient(endpoint=ENDPOINT, transport=httpx.MockTransport(handler))
+    with pytest.raises(ViesUnavailable):
+        asyncio.run(client.check_vat("DE", "811907981"))
+
+
+def test_transport_errors_are_unavailable():
+    def handler(request):
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    client = ViesClient(endpoint=ENDPOINT, transport=httpx.MockTransport(handler))
+    with pytest.raises(ViesUnavailable):
+        asyncio.run(client.check_vat("DE", "811907981"))
+
+
+def test_concurrency_is_capped_by_max_connections():
+    in_flight = peak = 0
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, content=render_check_vat_response("DE", "811907981", True))
+
+    async def run():
+        client = ViesClient(endpoint=ENDPOINT, max_connections=25, transport=httpx.MockTransport(handler))
+        try:
+            return await asyncio.gather(*(client.check_vat("DE", str(i)) for i in range(200)))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+    assert len(results) == 200 and all(r["valid"] for r in results)
+    assert peak == 25
+
+
+def _decode(parse, content):
+    try:
+        return parse(content)
+    except ViesFault as e:
+        return {"fault": e.code}
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_decoder_matches_recorded_corpus(name):
+    content = (CORPUS_DIR / name).read_bytes()
+    assert _decode(parse_check_vat_response, content) == CORPUS[name]
+    assert _decode(parse_check_vat_response_xpath, content) == CORPUS[name]
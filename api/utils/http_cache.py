@@ -0,0 +1,109 @@
+# utils/http_cache.py
+"""
+Vorab serialisierte JSON-Bodies mit starkem ETag und vorkomprimierten Varianten
+(gzip, optional brotli) plus Auslieferung inkl. 304 Not Modified.
+"""
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:  # optional – ohne brotli gibt es nur gzip/identity
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# private: /v1/rates* braucht einen API-Key und zählt gegen die Quota – geteilte Caches
+# (Proxies, CDNs) dürfen die Antworten nicht an Requests ohne Key ausliefern
+DEFAULT_CACHE_CONTROL = "private, max-age=3600"
+
+# Stufen für Bodies, die erst auf Anfrage im Request-Pfad entstehen (gefilterte Varianten):
+# brotli 11 kostet dort ~85 ms CPU für das Bulk-Dokument, 5 rund 1 ms bei fast gleicher Größe
+VARIANT_GZIP_LEVEL = 6
+VARIANT_BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class PreparedBody:
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes]
+    # Basis-ETag (ohne Anführungszeichen); je Content-Encoding wird ein Suffix angehängt
+    etag: str
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+
+def prepare_json_body(obj: Any, gzip_level: int = 9, br_quality: int = 11) -> PreparedBody:
+    # gleiche Serialisierung wie FastAPI/Starlette JSONResponse
+    body = json.dumps(obj, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return PreparedBody(
+        body=body,
+        gzip=gzip.compress(body, compresslevel=gzip_level, mtime=0),
+        br=brotli.compress(body, quality=br_quality) if brotli else None,
+        etag=hashlib.sha256(body).hexdigest()[:32],
+    )
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(token)
+    return accepted
+
+
+def _not_modified(if_none_match: str, prepared: PreparedBody) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # schwacher Vergleich (RFC 9110): W/-Präfix ignorieren; jede Encoding-Variante zählt
+    known = {prepared.etag_for(enc) for enc in (None, "gzip", "br")}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in known:
+            return True
+    return False
+
+
+def conditional_response(request: Request, prepared: PreparedBody,
+                         cache_control: str = DEFAULT_CACHE_CONTROL) -> Response:
+    """304 bei passendem If-None-Match, sonst die beste vorkomprimierte Variante."""
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = None
+    content = prepared.body
+    if prepared.br is not None and "br" in accepted:
+        encoding, content = "br", prepared.br
+    elif "gzip" in accepted:
+        encoding, content = "gzip", prepared.gzip
+
+    headers = {
+        "ETag": prepared.etag_for(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request.headers.get("if-none-match", ""), prepared):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,97 @@
+# validate_batch.py
+"""
+/v1/validate-vat/batch: viele USt-IdNrn. in einem Request (z.B. Lieferantenlisten).
+
+Alle Eingaben werden mit normalize_inputs normalisiert und dedupliziert; jede
+(cc, nummer) wird genau einmal geprüft, Nummern mit falscher Prüfziffer sofort
+lokal (status="syntax_invalid"). Der Fan-out zu VIES ist begrenzt –
+insgesamt und pro Mitgliedstaat, damit ein langsames Land nicht alle Slots belegt
+und das Limit des Länder-Breakers (vies_breaker.py) nicht überrannt wird.
+Ergebnisse und Fehler pro Item in Eingabereihenfolge.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from calculate import MAX_BATCH_ITEMS, validation_message
+from validate_vat import (ValidateRequest, ValidateResponse, check_vat_syntax, normalize_inputs,
+                          syntax_invalid_response)
+
+VALIDATE_BATCH_CONCURRENCY = 16    # parallele VIES-Prüfungen je Batch
+VALIDATE_BATCH_PER_COUNTRY = 4     # davon höchstens je Mitgliedstaat
+
+# normalisierte (cc, nummer) -> Ergebnis; Fehler als HTTPException (online: main.validate_normalized)
+VatLookup = Callable[[str, str], Awaitable[ValidateResponse]]
+
+
+class ValidateBatchRequest(BaseModel):
+    # Items werden einzeln validiert, damit ein fehlerhaftes Item nicht den ganzen Batch abweist
+    items: list[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_ITEMS,
+                                        description="ValidateRequest-Objekte, Reihenfolge bleibt erhalten")
+
+class ValidateBatchItem(BaseModel):
+    index: int
+    result: Optional[ValidateResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+class ValidateBatchResult(BaseModel):
+    count: int
+    unique: int   # tatsächlich geprüfte (cc, nummer)-Paare
+    errors: int
+    results: list[ValidateBatchItem]
+
+
+def normalize_items(raw_items: list[Any]) -> list[tuple[str, str] | HTTPException]:
+    """Je Item (cc, nummer) wie normalize_inputs oder der Fehler (422 Schema, 400 Eingabe)."""
+    keys: list[tuple[str, str] | HTTPException] = []
+    for raw in raw_items:
+        try:
+            req = ValidateRequest.model_validate(raw)
+            keys.append(normalize_inputs(req.vat_number, req.country_code, req.number))
+        except ValidationError as e:
+            keys.append(HTTPException(status_code=422, detail=validation_message(e)))
+        except HTTPException as e:
+            keys.append(e)
+    return keys
+
+
+class BatchValidator:
+    def __init__(self, lookup: VatLookup, concurrency: int = VALIDATE_BATCH_CONCURRENCY,
+                 per_country: int = VALIDATE_BATCH_PER_COUNTRY):
+        self.lookup = lookup
+        self._slots = asyncio.Semaphore(concurrency)
+        self._country_slots: Dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(per_country))
+
+    async def validate(self, raw_items: list[Any]) -> ValidateBatchResult:
+        keys = await run_in_threadpool(normalize_items, raw_items)
+        unique = list(dict.fromkeys(k for k in keys if isinstance(k, tuple)))
+        outcomes = dict(zip(unique, await asyncio.gather(*(self._check(key) for key in unique))))
+
+        results: list[ValidateBatchItem] = []
+        for i, key in enumerate(keys):
+            outcome = outcomes.get(key) if isinstance(key, tuple) else key
+            if isinstance(outcome, ValidateResponse):
+                results.append(ValidateBatchItem(index=i, result=outcome))
+            else:
+                results.append(ValidateBatchItem(index=i, error=str(outcome.detail), status_code=outcome.status_code))
+        return ValidateBatchResult(
+            count=len(results),
+            unique=len(unique),
+            errors=sum(1 for item in results if item.error is not None),
+            results=results,
+        )
+
+    async def _check(self, key: tuple[str, str]) -> ValidateResponse | HTTPException:
+        if not check_vat_syntax(*key):
+            return syntax_invalid_response(*key)   # ohne auf einen VIES-Slot zu warten
+        # erst den Länder-Slot, dann den globalen: Wartende eines langsamen Landes blockieren keine anderen
+        async with self._country_slots[key[0]], self._slots:
+            try:
+                return await self.lookup(*key)
+            except HTTPException as e:
+                return e
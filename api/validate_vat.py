@@ -1,13 +1,14 @@
 from datetime import date
+from operator import mul
 import re
-from typing import Optional
+from typing import Callable, Dict, Literal, Optional
 
 from fastapi import HTTPException
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 # SOAP client (official EU VIES service is SOAP)
 # ⇨ Ergänzungen ganz oben
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 import logging
 
 logger = logging.getLogger("vatify")
@@ -57,7 +58,6 @@ def coerce_request_date(value) -> date | None:
 
 
 # --- Config ---
-VIES_WSDL = "https://ec.europa.eu/taxation_customs/vies/checkVatService.wsdl"
 EU_COUNTRY_CODES = {
     "AT","BE","BG","CY","CZ","DE","DK","EE","EL","ES","FI","FR","HR","HU",
     "IE","IT","LT","LU","LV","MT","NL","PL","PT","RO","SE","SI","SK","XI"
@@ -89,6 +89,17 @@ class ValidateResponse(BaseModel):
     checked_at: datetime
     name: Optional[str] = None
     address: Optional[str] = None
+    # Aus dem VIES-Cache beantwortet? checked_at ist dann der Zeitpunkt der ursprünglichen Abfrage
+    cached: bool = False
+    cache_age_seconds: Optional[float] = None
+    # "valid"/"invalid" laut VIES; "syntax_invalid" = Format/Prüfziffer lokal abgewiesen, ohne VIES-Anfrage
+    status: Optional[Literal["valid", "invalid", "syntax_invalid"]] = None
+
+    @model_validator(mode="after")
+    def _default_status(self):
+        if self.status is None:
+            self.status = "valid" if self.valid else "invalid"
+        return self
 
 # --- Helpers ---
 _clean_non_alnum = re.compile(r"[^A-Za-z0-9]")
@@ -103,21 +114,282 @@ def normalize_inputs(vat_number: Optional[str], country_code: Optional[str], num
     if vat_number:
         raw = _clean_non_alnum.sub("", vat_number).upper()
         if len(raw) < 3:
-            raise HTTPException(status_code=400, error="VAT Number too short.")
+            raise HTTPException(status_code=400, detail="VAT Number too short.")
         cc = raw[:2]
         num = raw[2:]
     else:
         if not (country_code and number):
             raise HTTPException(
                 status_code=400,
-                error="Either 'vat_number' OR ('country_code' AND 'number') must be provided."
+                detail="Either 'vat_number' OR ('country_code' AND 'number') must be provided."
             )
         cc = _clean_non_alnum.sub("", country_code).upper()
         num = _clean_non_alnum.sub("", number)
 
     if cc not in EU_COUNTRY_CODES:
-        raise HTTPException(status_code=400, error=f"Invalid EU country code: {cc}")
+        raise HTTPException(status_code=400, detail=f"Invalid EU country code: {cc}")
 
     if not num or not num.isalnum():
-        raise HTTPException(status_code=400, error="VAT Number is missing or contains invalid characters.")
+        raise HTTPException(status_code=400, detail="VAT Number is missing or contains invalid characters.")
     return cc, num
+
+
+# --- Lokale Syntaxprüfung (Format + Prüfziffer je Mitgliedstaat) ---
+# Was hier durchfällt, kann VIES nur als ungültig melden: Antwort sofort mit status="syntax_invalid",
+# ohne VIES-Anfrage. Für Sonderformate ohne veröffentlichte Prüfziffer wird nur das Format geprüft –
+# im Zweifel entscheidet VIES. Prüfsummen rechnen auf den ASCII-Bytes (Ziffer = Byte - 48).
+VatSyntaxCheck = Callable[[str], bool]
+VAT_SYNTAX_CHECKS: Dict[str, VatSyntaxCheck] = {}
+
+
+def _syntax(*country_codes: str, pattern: str):
+    """Registriert eine Prüfziffer-Funktion; sie bekommt nur Nummern, auf die `pattern` voll passt."""
+    fullmatch = re.compile(pattern).fullmatch
+
+    def register(check: Callable[[bytes], bool]) -> Callable[[bytes], bool]:
+        def validate(num: str) -> bool:
+            return fullmatch(num) is not None and check(num.encode("ascii"))
+        for cc in country_codes:
+            VAT_SYNTAX_CHECKS[cc] = validate
+        return check
+    return register
+
+
+def _weighted(*weights: int) -> Callable[[bytes], int]:
+    """Gewichtete Ziffernsumme; `digits` muss genau so lang sein wie `weights`."""
+    offset = 48 * sum(weights)
+    return lambda digits: sum(map(mul, weights, digits)) - offset
+
+
+# Quersumme von 2*d bzw. Ziffer -> Wert als Byte-Tabelle: translate() + sum() laufen in C
+_LUHN_DOUBLED = bytes.maketrans(b"0123456789", bytes((0, 2, 4, 6, 8, 1, 3, 5, 7, 9)))
+
+
+def _luhn(digits: bytes) -> int:
+    """Luhn-Prüfsumme (0 = gültig), rechte Ziffer ungedoppelt."""
+    plain = digits[-1::-2]
+    return (sum(plain) - 48 * len(plain) + sum(digits[-2::-2].translate(_LUHN_DOUBLED))) % 10
+
+
+# ISO 7064 MOD 11,10 als Zustandstabelle: Index = Zustand * 64 + Byte, Wert = Folgezustand * 64
+_MOD_11_10 = [0] * (11 * 64)
+for _state in range(1, 11):
+    for _digit in range(10):
+        _MOD_11_10[_state * 64 + 48 + _digit] = ((_digit + _state) % 10 or 10) * 2 % 11 * 64
+del _state, _digit
+
+
+def _mod_11_10(digits: bytes) -> int:
+    """Prüfziffer nach ISO 7064 MOD 11,10 (DE, HR)."""
+    table, state = _MOD_11_10, 10 * 64
+    for b in digits:
+        state = table[state + b]
+    return (11 - state // 64) % 10
+
+
+@_syntax("AT", pattern=r"U\d{8}")
+def _at(d: bytes) -> bool:
+    return (6 - _luhn(d[1:8])) % 10 == d[8] - 48
+
+
+@_syntax("BE", pattern=r"0?\d{9}|1\d{9}")   # alte 9-stellige Nummern = mit führender 0
+def _be(d: bytes) -> bool:
+    return (int(d[:-2]) + int(d[-2:])) % 97 == 0
+
+
+_bg_legal = _weighted(1, 2, 3, 4, 5, 6, 7, 8)
+_bg_legal_alt = _weighted(3, 4, 5, 6, 7, 8, 9, 10)
+_bg_person = _weighted(2, 4, 8, 5, 10, 9, 7, 3, 6)      # EGN
+_bg_foreigner = _weighted(21, 19, 17, 13, 11, 9, 7, 3, 1)  # PNF
+_bg_other = _weighted(4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+
+@_syntax("BG", pattern=r"\d{9,10}")
+def _bg(d: bytes) -> bool:
+    check = d[-1] - 48
+    if len(d) == 9:
+        s = _bg_legal(d[:8]) % 11
+        if s == 10:
+            s = _bg_legal_alt(d[:8]) % 11
+        return s % 10 == check
+    return (_bg_person(d[:9]) % 11 % 10 == check or _bg_foreigner(d[:9]) % 10 == check
+            or (11 - _bg_other(d[:9])) % 11 == check)
+
+
+_CY_EVEN = bytes.maketrans(b"0123456789", bytes((1, 0, 5, 7, 9, 13, 15, 17, 19, 21)))
+
+
+@_syntax("CY", pattern=r"\d{8}[A-Z]")
+def _cy(d: bytes) -> bool:
+    s = sum(d[0:8:2].translate(_CY_EVEN)) + sum(d[1:8:2]) - 4 * 48
+    return d[:2] != b"12" and d[8] == 65 + s % 26
+
+
+_cz_legal = _weighted(8, 7, 6, 5, 4, 3, 2)
+
+
+@_syntax("CZ", pattern=r"\d{8,10}")
+def _cz(d: bytes) -> bool:
+    if len(d) == 8:   # juristische Person
+        return d[0] != 57 and ((11 - _cz_legal(d[:7])) % 11 or 1) % 10 == d[7] - 48
+    if len(d) == 9:
+        if d[0] == 54:   # Einzelunternehmer mit Sondernummer "6..."
+            return (8 - (10 - _cz_legal(d[1:8]) % 11) % 11) % 10 == d[8] - 48
+        return True       # Geburtsnummer vor 1954, ohne Prüfziffer
+    return int(d[:9]) % 11 % 10 == d[9] - 48   # Geburtsnummer
+
+
+@_syntax("DE", pattern=r"[1-9]\d{8}")
+def _de(d: bytes) -> bool:
+    return _mod_11_10(d[:8]) == d[8] - 48
+
+
+_dk = _weighted(2, 7, 6, 5, 4, 3, 2, 1)
+_syntax("DK", pattern=r"[1-9]\d{7}")(lambda d: _dk(d) % 11 == 0)
+
+_ee = _weighted(3, 7, 1, 3, 7, 1, 3, 7, 1)
+_syntax("EE", pattern=r"10\d{7}")(lambda d: _ee(d) % 10 == 0)
+
+_el = _weighted(256, 128, 64, 32, 16, 8, 4, 2)
+_syntax("EL", pattern=r"\d{9}")(lambda d: _el(d[:8]) % 11 % 10 == d[8] - 48)
+
+_ES_DNI_LETTERS = b"TRWAGMYFPDXBNJZSQVHLCKE"
+
+
+@_syntax("ES", pattern=r"[0-9A-Z]\d{7}[0-9A-Z]")
+def _es(d: bytes) -> bool:
+    first = d[0]
+    if 48 <= first <= 57:                          # DNI (natürliche Person)
+        return d[8] == _ES_DNI_LETTERS[int(d[:8]) % 23]
+    if first in b"XYZ":                            # NIE, X/Y/Z = 0/1/2
+        return d[8] == _ES_DNI_LETTERS[((first - 88) * 10_000_000 + int(d[1:8])) % 23]
+    if first in b"KLM":                            # Sonderfälle mit DNI-Buchstabe
+        return d[8] == _ES_DNI_LETTERS[int(d[1:8]) % 23]
+    if first in b"ABCDEFGHJNPQRSUVW":              # CIF, Prüfzeichen Ziffer oder Buchstabe
+        check = (10 - _luhn(d[1:8] + b"0")) % 10
+        return d[8] == 48 + check or d[8] == b"JABCDEFGHI"[check]
+    return False
+
+
+_fi = _weighted(7, 9, 10, 5, 8, 4, 2, 1)
+_syntax("FI", pattern=r"\d{8}")(lambda d: _fi(d) % 11 == 0)
+
+
+@_syntax("FR", pattern=r"[0-9A-HJ-NP-Z]{2}\d{9}")
+def _fr(d: bytes) -> bool:
+    siren = d[2:]
+    if siren[:3] != b"000" and _luhn(siren):      # "000..." = Monaco, ohne SIREN
+        return False
+    if d[:2].isdigit():
+        return int(d[:2]) == int(siren + b"12") % 97
+    return True   # alphanumerischer Schlüssel: nur Format + SIREN
+
+
+@_syntax("HR", pattern=r"\d{11}")
+def _hr(d: bytes) -> bool:
+    return _mod_11_10(d[:10]) == d[10] - 48
+
+
+_hu = _weighted(9, 7, 3, 1, 9, 7, 3, 1)
+_syntax("HU", pattern=r"\d{8}")(lambda d: _hu(d) % 10 == 0)
+
+_IE_LETTERS = b"WABCDEFGHIJKLMNOPQRSTUV"
+_ie = _weighted(8, 7, 6, 5, 4, 3, 2)
+
+
+@_syntax("IE", pattern=r"\d{7}[A-W][A-W]?|\d[A-Z]\d{5}[A-W]")
+def _ie_check(d: bytes) -> bool:
+    if d[1] >= 65:   # altes Format: Ziffer, Buchstabe, 5 Ziffern, Prüfbuchstabe
+        return d[7] == _IE_LETTERS[_ie(b"0" + d[2:7] + d[:1]) % 23]
+    suffix = 9 * _IE_LETTERS.index(d[8]) if len(d) == 9 else 0
+    return d[7] == _IE_LETTERS[(_ie(d[:7]) + suffix) % 23]
+
+
+_IT_OFFICES = frozenset(range(1, 101)) | {120, 121, 888, 999}   # Stellen 8-10: Provinz-Steueramt
+
+
+@_syntax("IT", pattern=r"\d{11}")
+def _it(d: bytes) -> bool:
+    return d[:7] != b"0000000" and int(d[7:10]) in _IT_OFFICES and _luhn(d) == 0
+
+
+# Gewichte 1..9 zyklisch, bei Rest 10 zweiter Durchlauf um zwei verschoben; je Länge (9 bzw. 12) vorab
+_LT_WEIGHTS = {n: (_weighted(*(1 + i % 9 for i in range(n - 1))), _weighted(*(1 + (i + 2) % 9 for i in range(n - 1))))
+               for n in (9, 12)}
+
+
+@_syntax("LT", pattern=r"\d{7}1\d|\d{10}1\d")
+def _lt(d: bytes) -> bool:
+    first, second = _LT_WEIGHTS[len(d)]
+    s = first(d[:-1]) % 11
+    if s == 10:
+        s = second(d[:-1]) % 11
+    return s % 10 == d[-1] - 48
+
+
+_syntax("LU", pattern=r"\d{8}")(lambda d: int(d[:6]) % 89 == int(d[6:]))
+
+_lv_legal = _weighted(9, 1, 4, 8, 3, 10, 2, 5, 7, 6, 1)
+_lv_person = _weighted(10, 5, 8, 4, 2, 1, 6, 3, 7, 9)
+
+
+@_syntax("LV", pattern=r"\d{11}")
+def _lv(d: bytes) -> bool:
+    if d[0] > 51:   # juristische Person (erste Ziffer > 3)
+        return _lv_legal(d) % 11 == 3
+    return (1 + _lv_person(d[:10])) % 11 % 10 == d[10] - 48
+
+
+_mt = _weighted(3, 4, 6, 7, 8, 9, 10, 1)
+_syntax("MT", pattern=r"[1-9]\d{7}")(lambda d: _mt(d) % 37 == 0)
+
+_nl_bsn = _weighted(9, 8, 7, 6, 5, 4, 3, 2, -1)
+
+
+@_syntax("NL", pattern=r"\d{9}B\d{2}")
+def _nl(d: bytes) -> bool:
+    if int(d[:9]) == 0 or int(d[10:]) == 0:
+        return False
+    # BSN/RSIN (Elfproef) oder seit 2020 die Einzelunternehmer-Nummer (MOD 97 über "NL..." mit N=23, L=21, B=11)
+    return _nl_bsn(d[:9]) % 11 == 0 or int(b"2321" + d[:9] + b"11" + d[10:]) % 97 == 1
+
+
+_pl = _weighted(6, 5, 7, 2, 3, 4, 5, 6, 7, -1)
+_syntax("PL", pattern=r"\d{10}")(lambda d: _pl(d) % 11 == 0)
+
+_pt = _weighted(9, 8, 7, 6, 5, 4, 3, 2)
+_syntax("PT", pattern=r"[1-9]\d{8}")(lambda d: (11 - _pt(d[:8])) % 11 % 10 == d[8] - 48)
+
+_ro = _weighted(7, 5, 3, 2, 1, 7, 5, 3, 2)
+_syntax("RO", pattern=r"[1-9]\d{1,9}")(lambda d: 10 * _ro(d[:-1].zfill(9)) % 11 % 10 == d[-1] - 48)
+
+_syntax("SE", pattern=r"\d{10}01")(lambda d: _luhn(d[:10]) == 0)
+
+_si = _weighted(8, 7, 6, 5, 4, 3, 2)
+_syntax("SI", pattern=r"[1-9]\d{7}")(lambda d: (11 - _si(d[:7]) % 11) % 10 == d[7] - 48 and _si(d[:7]) % 11 != 0)
+
+
+@_syntax("SK", pattern=r"\d{10}")
+def _sk(d: bytes) -> bool:
+    # Unternehmen und Geburtsnummern: durch 11 teilbar (alte Geburtsnummern: Rest 10 -> Endziffer 0)
+    return int(d) % 11 == 0 or (int(d[:9]) % 11 == 10 and d[9] == 48)
+
+
+_xi = _weighted(8, 7, 6, 5, 4, 3, 2, 10, 1)
+
+
+@_syntax("XI", pattern=r"\d{9}|\d{12}|GD[0-4]\d{2}|HA[5-9]\d{2}")
+def _xi_check(d: bytes) -> bool:
+    # Behörden (GD) und Gesundheitswesen (HA) ohne Prüfziffer; sonst MOD 97 (alt: 0, neu: 42 oder 55)
+    return d[0] >= 65 or _xi(d[:9]) % 97 in (0, 42, 55)
+
+
+def check_vat_syntax(country_code: str, number: str) -> bool:
+    """False, wenn die (normalisierte) Nummer Format oder Prüfziffer des Mitgliedstaats verletzt."""
+    check = VAT_SYNTAX_CHECKS.get(country_code)
+    return check is None or check(number.upper())
+
+
+def syntax_invalid_response(country_code: str, number: str) -> ValidateResponse:
+    return ValidateResponse(valid=False, country_code=country_code, vat_number=number,
+                            checked_at=datetime.now(timezone.utc), status="syntax_invalid")
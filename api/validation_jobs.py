@@ -0,0 +1,458 @@
+# validation_jobs.py
+"""
+Asynchrone Massenprüfung von USt-IdNrn. für Listen, die nicht in einen Request
+passen (POST /v1/validate-vat/jobs -> Job-ID, dann Status/Ergebnisse abfragen
+oder Callback-URL angeben).
+
+- Job + Items liegen in Postgres (validation_jobs, validation_job_items); Eingaben
+  werden beim Anlegen normalisiert, ungültige sind sofort "failed".
+- Worker-Pool (Tasks im Lifespan, in jedem App-Prozess) holt fällige Items per
+  FOR UPDATE SKIP LOCKED mit Lease: stirbt ein Worker, läuft die Lease ab und ein
+  anderer übernimmt. Ergebnisse gelten nur mit gültigem Lease-Token, Items werden
+  also nie doppelt gezählt.
+- VIES über denselben Pfad wie /v1/validate-vat (Cache, Single-Flight, Breaker);
+  vorübergehende Fehler mit exponentiellem Backoff (+ Jitter, Retry-After) bis
+  `max_attempts`, danach "failed".
+- Nach Abschluss POST an die Callback-URL (JSON = Job-Status, optional HMAC-signiert),
+  ebenfalls mit Retries. Nur https und nur öffentliche Adressen: der Host wird beim
+  Anlegen und vor jeder Zustellung aufgelöst, verbunden wird mit der geprüften IP
+  (kein zweites DNS), Redirects werden nicht verfolgt.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import ipaddress
+import logging
+import random
+import socket
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple
+import uuid
+
+import httpx
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, HttpUrl, field_validator
+from sqlalchemy import insert, select, text, update
+
+from db.models import ValidationJob, ValidationJobItem
+from validate_batch import ValidateBatchItem, VatLookup
+from validate_vat import ValidateResponse, check_vat_syntax
+
+logger = logging.getLogger("vatify")
+
+MAX_JOB_ITEMS = 100_000
+_INSERT_CHUNK = 5_000
+# VIES-Faults, bei denen eine Wiederholung nichts ändert
+PERMANENT_FAULTS = ("INVALID_INPUT", "INVALID_REQUESTER_INFO", "VAT_BLOCKED", "IP_BLOCKED")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# --- API-Modelle ---
+class ValidationJobRequest(BaseModel):
+    items: list[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_JOB_ITEMS,
+                                        description="ValidateRequest-Objekte, Reihenfolge bleibt erhalten")
+    callback_url: Optional[HttpUrl] = Field(None, description="Erhält nach Abschluss einen POST mit dem Job-Status (nur https)")
+
+    @field_validator("callback_url")
+    @classmethod
+    def _https_only(cls, url: Optional[HttpUrl]) -> Optional[HttpUrl]:
+        if url is not None and url.scheme != "https":
+            raise ValueError("callback_url must use https")
+        return url
+
+class ValidationJobStatus(BaseModel):
+    job_id: uuid.UUID
+    status: Literal["queued", "running", "completed"]
+    total: int
+    processed: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    callback_status: Optional[Literal["pending", "delivered", "failed"]] = None
+
+class ValidationJobResultItem(ValidateBatchItem):
+    status: Literal["pending", "done", "failed"]
+    attempts: int
+
+class ValidationJobResults(BaseModel):
+    job_id: uuid.UUID
+    offset: int
+    results: list[ValidationJobResultItem]
+
+
+def job_status(job) -> ValidationJobStatus:
+    return ValidationJobStatus(
+        job_id=job.id, status=job.status, total=job.total, processed=job.processed, failed=job.failed,
+        created_at=job.created_at, finished_at=job.finished_at, callback_status=job.callback_status,
+    )
+
+
+def result_item(row) -> ValidationJobResultItem:
+    result = None
+    if row.status == "done":
+        result = ValidateResponse(
+            valid=row.valid, country_code=row.country_code, vat_number=row.vat_number,
+            vies_request_date_raw=row.request_date_raw, checked_at=row.checked_at,
+            name=row.name, address=row.address,
+            # lokal abgewiesene Nummern werden nicht gesondert gespeichert; die Prüfung ist deterministisch
+            status=None if check_vat_syntax(row.country_code, row.vat_number) else "syntax_invalid",
+        )
+    # bei "pending" der Fehler des letzten Versuchs
+    return ValidationJobResultItem(index=row.idx, status=row.status, attempts=row.attempts, result=result,
+                                   error=row.error, status_code=row.status_code)
+
+
+# --- Persistenz ---
+@dataclass
+class ClaimedItem:
+    job_id: uuid.UUID
+    idx: int
+    country_code: str
+    vat_number: str
+    attempts: int
+
+
+@dataclass
+class ItemOutcome:
+    job_id: uuid.UUID
+    idx: int
+    status: str                          # done | failed | pending (erneuter Versuch)
+    attempts: int
+    next_attempt_at: Optional[datetime] = None
+    result: Optional[ValidateResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+
+@dataclass
+class DueCallback:
+    job: ValidationJobStatus
+    url: str
+    attempts: int
+
+
+_CLAIM_ITEMS = text("""
+UPDATE validation_job_items AS i
+   SET leased_until = now() + make_interval(secs => :lease), lease_token = :token
+  FROM (SELECT job_id, idx FROM validation_job_items
+         WHERE status = 'pending' AND next_attempt_at <= now()
+           AND (leased_until IS NULL OR leased_until < now())
+         ORDER BY next_attempt_at
+         LIMIT :limit
+           FOR UPDATE SKIP LOCKED) AS due
+ WHERE i.job_id = due.job_id AND i.idx = due.idx
+RETURNING i.job_id, i.idx, i.country_code, i.vat_number, i.attempts
+""")
+
+_FINISH_ITEMS = text("""
+UPDATE validation_jobs
+   SET processed = processed + :n,
+       failed = failed + :f,
+       status = CASE WHEN processed + :n >= total THEN 'completed' ELSE status END,
+       finished_at = CASE WHEN processed + :n >= total THEN now() ELSE finished_at END,
+       callback_status = CASE WHEN processed + :n >= total AND callback_url IS NOT NULL
+                              THEN 'pending' ELSE callback_status END,
+       callback_next_at = CASE WHEN processed + :n >= total THEN now() ELSE callback_next_at END
+ WHERE id = :id
+""")
+
+_CLAIM_CALLBACKS = text("""
+UPDATE validation_jobs AS j
+   SET callback_next_at = now() + make_interval(secs => :lease)
+  FROM (SELECT id FROM validation_jobs
+         WHERE callback_status = 'pending' AND callback_next_at <= now()
+         ORDER BY callback_next_at
+         LIMIT :limit
+           FOR UPDATE SKIP LOCKED) AS due
+ WHERE j.id = due.id
+RETURNING j.id, j.status, j.total, j.processed, j.failed, j.created_at, j.finished_at,
+          j.callback_status, j.callback_url, j.callback_attempts
+""")
+
+
+class JobStore:
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def create(self, keys: List[Tuple[str, str] | HTTPException], callback_url: Optional[str],
+                     api_key_id: Optional[uuid.UUID]) -> ValidationJob:
+        invalid = sum(1 for k in keys if isinstance(k, HTTPException))
+        finished = invalid == len(keys)
+        now = _utcnow()
+        job = ValidationJob(
+            id=uuid.uuid4(), api_key_id=api_key_id, total=len(keys), processed=invalid, failed=invalid,
+            status="completed" if finished else "queued", created_at=now,
+            finished_at=now if finished else None, callback_url=callback_url, callback_attempts=0,
+            callback_status="pending" if finished and callback_url else None,
+            callback_next_at=now if finished and callback_url else None,
+        )
+        rows = [
+            {"job_id": job.id, "idx": i, "country_code": None, "vat_number": None, "status": "failed",
+             "attempts": 0, "error": str(k.detail), "status_code": k.status_code}
+            if isinstance(k, HTTPException) else
+            {"job_id": job.id, "idx": i, "country_code": k[0], "vat_number": k[1], "status": "pending",
+             "attempts": 0, "error": None, "status_code": None}
+            for i, k in enumerate(keys)
+        ]
+        async with self.session_factory() as db:
+            db.add(job)
+            await db.flush()
+            for start in range(0, len(rows), _INSERT_CHUNK):
+                await db.execute(insert(ValidationJobItem), rows[start:start + _INSERT_CHUNK])
+            await db.commit()
+        return job
+
+    async def get(self, job_id: uuid.UUID, api_key_id: Optional[uuid.UUID]) -> Optional[ValidationJob]:
+        async with self.session_factory() as db:
+            return await db.scalar(select(ValidationJob).where(
+                ValidationJob.id == job_id, ValidationJob.api_key_id == api_key_id))
+
+    async def results(self, job_id: uuid.UUID, offset: int, limit: int) -> List[ValidationJobItem]:
+        async with self.session_factory() as db:
+            rows = await db.scalars(
+                select(ValidationJobItem).where(ValidationJobItem.job_id == job_id)
+                .order_by(ValidationJobItem.idx).offset(offset).limit(limit))
+            return list(rows)
+
+    async def claim(self, limit: int, lease_seconds: float) -> Tuple[uuid.UUID, List[ClaimedItem]]:
+        token = uuid.uuid4()
+        async with self.session_factory() as db:
+            rows = (await db.execute(_CLAIM_ITEMS, {"lease": lease_seconds, "token": token, "limit": limit})).all()
+            await db.commit()
+        return token, [ClaimedItem(*row) for row in rows]
+
+    async def complete(self, token: uuid.UUID, outcomes: List[ItemOutcome]) -> None:
+        finished: Dict[uuid.UUID, List[int]] = {}
+        async with self.session_factory() as db:
+            for o in outcomes:
+                values: Dict[str, Any] = {"status": o.status, "attempts": o.attempts, "error": o.error,
+                                          "status_code": o.status_code, "leased_until": None, "lease_token": None}
+                if o.next_attempt_at is not None:
+                    values["next_attempt_at"] = o.next_attempt_at
+                if o.result is not None:
+                    values.update(valid=o.result.valid, name=o.result.name, address=o.result.address,
+                                  request_date_raw=o.result.vies_request_date_raw, checked_at=o.result.checked_at)
+                # nur mit gültiger Lease: ein Worker, dessen Lease abgelaufen ist, überschreibt nichts mehr
+                res = await db.execute(
+                    update(ValidationJobItem)
+                    .where(ValidationJobItem.job_id == o.job_id, ValidationJobItem.idx == o.idx,
+                           ValidationJobItem.lease_token == token, ValidationJobItem.status == "pending")
+                    .values(**values))
+                if res.rowcount and o.status != "pending":
+                    counts = finished.setdefault(o.job_id, [0, 0])
+                    counts[0] += 1
+                    counts[1] += o.status == "failed"
+
+            job_ids = {o.job_id for o in outcomes}
+            if job_ids:
+                await db.execute(update(ValidationJob)
+                                 .where(ValidationJob.id.in_(job_ids), ValidationJob.status == "queued")
+                                 .values(status="running"))
+            for job_id, (n, f) in finished.items():
+                await db.execute(_FINISH_ITEMS, {"id": job_id, "n": n, "f": f})
+            await db.commit()
+
+    async def claim_callbacks(self, limit: int, lease_seconds: float) -> List[DueCallback]:
+        async with self.session_factory() as db:
+            rows = (await db.execute(_CLAIM_CALLBACKS, {"lease": lease_seconds, "limit": limit})).all()
+            await db.commit()
+        return [DueCallback(job=job_status(row), url=row.callback_url, attempts=row.callback_attempts) for row in rows]
+
+    async def callback_result(self, job_id: uuid.UUID, status: str, attempts: int,
+                              next_at: Optional[datetime]) -> None:
+        async with self.session_factory() as db:
+            await db.execute(update(ValidationJob).where(ValidationJob.id == job_id).values(
+                callback_status=status, callback_attempts=attempts, callback_next_at=next_at))
+            await db.commit()
+
+
+# --- Worker ---
+# --- Callback-URLs (SSRF-Schutz) ---
+class UnsafeCallbackUrl(ValueError):
+    pass
+
+
+Resolver = Callable[[str, int], Awaitable[List[str]]]
+
+
+async def _getaddrinfo(host: str, port: int) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    # is_global schließt Loopback, RFC1918, Link-Local (169.254.169.254), Shared und Reserved aus
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_callback_url(url: str, resolve: Resolver = _getaddrinfo) -> str:
+    """
+    Prüft eine Callback-URL und gibt die Adresse zurück, mit der verbunden werden soll.
+    UnsafeCallbackUrl, wenn sie nicht https ist oder der Host (auch) auf eine nicht
+    öffentliche Adresse zeigt; DNS-Fehler kommen als OSError durch.
+    """
+    parsed = httpx.URL(url)
+    if parsed.scheme != "https" or not parsed.host:
+        raise UnsafeCallbackUrl("callback_url must be an https URL")
+    addresses = await resolve(parsed.host, parsed.port or 443)
+    if not addresses or not all(_is_public(a) for a in addresses):
+        raise UnsafeCallbackUrl("callback_url must resolve to public addresses only")
+    return addresses[0]
+
+
+async def validate_callback_url(url: str, resolve: Resolver = _getaddrinfo) -> None:
+    """Beim Anlegen eines Jobs: HTTP 400 statt eines Callbacks ins interne Netz."""
+    try:
+        await resolve_callback_url(url, resolve)
+    except UnsafeCallbackUrl as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError:
+        raise HTTPException(status_code=400, detail="callback_url host does not resolve")
+
+
+def is_retryable(e: HTTPException) -> bool:
+    return e.status_code >= 500 and not str(e.detail).endswith(PERMANENT_FAULTS)
+
+
+class ValidationJobWorker:
+    def __init__(self, store: JobStore, lookup: VatLookup, webhooks: Optional[httpx.AsyncClient] = None,
+                 concurrency: int = 8, batch_size: int = 50, max_attempts: int = 6,
+                 backoff_base: float = 2.0, backoff_max: float = 600.0, lease_seconds: float = 120.0,
+                 poll_interval: float = 1.0, webhook_secret: Optional[str] = None,
+                 max_callback_attempts: int = 8, resolve: Resolver = _getaddrinfo):
+        self.store = store
+        self.lookup = lookup
+        self.webhooks = webhooks
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.webhook_secret = webhook_secret
+        self.max_callback_attempts = max_callback_attempts
+        self.resolve = resolve
+
+    def _backoff(self, attempts: int, retry_after: Optional[str] = None) -> timedelta:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+        if retry_after:
+            delay = max(delay, float(retry_after))
+        return timedelta(seconds=delay)
+
+    async def _process(self, item: ClaimedItem) -> ItemOutcome:
+        attempts = item.attempts + 1
+        try:
+            result = await self.lookup(item.country_code, item.vat_number)
+        except HTTPException as e:
+            error = e
+        except Exception:
+            logger.exception("Unexpected error in validation job worker")
+            error = HTTPException(status_code=500, detail="Unexpected Error while checking with VIES.")
+        else:
+            return ItemOutcome(item.job_id, item.idx, "done", attempts, result=result)
+
+        outcome = ItemOutcome(item.job_id, item.idx, "failed", attempts, error=str(error.detail),
+                              status_code=error.status_code)
+        if attempts < self.max_attempts and is_retryable(error):
+            outcome.status = "pending"
+            outcome.next_attempt_at = _utcnow() + self._backoff(attempts, (error.headers or {}).get("Retry-After"))
+        return outcome
+
+    async def process_items(self) -> int:
+        token, items = await self.store.claim(self.batch_size, self.lease_seconds)
+        if not items:
+            return 0
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def one(item: ClaimedItem) -> ItemOutcome:
+            async with slots:
+                return await self._process(item)
+
+        await self.store.complete(token, await asyncio.gather(*(one(item) for item in items)))
+        return len(items)
+
+    async def _deliver(self, due: DueCallback) -> None:
+        body = due.job.model_dump_json().encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_secret:
+            digest = hmac.new(self.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+            headers["X-Vatify-Signature"] = f"sha256={digest}"
+        attempts = due.attempts + 1
+        url = httpx.URL(due.url)
+        try:
+            # bei jeder Zustellung neu prüfen: der DNS-Eintrag kann sich seit dem Anlegen geändert haben
+            address = await resolve_callback_url(due.url, self.resolve)
+            # mit der geprüften IP verbinden; Host-Header und TLS (SNI, Zertifikat) gelten dem Hostnamen
+            resp = await self.webhooks.post(url.copy_with(host=address), content=body,
+                                            headers={**headers, "Host": url.netloc.decode("ascii")},
+                                            extensions={"sni_hostname": url.host}, follow_redirects=False)
+            delivered = resp.is_success
+        except UnsafeCallbackUrl as e:
+            logger.warning(f"Webhook for job {due.job.job_id} blocked: {e}")
+            await self.store.callback_result(due.job.job_id, "failed", attempts, None)
+            return
+        except (httpx.HTTPError, OSError) as e:
+            logger.warning(f"Webhook for job {due.job.job_id} failed: {type(e).__name__}: {e}")
+            delivered = False
+
+        if delivered:
+            await self.store.callback_result(due.job.job_id, "delivered", attempts, None)
+        elif attempts >= self.max_callback_attempts:
+            await self.store.callback_result(due.job.job_id, "failed", attempts, None)
+        else:
+            await self.store.callback_result(due.job.job_id, "pending", attempts, _utcnow() + self._backoff(attempts))
+
+    async def deliver_callbacks(self) -> int:
+        due = await self.store.claim_callbacks(self.batch_size, self.lease_seconds)
+        for callback in due:
+            await self._deliver(callback)
+        return len(due)
+
+    async def run_once(self) -> int:
+        return await self.process_items() + await self.deliver_callbacks()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                busy = await self.run_once()
+            except Exception:
+                logger.exception("Validation job worker iteration failed")
+                busy = 0
+            if not busy:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+
+class ValidationJobPool:
+    """`workers` Worker-Tasks auf dem Event-Loop der App, gestartet/gestoppt im Lifespan."""
+
+    def __init__(self, store: JobStore, lookup: VatLookup, workers: int = 2, **options):
+        self.workers = [ValidationJobWorker(store, lookup, **options) for _ in range(workers)]
+        self._stop: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._webhooks: Optional[httpx.AsyncClient] = None
+
+    def start(self) -> None:
+        self._stop = asyncio.Event()
+        self._webhooks = httpx.AsyncClient(timeout=httpx.Timeout(10.0, connect=5.0), follow_redirects=False)
+        for worker in self.workers:
+            worker.webhooks = self._webhooks
+        self._tasks = [asyncio.create_task(worker.run(self._stop)) for worker in self.workers]
+
+    async def stop(self) -> None:
+        if self._stop is None:
+            return
+        self._stop.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._webhooks.aclose()
+        self._stop, self._tasks, self._webhooks = None, [], None
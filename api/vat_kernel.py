@@ -0,0 +1,150 @@
+# vat_kernel.py
+"""
+Rechenkern für net/vat/gross in ganzzahligen Minor Units (Cent).
+
+- Beträge werden einmal exakt in Cent überführt (to_minor), danach wird nur noch
+  mit int gerechnet – kein float-Drift beim Aufsummieren.
+- Steuersätze kommen als Prozent (19.0, 5.5, 1.05) und werden einmal in einen
+  ganzzahligen Multiplikator in ppm übersetzt (19 % -> 190_000 / 1_000_000).
+- Rundung explizit: mode "half_up" (kaufmännisch) oder "half_even" (Banker's),
+  scope "line" (jede Position für sich) oder "invoice" (Steuer je Satz auf die
+  Rechnungssumme, Verteilung auf die Positionen nach größtem Rest).
+"""
+from dataclasses import dataclass
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal
+from typing import Hashable, Literal, Optional, Sequence
+
+RoundingMode = Literal["half_up", "half_even"]
+RoundingScope = Literal["line", "invoice"]
+
+MINOR_PER_UNIT = 100
+RATE_SCALE = 1_000_000  # Multiplikator in ppm: 19 % -> 190_000
+
+_DECIMAL_ROUNDING = {"half_up": ROUND_HALF_UP, "half_even": ROUND_HALF_EVEN}
+_CENT = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class Rounding:
+    mode: RoundingMode = "half_up"
+    scope: RoundingScope = "line"
+
+
+DEFAULT_ROUNDING = Rounding()
+
+_multipliers: dict[float, int] = {}
+
+
+def rate_multiplier(rate_percent: float) -> int:
+    """Prozentsatz -> ganzzahliger Multiplikator (ppm), je Satz nur einmal berechnet."""
+    m = _multipliers.get(rate_percent)
+    if m is None:
+        exact = Decimal(repr(rate_percent)) * (RATE_SCALE // 100)
+        if exact != exact.to_integral_value() or exact < 0:
+            raise ValueError(f"Unsupported VAT rate: {rate_percent}")
+        m = _multipliers[rate_percent] = int(exact)
+    return m
+
+
+def div_round(numerator: int, denominator: int, mode: RoundingMode) -> int:
+    """Ganzzahlige Division mit expliziter Rundung (Hälfte vom Nullpunkt weg bzw. zur geraden Zahl)."""
+    sign = -1 if numerator < 0 else 1
+    q, r = divmod(abs(numerator), denominator)
+    twice = 2 * r
+    if twice > denominator or (twice == denominator and (mode == "half_up" or q & 1)):
+        q += 1
+    return sign * q
+
+
+def to_minor(amount: float, mode: RoundingMode = "half_up") -> int:
+    """Betrag -> Cent. Schneller Pfad über float, exakte Dezimalrundung nur in Grenzfällen."""
+    scaled = amount * MINOR_PER_UNIT
+    whole = int(scaled)
+    frac = abs(scaled - whole)
+    if abs(frac - 0.5) > 1e-6 and abs(scaled) < 2 ** 52:
+        return whole + (1 if scaled > 0 else -1) * (frac > 0.5)
+    # genau (oder fast) auf der Hälfte: anhand der Dezimaldarstellung entscheiden
+    return int(Decimal(repr(amount)).quantize(_CENT, rounding=_DECIMAL_ROUNDING[mode]) * MINOR_PER_UNIT)
+
+
+def from_minor(minor: int) -> float:
+    return minor / MINOR_PER_UNIT
+
+
+def _allocate(total: int, numerators: list[int], denominator: int) -> list[int]:
+    """Verteilt `total` Cent auf Positionen proportional zu numerators/denominator (größter Rest)."""
+    shares = [n // denominator for n in numerators]
+    rest = total - sum(shares)
+    if rest:
+        order = sorted(range(len(numerators)), key=lambda i: numerators[i] % denominator, reverse=rest > 0)
+        step = 1 if rest > 0 else -1
+        for i in order[:abs(rest)]:
+            shares[i] += step
+    return shares
+
+
+def calculate_lines(
+    amounts_minor: Sequence[int],
+    bases: Sequence[str],
+    multipliers: Sequence[int],
+    rounding: Rounding = DEFAULT_ROUNDING,
+    groups: Optional[Sequence[Hashable]] = None,
+) -> tuple[list[int], list[int], list[int]]:
+    """
+    Spaltenweise (net, vat, gross) in Cent für beliebig viele Positionen.
+    `groups` (z.B. Land je Position) trennt bei scope="invoice" zusätzlich zu Satz und Basis.
+    """
+    mode = rounding.mode
+    if rounding.scope == "line":
+        nets, vats, grosses = [], [], []
+        for amount, basis, m in zip(amounts_minor, bases, multipliers):
+            if basis == "net":
+                vat = div_round(amount * m, RATE_SCALE, mode)
+                nets.append(amount)
+                vats.append(vat)
+                grosses.append(amount + vat)
+            else:
+                net = div_round(amount * RATE_SCALE, RATE_SCALE + m, mode)
+                nets.append(net)
+                vats.append(amount - net)
+                grosses.append(amount)
+        return nets, vats, grosses
+
+    # Rechnungsweise: Gruppen je (Gruppe, Satz, Basis), eine Rundung pro Gruppe
+    n = len(amounts_minor)
+    nets, vats, grosses = [0] * n, [0] * n, [0] * n
+    by_key: dict[tuple, list[int]] = {}
+    for i, key in enumerate(zip(groups if groups is not None else [None] * n, multipliers, bases)):
+        by_key.setdefault(key, []).append(i)
+
+    for (_, m, basis), idx in by_key.items():
+        amounts = [amounts_minor[i] for i in idx]
+        total = sum(amounts)
+        if basis == "net":
+            total_vat = div_round(total * m, RATE_SCALE, mode)
+            for i, amount, vat in zip(idx, amounts, _allocate(total_vat, [a * m for a in amounts], RATE_SCALE)):
+                nets[i], vats[i], grosses[i] = amount, vat, amount + vat
+        else:
+            denominator = RATE_SCALE + m
+            total_net = div_round(total * RATE_SCALE, denominator, mode)
+            for i, amount, net in zip(idx, amounts, _allocate(total_net, [a * RATE_SCALE for a in amounts], denominator)):
+                nets[i], vats[i], grosses[i] = net, amount - net, amount
+    return nets, vats, grosses
+
+
+def calculate_amounts(
+    amounts: Sequence[float],
+    bases: Sequence[str],
+    rates: Sequence[float],
+    rounding: Rounding = DEFAULT_ROUNDING,
+    groups: Optional[Sequence[Hashable]] = None,
+) -> tuple[list[float], list[float], list[float]]:
+    """float-Schnittstelle für die API: Beträge/Sätze rein, gerundete Beträge (2 Nachkommastellen) raus."""
+    nets, vats, grosses = calculate_lines(
+        [to_minor(a, rounding.mode) for a in amounts],
+        bases,
+        [rate_multiplier(r) for r in rates],
+        rounding,
+        groups,
+    )
+    return [n / MINOR_PER_UNIT for n in nets], [v / MINOR_PER_UNIT for v in vats], [g / MINOR_PER_UNIT for g in grosses]
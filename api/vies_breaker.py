@@ -0,0 +1,195 @@
+# vies_breaker.py
+"""
+Circuit-Breaker und adaptives Parallelitätslimit (AIMD) pro Mitgliedstaat für
+VIES-Aufrufe. VIES fällt meist länderweise aus (MS_UNAVAILABLE für IT, DE läuft):
+
+- closed:    Aufrufe laufen durch; nach `failure_threshold` Ausfällen in Folge -> open
+- open:      Aufrufe scheitern sofort mit ViesCircuitOpen (kein Timeout abwarten)
+- half_open: nach `open_seconds` genau ein Probe-Aufruf; Erfolg -> closed, sonst wieder open
+
+Parallelitätslimit pro Land: +1/limit je Erfolg (additiv, ~+1 pro "Runde"),
+halbiert bei Ausfall oder Überlast-Fault (multiplikativ). Aufrufe über dem Limit
+warten in einer begrenzten Warteschlange (FIFO, höchstens `queue_timeout` Sekunden)
+auf einen freien Platz. Abgewiesen wird erst bei voller Warteschlange, nach dem
+Timeout oder wenn der Breaker öffnet – ein normaler Burst bleibt so bei VIES statt
+bei einem 503.
+"""
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import time
+from typing import Any, Awaitable, Callable, Deque, Dict, TypeVar
+
+from vies_client import ViesFault, ViesUnavailable
+
+T = TypeVar("T")
+
+# Faults, bei denen das Land (bzw. VIES) nicht antwortet -> zählt für den Breaker
+UNAVAILABLE_FAULTS = {"MS_UNAVAILABLE", "SERVICE_UNAVAILABLE", "TIMEOUT"}
+# Faults wegen zu vieler paralleler Anfragen -> nur Limit senken
+OVERLOAD_FAULTS = {"MS_MAX_CONCURRENT_REQ", "GLOBAL_MAX_CONCURRENT_REQ", "SERVER_BUSY"}
+
+
+class ViesCircuitOpen(ViesUnavailable):
+    """Aufruf ohne Upstream-Versuch abgewiesen (Breaker offen oder Limit erreicht)."""
+
+    def __init__(self, country_code: str, reason: str, retry_after: float):
+        super().__init__(f"VIES {country_code}: {reason}")
+        self.country_code = country_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class CountryBreaker:
+    limit: float
+    state: str = "closed"
+    failures: int = 0        # Ausfälle in Folge
+    opened_at: float = 0.0
+    in_flight: int = 0
+    probing: bool = False
+    opened: int = 0          # wie oft geöffnet
+    rejected: int = 0        # ohne Upstream-Versuch abgewiesene Aufrufe
+    # Aufrufe über dem Limit; release() übergibt ihnen den frei gewordenen Platz
+    waiters: Deque["asyncio.Future[None]"] = field(default_factory=deque)
+
+
+class ViesBreakers:
+    def __init__(self, failure_threshold: int = 5, open_seconds: float = 30.0,
+                 initial_limit: int = 10, min_limit: int = 1, max_limit: int = 50,
+                 max_queue: int = 100, queue_timeout: float = 2.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self._breakers: Dict[str, CountryBreaker] = {}
+
+    def breaker(self, country_code: str) -> CountryBreaker:
+        b = self._breakers.get(country_code)
+        if b is None:
+            b = self._breakers[country_code] = CountryBreaker(limit=float(self.initial_limit))
+        return b
+
+    def _reject(self, country_code: str, b: CountryBreaker, reason: str, retry_after: float) -> ViesCircuitOpen:
+        b.rejected += 1
+        return ViesCircuitOpen(country_code, reason, retry_after)
+
+    async def _acquire(self, country_code: str, b: CountryBreaker) -> bool:
+        """Gibt True zurück, wenn der Aufruf der Half-Open-Probe ist."""
+        if b.state == "open":
+            remaining = b.opened_at + self.open_seconds - self.clock()
+            if remaining > 0:
+                raise self._reject(country_code, b, "circuit open", remaining)
+            b.state = "half_open"
+        if b.state == "half_open":
+            if b.probing:
+                raise self._reject(country_code, b, "circuit half-open, probe in progress", 1.0)
+            b.probing = True
+            b.in_flight += 1
+            return True
+        if b.in_flight < int(b.limit) and not b.waiters:
+            b.in_flight += 1
+            return False
+        await self._wait_for_slot(country_code, b)
+        if b.state != "closed":  # zwischen Übergabe und Aufwachen geöffnet
+            self._release(b)
+            raise self._reject(country_code, b, "circuit open", self.open_seconds)
+        return False
+
+    async def _wait_for_slot(self, country_code: str, b: CountryBreaker) -> None:
+        if len(b.waiters) >= self.max_queue:
+            raise self._reject(country_code, b, "concurrency limit reached", 1.0)
+        waiter = asyncio.get_running_loop().create_future()
+        b.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject(country_code, b, "concurrency limit reached", 1.0) from None
+        except asyncio.CancelledError:
+            # Platz schon übergeben, aber der Aufrufer ist weg -> weiterreichen
+            if waiter.done() and not waiter.cancelled():
+                self._release(b)
+            raise
+        finally:
+            if waiter in b.waiters:
+                b.waiters.remove(waiter)
+
+    def _release(self, b: CountryBreaker) -> None:
+        b.in_flight -= 1
+        # Platz direkt an den ältesten Wartenden übergeben (in_flight zählt ihn schon mit)
+        while b.waiters and b.in_flight < int(b.limit) and b.state == "closed":
+            waiter = b.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                b.in_flight += 1
+
+    def _open(self, country_code: str, b: CountryBreaker) -> None:
+        b.state = "open"
+        b.opened_at = self.clock()
+        b.opened += 1
+        # Wartende nicht bis zum Timeout hängen lassen
+        while b.waiters:
+            waiter = b.waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(self._reject(country_code, b, "circuit open", self.open_seconds))
+
+    # Nachzügler (gestartet vor dem Öffnen) ändern den Zustand eines offenen Breakers nicht
+    def _on_success(self, b: CountryBreaker, probe: bool) -> None:
+        b.limit = min(self.max_limit, b.limit + 1.0 / b.limit)
+        if probe or b.state == "closed":
+            b.state = "closed"
+            b.failures = 0
+
+    def _on_failure(self, country_code: str, b: CountryBreaker, counts_for_breaker: bool, probe: bool) -> None:
+        b.limit = max(self.min_limit, b.limit / 2)
+        if not counts_for_breaker or (b.state == "open" and not probe):
+            return
+        b.failures += 1
+        if probe or b.failures >= self.failure_threshold:
+            self._open(country_code, b)
+
+    async def call(self, country_code: str, fn: Callable[[], Awaitable[T]]) -> T:
+        b = self.breaker(country_code)
+        probe = await self._acquire(country_code, b)
+        try:
+            result = await fn()
+        except ViesFault as e:
+            if e.code in UNAVAILABLE_FAULTS or e.code in OVERLOAD_FAULTS:
+                self._on_failure(country_code, b, e.code in UNAVAILABLE_FAULTS, probe)
+            else:
+                self._on_success(b, probe)  # z.B. INVALID_INPUT: Dienst antwortet
+            raise
+        except ViesUnavailable:
+            self._on_failure(country_code, b, True, probe)
+            raise
+        except BaseException:
+            if probe:
+                b.state = "open"  # abgebrochene Probe: der nächste Aufruf probt erneut
+            raise
+        else:
+            self._on_success(b, probe)
+            return result
+        finally:
+            if probe:
+                b.probing = False
+            self._release(b)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            cc: {
+                "state": b.state,
+                "failures": b.failures,
+                "limit": round(b.limit, 2),
+                "in_flight": b.in_flight,
+                "queued": len(b.waiters),
+                "opened": b.opened,
+                "rejected": b.rejected,
+            }
+            for cc, b in sorted(self._breakers.items())
+        }
+
@@ -0,0 +1,132 @@
+# vies_cache.py
+"""
+Zweistufiger Cache für VIES-Ergebnisse, Schlüssel = normalisiertes (cc, nummer)
+aus normalize_inputs():
+
+1. In-Process-LRU (OrderedDict) mit TTL – kein I/O
+2. Postgres-Tabelle vies_results – überlebt Restarts, geteilt über alle Worker
+
+Gültige und ungültige Ergebnisse haben getrennte TTLs (ungültig kürzer, weil eine
+Nummer kurz nach der Vergabe noch nicht in VIES stehen kann). Faults und
+Ausfälle werden nicht gecacht. Fehler der DB-Stufe sind nicht fatal: dann eben
+Cache-Miss bzw. nur LRU.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from db.models import ViesResult
+
+logger = logging.getLogger("vatify")
+
+CacheKey = Tuple[str, str]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class CachedViesResult:
+    result: Dict[str, Any]  # Felder wie ViesClient.check_vat()
+    checked_at: datetime    # Zeitpunkt der VIES-Abfrage (UTC)
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.result["valid"])
+
+
+class PostgresViesStore:
+    """Zweite Stufe: eine Zeile pro (country_code, vat_number), Upsert bei jeder Live-Abfrage."""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    async def fetch(self, key: CacheKey) -> Optional[CachedViesResult]:
+        async with self.session_factory() as db:
+            row = await db.scalar(select(ViesResult).where(
+                ViesResult.country_code == key[0], ViesResult.vat_number == key[1]))
+        if row is None:
+            return None
+        return CachedViesResult(
+            result={"countryCode": row.country_code, "vatNumber": row.vat_number, "valid": row.valid,
+                    "requestDate": row.request_date_raw, "name": row.name, "address": row.address},
+            checked_at=row.checked_at,
+        )
+
+    async def save(self, key: CacheKey, entry: CachedViesResult) -> None:
+        values = {
+            "valid": entry.valid,
+            "request_date_raw": entry.result.get("requestDate"),
+            "name": entry.result.get("name"),
+            "address": entry.result.get("address"),
+            "checked_at": entry.checked_at,
+        }
+        stmt = insert(ViesResult).values(country_code=key[0], vat_number=key[1], **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[ViesResult.country_code, ViesResult.vat_number],
+                                          set_=values)
+        async with self.session_factory() as db:
+            await db.execute(stmt)
+            await db.commit()
+
+
+class ViesResultCache:
+    def __init__(self, valid_ttl: float, invalid_ttl: float, max_entries: int = 100_000,
+                 store: Optional[PostgresViesStore] = None, clock: Callable[[], datetime] = _utcnow):
+        self.valid_ttl = timedelta(seconds=valid_ttl)
+        self.invalid_ttl = timedelta(seconds=invalid_ttl)
+        self.max_entries = max_entries
+        self.store = store
+        self.clock = clock
+        self._entries: "OrderedDict[CacheKey, CachedViesResult]" = OrderedDict()
+
+    def _fresh(self, entry: CachedViesResult) -> bool:
+        ttl = self.valid_ttl if entry.valid else self.invalid_ttl
+        return self.clock() - entry.checked_at < ttl
+
+    def _remember(self, key: CacheKey, entry: CachedViesResult) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def age(self, entry: CachedViesResult) -> float:
+        return max((self.clock() - entry.checked_at).total_seconds(), 0.0)
+
+    async def get(self, key: CacheKey) -> Optional[CachedViesResult]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._fresh(entry):
+                self._entries.move_to_end(key)
+                return entry
+            del self._entries[key]
+
+        if self.store is None:
+            return None
+        try:
+            entry = await self.store.fetch(key)
+        except Exception as e:
+            logger.warning(f"VIES cache store unavailable (read): {e}")
+            return None
+        if entry is None or not self._fresh(entry):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    async def put(self, key: CacheKey, result: Dict[str, Any]) -> CachedViesResult:
+        entry = CachedViesResult(result=result, checked_at=self.clock())
+        self._remember(key, entry)
+        if self.store is not None:
+            try:
+                await self.store.save(key, entry)
+            except Exception as e:
+                logger.warning(f"VIES cache store unavailable (write): {e}")
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
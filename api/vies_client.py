@@ -0,0 +1,180 @@
+# vies_client.py
+"""
+Async-Client für VIES checkVat: fester SOAP-Envelope per POST über einen
+gepoolte httpx.AsyncClients (Keep-Alive, Limits/Timeouts konfigurierbar).
+Blockiert den Event-Loop nicht und braucht weder WSDL noch Threadpool.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+import httpx
+from lxml import etree
+
+VIES_ENDPOINT = "https://ec.europa.eu/taxation_customs/vies/services/checkVatService"
+
+_ENVELOPE = (
+    '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+    'xmlns:urn="urn:ec.europa.eu:taxud:vies:services:checkVat:types">'
+    "<soapenv:Header/><soapenv:Body><urn:checkVat>"
+    "<urn:countryCode>{cc}</urn:countryCode><urn:vatNumber>{num}</urn:vatNumber>"
+    "</urn:checkVat></soapenv:Body></soapenv:Envelope>"
+)
+_HEADERS = {"Content-Type": "text/xml; charset=utf-8", "SOAPAction": ""}
+POOL_SHARD_SIZE = 10
+
+
+class ViesError(Exception):
+    pass
+
+
+class ViesFault(ViesError):
+    """SOAP-Fault von VIES, z.B. MS_UNAVAILABLE, INVALID_INPUT, MS_MAX_CONCURRENT_REQ."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+class ViesUnavailable(ViesError):
+    """Timeout, Verbindungsfehler oder HTTP-Fehler ohne SOAP-Fault."""
+
+
+def build_check_vat_envelope(country_code: str, number: str) -> bytes:
+    return _ENVELOPE.format(cc=escape(country_code), num=escape(number)).encode("utf-8")
+
+
+_TYPES_NS = "urn:ec.europa.eu:taxud:vies:services:checkVat:types"
+_SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+_FAULT_TAG = f"{{{_SOAP_NS}}}Fault"
+_FIELD_TAGS = {f"{{{_TYPES_NS}}}{name}": name
+               for name in ("countryCode", "vatNumber", "requestDate", "valid", "name", "address")}
+_DECODE_TAGS = (_FAULT_TAG, *_FIELD_TAGS)
+
+
+def parse_check_vat_response(content: bytes) -> Dict[str, Any]:
+    """
+    checkVatResponse in einem Durchlauf: root.iter() mit den vorab gebauten
+    Clark-Namen ({ns}tag) filtert in lxml (C) und besucht jedes Element einmal.
+    Bei SOAP-Fault ViesFault mit dem Code aus faultstring (MS_UNAVAILABLE, ...).
+    Ergebnis identisch zu parse_check_vat_response_xpath().
+    """
+    root = etree.fromstring(content)
+    fields: Dict[str, Optional[str]] = {}
+    for el in root.iter(_DECODE_TAGS):
+        if el.tag == _FAULT_TAG:
+            raise ViesFault((el.findtext("{*}faultstring") or "").strip() or "UNKNOWN")
+        name = _FIELD_TAGS[el.tag]
+        if name not in fields:
+            fields[name] = el.text.strip() if el.text else None
+
+    return {
+        "countryCode": fields.get("countryCode"),
+        "vatNumber":   fields.get("vatNumber"),
+        "requestDate": fields.get("requestDate"),  # Rohstring lassen
+        "valid":       (fields.get("valid") or "").lower() == "true",
+        "name":        fields.get("name"),
+        "address":     fields.get("address"),
+    }
+
+
+def parse_check_vat_response_xpath(content: bytes) -> Dict[str, Any]:
+    """Bisheriger Parser (je Feld ein //*[local-name()=...]-Scan); Referenz für Tests und Benchmark."""
+    root = etree.fromstring(content)
+
+    def text_of(root: etree._Element, local_name: str):
+        """
+        Sucht ein Element unabhängig vom Namespace via XPath + local-name().
+        Gibt den getrimmten Text des ersten Treffers zurück oder None.
+        """
+        nodes = root.xpath(f"//*[local-name()='{local_name}']")
+        if not nodes:
+            return None
+        text = nodes[0].text
+        return text.strip() if text else None
+
+    if root.xpath("//*[local-name()='Fault']"):
+        raise ViesFault(text_of(root, "faultstring") or "UNKNOWN")
+
+    return {
+        "countryCode": text_of(root, "countryCode"),
+        "vatNumber":   text_of(root, "vatNumber"),
+        "requestDate": text_of(root, "requestDate"),  # Rohstring lassen
+        "valid":       (text_of(root, "valid") or "").lower() == "true",
+        "name":        text_of(root, "name"),
+        "address":     text_of(root, "address"),
+    }
+
+
+class ViesClient:
+    """
+    Ein Client pro Prozess; die httpx-Pools werden beim ersten Aufruf angelegt
+    (auf dem laufenden Event-Loop) und mit aclose() im Lifespan geschlossen.
+
+    Höchstens `max_connections` Requests gleichzeitig, verteilt auf Pools mit je
+    maximal POOL_SHARD_SIZE Verbindungen: httpcore durchsucht bei jedem Request
+    alle Verbindungen und wartenden Requests eines Pools, was bei einem großen
+    Pool quadratisch teuer wird. Weitere Aufrufer warten am Semaphore.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = VIES_ENDPOINT,
+        max_connections: int = 50,
+        keepalive_expiry: float = 4.0,  # kürzer als übliche Server-Idle-Timeouts (uvicorn: 5 s)
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.endpoint = endpoint
+        self.max_connections = max_connections
+        shards = -(-max_connections // POOL_SHARD_SIZE)
+        per_shard = -(-max_connections // shards)
+        self._shard_count = shards
+        self._limits = httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard,
+                                    keepalive_expiry=keepalive_expiry)
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._transport = transport
+        self._clients: List[httpx.AsyncClient] = []
+        self._in_flight: List[int] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_pools(self) -> None:
+        if not self._clients:
+            self._clients = [
+                httpx.AsyncClient(limits=self._limits, timeout=self._timeout, transport=self._transport)
+                for _ in range(self._shard_count)
+            ]
+            self._in_flight = [0] * self._shard_count
+            self._slots = asyncio.Semaphore(self.max_connections)
+
+    async def _post(self, content: bytes) -> httpx.Response:
+        self._ensure_pools()
+        async with self._slots:
+            # am wenigsten ausgelasteter Pool -> kein Request wartet in einer httpcore-Queue
+            shard = min(range(self._shard_count), key=self._in_flight.__getitem__)
+            self._in_flight[shard] += 1
+            try:
+                return await self._clients[shard].post(self.endpoint, content=content, headers=_HEADERS)
+            finally:
+                self._in_flight[shard] -= 1
+
+    async def check_vat(self, country_code: str, number: str) -> Dict[str, Any]:
+        """Gleiche Felder wie früher call_vies_check_vat_raw(); Fehler als ViesFault/ViesUnavailable."""
+        try:
+            resp = await self._post(build_check_vat_envelope(country_code, number))
+        except httpx.HTTPError as e:
+            raise ViesUnavailable(f"{type(e).__name__}: {e}") from e
+
+        # SOAP-Faults kommen als HTTP 500 mit Envelope
+        if resp.status_code != 200 and b"Fault" not in resp.content:
+            raise ViesUnavailable(f"HTTP {resp.status_code}")
+        try:
+            return parse_check_vat_response(resp.content)
+        except etree.XMLSyntaxError as e:
+            raise ViesUnavailable(f"Invalid response: {e}") from e
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, []
+        for client in clients:
+            await client.aclose()